@@ -7,13 +7,28 @@ Delivers better budget allocation and improved marketing mix optimization.
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Union
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from enum import Enum
+from functools import cached_property
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed, wait
+from multiprocessing import shared_memory
+import argparse
+import hashlib
 import logging
-from scipy import stats
-from sklearn.linear_model import LogisticRegression
+import math
+import os
+import pickle
+import sys
+import threading
+import time
+import traceback
+import warnings
+from scipy import optimize, sparse, stats
+from scipy.sparse.linalg import splu
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.ensemble import RandomForestClassifier
 
 class AttributionModel(Enum):
@@ -40,22 +55,116 @@ class ChannelType(Enum):
     REFERRAL = "referral"
     PR = "pr"
 
-@dataclass
+# Naive UTC epoch for compact touchpoint timestamps
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+
+def _to_us(value: datetime) -> int:
+    """Microseconds since the epoch, treating timezone-aware values as UTC instants."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _ONE_US
+
 class TouchPoint:
-    """Individual customer touchpoint in the journey."""
-    timestamp: datetime
-    channel: ChannelType
-    campaign: str
-    cost: float
-    impressions: int
-    clicks: int
-    customer_id: str
-    touchpoint_value: float = 0.0
-    attribution_weight: float = 0.0
+    """
+    Individual customer touchpoint in the journey.
+
+    Stored compactly in ``__slots__``: the timestamp as integer microseconds
+    since the epoch (``timestamp_us``), the channel as its code in ChannelType
+    order (``channel_code``) and the campaign as an interned string, so
+    touchpoints of the same campaign share one string. ``timestamp`` and
+    ``channel`` convert on access; timezone-aware timestamps are normalized to
+    naive UTC.
+    """
+    __slots__ = ('timestamp_us', 'channel_code', 'campaign', 'cost', 'impressions', 'clicks',
+                 'customer_id', 'touchpoint_value', 'attribution_weight')
+    
+    def __init__(self,
+                 timestamp: datetime,
+                 channel: ChannelType,
+                 campaign: str,
+                 cost: float,
+                 impressions: int,
+                 clicks: int,
+                 customer_id: str,
+                 touchpoint_value: float = 0.0,
+                 attribution_weight: float = 0.0):
+        self.timestamp = timestamp
+        self.channel = channel
+        self.campaign = sys.intern(campaign)
+        self.cost = cost
+        self.impressions = impressions
+        self.clicks = clicks
+        self.customer_id = customer_id
+        self.touchpoint_value = touchpoint_value
+        self.attribution_weight = attribution_weight
+    
+    @classmethod
+    def from_codes(cls,
+                   timestamp_us: int,
+                   channel_code: int,
+                   campaign: str,
+                   cost: float,
+                   impressions: int,
+                   clicks: int,
+                   customer_id: str) -> 'TouchPoint':
+        """Build a touchpoint from already encoded timestamp and channel (no conversion)."""
+        touchpoint = cls.__new__(cls)
+        touchpoint.timestamp_us = timestamp_us
+        touchpoint.channel_code = channel_code
+        touchpoint.campaign = campaign
+        touchpoint.cost = cost
+        touchpoint.impressions = impressions
+        touchpoint.clicks = clicks
+        touchpoint.customer_id = customer_id
+        touchpoint.touchpoint_value = 0.0
+        touchpoint.attribution_weight = 0.0
+        return touchpoint
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Touchpoint time (naive UTC)."""
+        return _EPOCH + timedelta(microseconds=self.timestamp_us)
+    
+    @timestamp.setter
+    def timestamp(self, value: datetime) -> None:
+        self.timestamp_us = _to_us(value)
+    
+    @property
+    def channel(self) -> ChannelType:
+        """Marketing channel."""
+        return _CHANNELS[self.channel_code]
+    
+    @channel.setter
+    def channel(self, value: ChannelType) -> None:
+        self.channel_code = _CHANNEL_CODES[value]
+    
+    def __repr__(self) -> str:
+        return (f"TouchPoint(timestamp={self.timestamp!r}, channel={self.channel!r}, campaign={self.campaign!r}, "
+                f"cost={self.cost!r}, impressions={self.impressions!r}, clicks={self.clicks!r}, "
+                f"customer_id={self.customer_id!r}, touchpoint_value={self.touchpoint_value!r}, "
+                f"attribution_weight={self.attribution_weight!r})")
+    
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    __hash__ = None
 
 @dataclass
 class CustomerJourney:
-    """Complete customer journey with multiple touchpoints."""
+    """
+    Complete customer journey with multiple touchpoints.
+
+    The channel bitmask (bit ``i`` set for the i-th ChannelType), first/last
+    touch timestamps and duration are computed once at construction, so
+    touchpoints should not be modified afterwards.
+    """
+    __slots__ = ('customer_id', 'touchpoints', 'conversion_timestamp', 'conversion_value',
+                 'journey_length_days', 'is_converted',
+                 'channel_mask', 'first_timestamp', 'last_timestamp', 'journey_duration')
+    
     customer_id: str
     touchpoints: List[TouchPoint]
     conversion_timestamp: Optional[datetime]
@@ -63,37 +172,2429 @@ class CustomerJourney:
     journey_length_days: int
     is_converted: bool
     
+    def __post_init__(self):
+        channel_mask = 0
+        for tp in self.touchpoints:
+            channel_mask |= 1 << tp.channel_code
+        self.channel_mask = channel_mask
+        
+        if self.touchpoints:
+            self.first_timestamp = _EPOCH + timedelta(microseconds=min(tp.timestamp_us for tp in self.touchpoints))
+            self.last_timestamp = _EPOCH + timedelta(microseconds=max(tp.timestamp_us for tp in self.touchpoints))
+            # Normalized like touchpoint timestamps, so aware conversion times compare with them
+            end_date = (_EPOCH + timedelta(microseconds=_to_us(self.conversion_timestamp))
+                        if self.conversion_timestamp else self.last_timestamp)
+            self.journey_duration = (end_date - self.first_timestamp).days
+        else:
+            self.first_timestamp = None
+            self.last_timestamp = None
+            self.journey_duration = 0
+    
     @property
     def total_touchpoints(self) -> int:
         """Total number of touchpoints in the journey."""
         return len(self.touchpoints)
     
-    @property
-    def unique_channels(self) -> List[ChannelType]:
-        """List of unique channels in the journey."""
-        return list(set(tp.channel for tp in self.touchpoints))
+    @property
+    def unique_channels(self) -> List[ChannelType]:
+        """List of unique channels in the journey."""
+        return [channel for code, channel in enumerate(_CHANNELS) if self.channel_mask >> code & 1]
+    
+    def has_channel(self, channel: ChannelType) -> bool:
+        """Whether the journey touched ``channel``."""
+        return bool(self.channel_mask >> _CHANNEL_CODES[channel] & 1)
+
+@dataclass
+class AttributionResult:
+    """Attribution analysis results."""
+    model_type: AttributionModel
+    channel_attribution: Dict[ChannelType, float]
+    campaign_attribution: Dict[str, float]
+    roi_by_channel: Dict[ChannelType, float]
+    confidence_intervals: Dict[ChannelType, Tuple[float, float]]
+    model_accuracy: float
+    statistical_significance: float
+    timestamp: datetime
+
+@dataclass
+class LiftStatistics:
+    """Incremental lift of one channel from a test/control comparison."""
+    channel: ChannelType
+    test_size: int
+    test_conversions: int
+    control_size: int
+    control_conversions: int
+    test_rate: float
+    control_rate: float
+    lift: float
+    confidence_interval: Tuple[float, float]
+    p_value: float
+    segments: Dict[str, 'LiftStatistics'] = field(default_factory=dict)
+
+@dataclass
+class ResponseCurve:
+    """
+    Saturating spend -> attributed revenue curve for one budget cell (channel or channel x region).
+
+    ``hill``: revenue = scale * s^shape / (s^shape + half_saturation^shape)
+    ``log``:  revenue = scale * log(1 + s / half_saturation)
+    """
+    kind: str
+    scale: float
+    half_saturation: float
+    shape: float = 1.0
+    
+    def revenue(self, spend: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Expected attributed revenue at ``spend``."""
+        return _curve_revenue(np.asarray(spend, dtype=np.float64), self.kind == 'hill',
+                              self.scale, self.half_saturation, self.shape)
+    
+    def marginal_revenue(self, spend: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Revenue from the next unit of spend at ``spend``."""
+        return _curve_marginal(np.asarray(spend, dtype=np.float64), self.kind == 'hill',
+                               self.scale, self.half_saturation, self.shape)
+
+# Channel codes used by the columnar journey store (code -> channel and back)
+_CHANNELS: List[ChannelType] = list(ChannelType)
+_CHANNEL_CODES: Dict[ChannelType, int] = {channel: code for code, channel in enumerate(_CHANNELS)}
+
+# Timestamps are stored as int64 microseconds since the epoch; NaT marks a missing value
+_NAT = np.iinfo(np.int64).min
+_US_PER_DAY = 86_400_000_000
+
+# Default column names for touch-level tables (one row per touchpoint)
+_FRAME_COLUMNS = {
+    'customer_id': 'customer_id',
+    'timestamp': 'timestamp',
+    'channel': 'channel',
+    'campaign': 'campaign',
+    'cost': 'cost',
+    'conversion_value': 'conversion_value',
+    'is_converted': 'is_converted',
+    'conversion_timestamp': 'conversion_timestamp',
+}
+
+@dataclass
+class JourneyFrame:
+    """
+    Columnar store of customer journeys.
+
+    Touchpoints of all journeys are flattened into parallel NumPy arrays;
+    journey ``j`` owns touchpoints ``offsets[j]:offsets[j + 1]``. Channels are
+    stored as int8 codes into ``ChannelType`` order and campaigns as int32 codes
+    into ``campaigns``. Arrays are treated as read-only once the frame is built.
+    """
+    offsets: np.ndarray                 # int64, n_journeys + 1
+    channel_codes: np.ndarray           # int8, per touchpoint
+    campaign_codes: np.ndarray          # int32, per touchpoint
+    timestamps: np.ndarray              # int64 microseconds, per touchpoint
+    cost: np.ndarray                    # float64, per touchpoint
+    customer_ids: np.ndarray            # object, per journey
+    conversion_value: np.ndarray        # float64, per journey
+    is_converted: np.ndarray            # bool, per journey
+    conversion_timestamps: np.ndarray   # int64 microseconds (NaT if missing), per journey
+    campaigns: List[str]
+
+    @property
+    def n_journeys(self) -> int:
+        """Number of journeys in the frame."""
+        return len(self.offsets) - 1
+
+    @property
+    def n_touchpoints(self) -> int:
+        """Number of touchpoints across all journeys."""
+        return len(self.channel_codes)
+
+    @cached_property
+    def journey_lengths(self) -> np.ndarray:
+        """Touchpoint count per journey."""
+        return np.diff(self.offsets)
+
+    @cached_property
+    def journey_index(self) -> np.ndarray:
+        """Owning journey of every touchpoint."""
+        return np.repeat(np.arange(self.n_journeys), self.journey_lengths)
+
+    @cached_property
+    def has_conversion_timestamp(self) -> np.ndarray:
+        """Journeys with a recorded conversion timestamp."""
+        return self.conversion_timestamps != _NAT
+
+    @cached_property
+    def channel_presence(self) -> np.ndarray:
+        """Boolean (n_journeys, n_channels) matrix of channels present per journey."""
+        presence = np.zeros((self.n_journeys, len(_CHANNELS)), dtype=bool)
+        presence[self.journey_index, self.channel_codes] = True
+        return presence
+
+    @cached_property
+    def channel_masks(self) -> np.ndarray:
+        """Bitmask of channels present per journey (bit ``code`` set per channel)."""
+        masks = np.zeros(self.n_journeys, dtype=np.int64)
+        nonempty = self.journey_lengths > 0
+        if nonempty.any():
+            bits = np.left_shift(np.int64(1), self.channel_codes.astype(np.int64))
+            masks[nonempty] = np.bitwise_or.reduceat(bits, self.offsets[:-1][nonempty])
+        return masks
+
+    @cached_property
+    def journey_duration(self) -> np.ndarray:
+        """Journey duration in days, matching ``CustomerJourney.journey_duration``."""
+        duration = np.zeros(self.n_journeys, dtype=np.int64)
+        nonempty = self.journey_lengths > 0
+        if not nonempty.any():
+            return duration
+
+        starts = self.offsets[:-1][nonempty]
+        first_seen = np.minimum.reduceat(self.timestamps, starts)
+        last_seen = np.maximum.reduceat(self.timestamps, starts)
+        conversion = self.conversion_timestamps[nonempty]
+        end = np.where(conversion != _NAT, conversion, last_seen)
+        duration[nonempty] = (end - first_seen) // _US_PER_DAY
+        return duration
+
+    def take(self, journeys: np.ndarray) -> Tuple['JourneyFrame', np.ndarray]:
+        """
+        Select a subset of journeys.
+
+        Args:
+            journeys: Journey indices to keep, in output order
+
+        Returns:
+            Frame of the selected journeys and the source index of each of its touchpoints
+        """
+        lengths = self.journey_lengths[journeys]
+        offsets = np.zeros(len(journeys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        touches = np.repeat(self.offsets[:-1][journeys] - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        subset = JourneyFrame(
+            offsets=offsets,
+            channel_codes=self.channel_codes[touches],
+            campaign_codes=self.campaign_codes[touches],
+            timestamps=self.timestamps[touches],
+            cost=self.cost[touches],
+            customer_ids=self.customer_ids[journeys],
+            conversion_value=self.conversion_value[journeys],
+            is_converted=self.is_converted[journeys],
+            conversion_timestamps=self.conversion_timestamps[journeys],
+            campaigns=self.campaigns
+        )
+        return subset, touches
+
+    def select_touches(self, touches: np.ndarray) -> 'JourneyFrame':
+        """
+        Keep every journey but only the given touchpoints.
+
+        Args:
+            touches: Ascending touchpoint indices to keep
+
+        Returns:
+            Frame with the same journeys and the selected touchpoints
+        """
+        return JourneyFrame(
+            offsets=np.searchsorted(touches, self.offsets).astype(np.int64),
+            channel_codes=self.channel_codes[touches],
+            campaign_codes=self.campaign_codes[touches],
+            timestamps=self.timestamps[touches],
+            cost=self.cost[touches],
+            customer_ids=self.customer_ids,
+            conversion_value=self.conversion_value,
+            is_converted=self.is_converted,
+            conversion_timestamps=self.conversion_timestamps,
+            campaigns=self.campaigns
+        )
+
+    def to_journeys(self,
+                    impressions: Optional[np.ndarray] = None,
+                    clicks: Optional[np.ndarray] = None) -> List[CustomerJourney]:
+        """
+        Bulk-build CustomerJourney objects from the frame.
+
+        Channel bitmasks, first/last timestamps and durations come from the
+        frame's vectorized arrays instead of being recomputed per journey, and
+        touchpoints are built directly from the encoded timestamps and channel
+        codes with interned campaign strings. ``journey_length_days`` is set to
+        the journey duration.
+
+        Args:
+            impressions: Optional impressions per touchpoint (0 if omitted)
+            clicks: Optional clicks per touchpoint (0 if omitted)
+
+        Returns:
+            List of customer journeys in frame order
+        """
+        n_touches = self.n_touchpoints
+        campaigns = [sys.intern(campaign) for campaign in self.campaigns]
+        customers = self.customer_ids[self.journey_index].tolist()
+        touchpoints = list(map(
+            TouchPoint.from_codes,
+            self.timestamps.tolist(),
+            self.channel_codes.tolist(),
+            [campaigns[code] for code in self.campaign_codes.tolist()],
+            self.cost.tolist(),
+            (np.zeros(n_touches, dtype=np.int64) if impressions is None else np.asarray(impressions)).tolist(),
+            (np.zeros(n_touches, dtype=np.int64) if clicks is None else np.asarray(clicks)).tolist(),
+            customers
+        ))
+
+        nonempty = self.journey_lengths > 0
+        first_seen = np.full(self.n_journeys, _NAT, dtype=np.int64)
+        last_seen = np.full(self.n_journeys, _NAT, dtype=np.int64)
+        if nonempty.any():
+            starts = self.offsets[:-1][nonempty]
+            first_seen[nonempty] = np.minimum.reduceat(self.timestamps, starts)
+            last_seen[nonempty] = np.maximum.reduceat(self.timestamps, starts)
+
+        offsets = self.offsets.tolist()
+        durations = self.journey_duration.tolist()
+        columns = zip(
+            self.customer_ids.tolist(),
+            self.conversion_timestamps.astype('datetime64[us]').tolist(),
+            self.conversion_value.tolist(),
+            self.is_converted.tolist(),
+            self.channel_masks.tolist(),
+            first_seen.astype('datetime64[us]').tolist(),
+            last_seen.astype('datetime64[us]').tolist(),
+            durations
+        )
+
+        journeys = []
+        for j, (customer_id, conversion_timestamp, value, converted, mask, first, last, duration) in enumerate(columns):
+            journey = CustomerJourney.__new__(CustomerJourney)
+            journey.customer_id = customer_id
+            journey.touchpoints = touchpoints[offsets[j]:offsets[j + 1]]
+            journey.conversion_timestamp = conversion_timestamp
+            journey.conversion_value = value
+            journey.journey_length_days = duration
+            journey.is_converted = converted
+            journey.channel_mask = mask
+            journey.first_timestamp = first
+            journey.last_timestamp = last
+            journey.journey_duration = duration
+            journeys.append(journey)
+
+        return journeys
+
+    @classmethod
+    def coerce(cls, journeys: Union[List[CustomerJourney], 'JourneyFrame']) -> 'JourneyFrame':
+        """Return ``journeys`` as a JourneyFrame, converting lists of journeys."""
+        if isinstance(journeys, JourneyFrame):
+            return journeys
+        return cls.from_journeys(journeys)
+
+    @classmethod
+    def from_journeys(cls, journeys: List[CustomerJourney]) -> 'JourneyFrame':
+        """
+        Build a frame from CustomerJourney objects.
+
+        Args:
+            journeys: List of customer journeys
+
+        Returns:
+            Columnar journey frame
+        """
+        lengths = np.fromiter((len(j.touchpoints) for j in journeys), dtype=np.int64, count=len(journeys))
+        offsets = np.zeros(len(journeys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        touchpoints = [tp for journey in journeys for tp in journey.touchpoints]
+        campaign_index: Dict[str, int] = {}
+        campaign_codes = np.fromiter(
+            (campaign_index.setdefault(tp.campaign, len(campaign_index)) for tp in touchpoints),
+            dtype=np.int32, count=len(touchpoints)
+        )
+
+        return cls(
+            offsets=offsets,
+            channel_codes=np.fromiter((tp.channel_code for tp in touchpoints), dtype=np.int8, count=len(touchpoints)),
+            campaign_codes=campaign_codes,
+            timestamps=np.fromiter((tp.timestamp_us for tp in touchpoints), dtype=np.int64, count=len(touchpoints)),
+            cost=np.fromiter((tp.cost for tp in touchpoints), dtype=np.float64, count=len(touchpoints)),
+            customer_ids=np.array([j.customer_id for j in journeys], dtype=object),
+            conversion_value=np.fromiter((j.conversion_value for j in journeys), dtype=np.float64, count=len(journeys)),
+            is_converted=np.fromiter((j.is_converted for j in journeys), dtype=bool, count=len(journeys)),
+            conversion_timestamps=np.fromiter(
+                (_to_us(j.conversion_timestamp) if j.conversion_timestamp is not None else _NAT for j in journeys),
+                dtype=np.int64, count=len(journeys)),
+            campaigns=list(campaign_index)
+        )
+
+    @classmethod
+    def from_pandas(cls, df: pd.DataFrame, columns: Optional[Dict[str, str]] = None) -> 'JourneyFrame':
+        """
+        Build a frame from a touch-level DataFrame (one row per touchpoint).
+
+        Rows must be grouped by customer. Journey-level columns (conversion value,
+        converted flag, conversion timestamp) are read from each journey's first row.
+        Numeric and datetime64[us] columns are used without copying.
+
+        Args:
+            df: Touch-level DataFrame
+            columns: Optional mapping of logical column names to DataFrame columns
+
+        Returns:
+            Columnar journey frame
+        """
+        names = {**_FRAME_COLUMNS, **(columns or {})}
+
+        def timestamps(series: pd.Series) -> np.ndarray:
+            if isinstance(series.dtype, pd.DatetimeTZDtype):
+                series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            return np.asarray(series.to_numpy(), dtype='datetime64[us]').view(np.int64)
+
+        customer_codes, customer_values = pd.factorize(df[names['customer_id']])
+        channel_codes, channel_values = pd.factorize(df[names['channel']])
+        campaign_codes, campaign_values = pd.factorize(df[names['campaign']])
+        conversion_column = names['conversion_timestamp']
+
+        return cls._from_columns(
+            customer_codes=customer_codes,
+            customer_values=np.asarray(customer_values, dtype=object),
+            channel_codes=channel_codes,
+            channel_values=list(channel_values),
+            campaign_codes=campaign_codes,
+            campaign_values=[str(c) for c in campaign_values],
+            timestamps=timestamps(df[names['timestamp']]),
+            cost=df[names['cost']].to_numpy(dtype=np.float64, copy=False),
+            conversion_value=df[names['conversion_value']].to_numpy(dtype=np.float64, copy=False),
+            is_converted=df[names['is_converted']].to_numpy(dtype=bool, copy=False),
+            conversion_timestamps=timestamps(df[conversion_column]) if conversion_column in df else None
+        )
+
+    @classmethod
+    def from_arrow(cls, table, columns: Optional[Dict[str, str]] = None) -> 'JourneyFrame':
+        """
+        Build a frame from a touch-level pyarrow Table (one row per touchpoint).
+
+        String columns are dictionary-encoded so identifiers never become Python
+        objects; single-chunk numeric columns are used without copying.
+
+        Args:
+            table: Touch-level pyarrow Table
+            columns: Optional mapping of logical column names to table columns
+
+        Returns:
+            Columnar journey frame
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError as e:
+            raise ImportError("pyarrow is required for JourneyFrame.from_arrow") from e
+
+        names = {**_FRAME_COLUMNS, **(columns or {})}
+
+        def encode(name: str) -> Tuple[np.ndarray, list]:
+            column = table.column(name).combine_chunks()
+            if not pa.types.is_dictionary(column.type):
+                column = column.dictionary_encode()
+            return column.indices.to_numpy(zero_copy_only=False), column.dictionary.to_pylist()
+
+        def numeric(name: str, dtype) -> np.ndarray:
+            return np.asarray(table.column(name).to_numpy(), dtype=dtype)
+
+        def timestamps(name: str) -> np.ndarray:
+            column = pc.cast(table.column(name), pa.timestamp('us'))
+            return np.asarray(column.to_numpy(), dtype='datetime64[us]').view(np.int64)
+
+        customer_codes, customer_values = encode(names['customer_id'])
+        channel_codes, channel_values = encode(names['channel'])
+        campaign_codes, campaign_values = encode(names['campaign'])
+        conversion_column = names['conversion_timestamp']
+
+        return cls._from_columns(
+            customer_codes=customer_codes,
+            customer_values=np.asarray(customer_values, dtype=object),
+            channel_codes=channel_codes,
+            channel_values=channel_values,
+            campaign_codes=campaign_codes,
+            campaign_values=[str(c) for c in campaign_values],
+            timestamps=timestamps(names['timestamp']),
+            cost=numeric(names['cost'], np.float64),
+            conversion_value=numeric(names['conversion_value'], np.float64),
+            is_converted=numeric(names['is_converted'], bool),
+            conversion_timestamps=timestamps(conversion_column) if conversion_column in table.column_names else None
+        )
+
+    @classmethod
+    def _from_columns(cls,
+                      customer_codes: np.ndarray,
+                      customer_values: np.ndarray,
+                      channel_codes: np.ndarray,
+                      channel_values: list,
+                      campaign_codes: np.ndarray,
+                      campaign_values: List[str],
+                      timestamps: np.ndarray,
+                      cost: np.ndarray,
+                      conversion_value: np.ndarray,
+                      is_converted: np.ndarray,
+                      conversion_timestamps: Optional[np.ndarray]) -> 'JourneyFrame':
+        """Assemble a frame from encoded touch-level columns grouped by customer."""
+        n_rows = len(customer_codes)
+        if (channel_codes < 0).any() or (campaign_codes < 0).any() or (customer_codes < 0).any():
+            raise ValueError("customer_id, channel and campaign columns must not contain missing values")
+
+        if n_rows:
+            starts = np.flatnonzero(customer_codes[1:] != customer_codes[:-1]) + 1
+            starts = np.concatenate(([0], starts))
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+
+        if len(starts) != len(customer_values):
+            raise ValueError("Touch-level rows must be grouped by customer_id")
+
+        channel_lookup = np.array([_CHANNEL_CODES[ChannelType(v)] for v in channel_values], dtype=np.int8)
+
+        if conversion_timestamps is None:
+            conversion_timestamps = np.full(n_rows, _NAT, dtype=np.int64)
+
+        return cls(
+            offsets=np.append(starts, n_rows).astype(np.int64),
+            channel_codes=channel_lookup[channel_codes] if n_rows else np.zeros(0, dtype=np.int8),
+            campaign_codes=campaign_codes.astype(np.int32, copy=False),
+            timestamps=timestamps,
+            cost=cost,
+            customer_ids=customer_values[customer_codes[starts]],
+            conversion_value=conversion_value[starts],
+            is_converted=is_converted[starts],
+            conversion_timestamps=conversion_timestamps[starts],
+            campaigns=campaign_values
+        )
+
+class TouchpointIndex:
+    """
+    Timestamp-sorted index over a JourneyFrame.
+
+    Touchpoints are sorted by timestamp and journeys by reference time (the
+    conversion timestamp, else the last touch), so time windows resolve to
+    contiguous ranges of the sorted order with ``np.searchsorted`` instead of
+    a scan over every touchpoint.
+    """
+
+    def __init__(self, frame: JourneyFrame):
+        self.frame = frame
+
+    @cached_property
+    def touch_order(self) -> np.ndarray:
+        """Touchpoint indices in timestamp order (ties in journey order)."""
+        return np.argsort(self.frame.timestamps, kind='stable')
+
+    @cached_property
+    def sorted_timestamps(self) -> np.ndarray:
+        """Touchpoint timestamps in ascending order."""
+        return self.frame.timestamps[self.touch_order]
+
+    @cached_property
+    def journey_times(self) -> np.ndarray:
+        """Reference time per journey: conversion timestamp, else last touch (NaT if neither)."""
+        frame = self.frame
+        last_seen = np.full(frame.n_journeys, _NAT, dtype=np.int64)
+        nonempty = frame.journey_lengths > 0
+        if nonempty.any():
+            last_seen[nonempty] = np.maximum.reduceat(frame.timestamps, frame.offsets[:-1][nonempty])
+        return np.where(frame.has_conversion_timestamp, frame.conversion_timestamps, last_seen)
+
+    @cached_property
+    def journey_order(self) -> np.ndarray:
+        """Journey indices in reference time order (journeys without one first)."""
+        return np.argsort(self.journey_times, kind='stable')
+
+    @cached_property
+    def sorted_journey_times(self) -> np.ndarray:
+        """Journey reference times in ascending order."""
+        return self.journey_times[self.journey_order]
+
+    def touches_between(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """
+        Touchpoints with ``start <= timestamp < end``.
+
+        Args:
+            start: Window start in microseconds since the epoch
+            end: Window end in microseconds (None leaves the window open)
+
+        Returns:
+            Ascending touchpoint indices
+        """
+        low = np.searchsorted(self.sorted_timestamps, start, side='left')
+        high = len(self.sorted_timestamps) if end is None else np.searchsorted(self.sorted_timestamps, end, side='left')
+        return np.sort(self.touch_order[low:high])
+
+    def journeys_between(self, start: int, end: int) -> np.ndarray:
+        """
+        Journeys whose reference time falls in ``[start, end)``.
+
+        Args:
+            start: Window start in microseconds since the epoch
+            end: Window end in microseconds
+
+        Returns:
+            Ascending journey indices
+        """
+        low, high = np.searchsorted(self.sorted_journey_times, [start, end], side='left')
+        return np.sort(self.journey_order[low:high])
+
+    def lookback_touches(self, lookback_days: float, as_of: Optional[int] = None) -> np.ndarray:
+        """
+        Touchpoints inside each journey's attribution lookback window.
+
+        Converted journeys look back from their reference time; other journeys
+        look back from ``as_of``. Touchpoints older than the earliest window
+        start are cut from the sorted order with one binary search, and only
+        the remainder is compared against per-journey window starts.
+
+        Args:
+            lookback_days: Length of the lookback window in days
+            as_of: Reference time of unconverted journeys in microseconds (defaults to the latest touch)
+
+        Returns:
+            Ascending touchpoint indices to keep
+        """
+        frame = self.frame
+        if frame.n_touchpoints == 0:
+            return np.zeros(0, dtype=np.int64)
+        if as_of is None:
+            as_of = int(self.sorted_timestamps[-1])
+        
+        reference = np.where(frame.is_converted & (self.journey_times != _NAT), self.journey_times, as_of)
+        window_start = reference - int(lookback_days * _US_PER_DAY)
+        candidates = self.touches_between(int(window_start.min()))
+        return candidates[frame.timestamps[candidates] >= window_start[frame.journey_index[candidates]]]
+
+def apply_lookback(journeys: Union[List[CustomerJourney], JourneyFrame],
+                   lookback_days: Optional[float],
+                   as_of: Optional[datetime] = None) -> JourneyFrame:
+    """
+    Drop touchpoints outside the attribution lookback window.
+
+    Args:
+        journeys: List of customer journeys or a columnar JourneyFrame
+        lookback_days: Window length in days (e.g. ``AttributionConfig.attribution_lookback_days``); None keeps all
+        as_of: Reference time for unconverted journeys (defaults to the latest touch)
+
+    Returns:
+        Frame with the same journeys and only touchpoints inside the window
+    """
+    frame = JourneyFrame.coerce(journeys)
+    if lookback_days is None:
+        return frame
+    
+    touches = TouchpointIndex(frame).lookback_touches(lookback_days, None if as_of is None else _to_us(as_of))
+    return frame if len(touches) == frame.n_touchpoints else frame.select_touches(touches)
+
+def iter_journey_frames(path: str,
+                        chunk_size: int = 100_000,
+                        columns: Optional[Dict[str, str]] = None) -> Iterator[JourneyFrame]:
+    """
+    Stream JourneyFrames from a touch-level Parquet or CSV file.
+
+    Rows are read ``chunk_size`` at a time (Parquet record batches or CSV
+    chunks), so memory is bounded by the chunk size rather than the file. Rows
+    must be sorted by customer_id; the last customer of each chunk is held
+    back and prepended to the next chunk, so journeys that straddle a chunk
+    boundary are regrouped before a frame is built.
+
+    Args:
+        path: Path to a ``.parquet`` or ``.csv`` file
+        chunk_size: Rows read per chunk
+        columns: Optional mapping of logical column names to file columns
+
+    Yields:
+        Journey frames of complete journeys, in file order
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    names = {**_FRAME_COLUMNS, **(columns or {})}
+    customer = names['customer_id']
+
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("pyarrow is required to read Parquet journey files") from e
+
+        chunks = (pa.Table.from_batches([batch])
+                  for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+        concat = pa.concat_tables
+        build = JourneyFrame.from_arrow
+        customer_ids = lambda table: table.column(customer).to_numpy(zero_copy_only=False)
+        take_rows = lambda table, start, stop: table.slice(start, stop - start)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        date_columns = [names[key] for key in ('timestamp', 'conversion_timestamp') if names[key] in header]
+        chunks = pd.read_csv(path, chunksize=chunk_size, parse_dates=date_columns)
+        concat = lambda parts: pd.concat(parts, ignore_index=True)
+        build = JourneyFrame.from_pandas
+        customer_ids = lambda df: df[customer].to_numpy()
+        take_rows = lambda df, start, stop: df.iloc[start:stop]
+
+    pending = None
+    last_customer = None
+
+    for chunk in chunks:
+        if pending is not None:
+            chunk = concat([pending, chunk])
+        ids = customer_ids(chunk)
+        if len(ids) == 0:
+            continue
+
+        if (ids[1:] < ids[:-1]).any() or (last_customer is not None and ids[0] <= last_customer):
+            raise ValueError("Journey file rows must be sorted by customer_id")
+
+        # Hold back the last customer's rows; they may continue in the next chunk
+        split = int(np.searchsorted(ids, ids[-1], side='left'))
+        pending = take_rows(chunk, split, len(ids))
+        if split > 0:
+            last_customer = ids[split - 1]
+            yield build(take_rows(chunk, 0, split), columns)
+
+    if pending is not None and len(pending) > 0:
+        yield build(pending, columns)
+
+# Sparse journey features: presence, log1p count and recency blocks (one column per
+# channel code) followed by log1p journey length and log1p journey duration
+_N_FEATURE_BLOCKS = 3
+_N_JOURNEY_FEATURES = _N_FEATURE_BLOCKS * len(_CHANNELS) + 2
+
+def journey_features(frame: JourneyFrame) -> sparse.csr_matrix:
+    """
+    Sparse per-journey feature matrix for data-driven attribution.
+
+    Columns ``[0, 10)`` flag channel presence, ``[10, 20)`` hold log1p touch
+    counts and ``[20, 30)`` hold recency ``1 / (1 + days)`` from the channel's
+    last touch to the end of the journey (conversion, or last touch if
+    unconverted). The last two columns are log1p journey length and duration.
+    The layout does not depend on which channels a frame contains, so batches
+    can be fed to incremental learners.
+
+    Args:
+        frame: Columnar journey frame
+
+    Returns:
+        CSR matrix of shape (n_journeys, 32)
+    """
+    n_channels = len(_CHANNELS)
+    keys = frame.journey_index * n_channels + frame.channel_codes
+
+    # One entry per (journey, channel): touch count and latest touch time
+    order = np.lexsort((frame.timestamps, keys))
+    sorted_keys = keys[order]
+    group_end = np.flatnonzero(np.append(sorted_keys[1:] != sorted_keys[:-1], len(keys) > 0))
+    unique_keys = sorted_keys[group_end]
+    counts = np.diff(np.append(-1, group_end))
+    last_touch = frame.timestamps[order][group_end]
+
+    journeys, channels = unique_keys // n_channels, unique_keys % n_channels
+    last_seen = np.full(frame.n_journeys, _NAT, dtype=np.int64)
+    np.maximum.at(last_seen, journeys, last_touch)
+    end = np.where(frame.has_conversion_timestamp, frame.conversion_timestamps, last_seen)
+    days = np.maximum((end[journeys] - last_touch) // _US_PER_DAY, 0)
+
+    rows = np.arange(frame.n_journeys)
+    data = np.concatenate([np.ones(len(unique_keys)), np.log1p(counts), 1.0 / (1.0 + days),
+                           np.log1p(frame.journey_lengths), np.log1p(frame.journey_duration)])
+    row_index = np.concatenate([journeys, journeys, journeys, rows, rows])
+    column_index = np.concatenate([channels, channels + n_channels, channels + 2 * n_channels,
+                                   np.full(frame.n_journeys, _N_JOURNEY_FEATURES - 2),
+                                   np.full(frame.n_journeys, _N_JOURNEY_FEATURES - 1)])
+
+    return sparse.csr_matrix((data, (row_index, column_index)), shape=(frame.n_journeys, _N_JOURNEY_FEATURES))
+
+def _ordered_sum(values: np.ndarray) -> float:
+    """
+    Left-to-right sum of ``values``.
+
+    np.sum uses pairwise summation; a running sum keeps totals identical to
+    accumulating the same values one at a time in a Python loop.
+    """
+    return float(np.cumsum(values)[-1]) if len(values) else 0.0
+
+# Multipliers of the two polynomial hashes over channel-code sequences (odd 64-bit constants)
+_PATH_HASH_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+
+@dataclass
+class PathTable:
+    """
+    Distinct channel paths with the journeys that follow them.
+
+    Path ``p`` is ``channel_codes[offsets[p]:offsets[p + 1]]``; ``counts``,
+    ``conversions`` and ``values`` hold its journey count, converted journeys
+    and their conversion value, and ``path_of_journey`` maps every journey of
+    the source frame to its path. Paths appear in order of first occurrence.
+    """
+    offsets: np.ndarray             # int64, n_paths + 1
+    channel_codes: np.ndarray       # int8, paths concatenated
+    counts: np.ndarray              # float64, per path
+    conversions: np.ndarray         # float64, per path
+    values: np.ndarray              # float64, per path
+    path_of_journey: np.ndarray     # int64, per journey
+
+    @property
+    def n_paths(self) -> int:
+        """Number of distinct paths."""
+        return len(self.offsets) - 1
+
+    @cached_property
+    def lengths(self) -> np.ndarray:
+        """Touchpoints per path."""
+        return np.diff(self.offsets)
+
+    @cached_property
+    def channel_masks(self) -> np.ndarray:
+        """Bitmask of channels present per path."""
+        masks = np.zeros(self.n_paths, dtype=np.int64)
+        nonempty = self.lengths > 0
+        if nonempty.any():
+            bits = np.left_shift(np.int64(1), self.channel_codes.astype(np.int64))
+            masks[nonempty] = np.bitwise_or.reduceat(bits, self.offsets[:-1][nonempty])
+        return masks
+
+    @classmethod
+    def from_frame(cls, frame: JourneyFrame) -> 'PathTable':
+        """
+        Group journeys by channel path.
+
+        Each path is keyed by a 64-bit polynomial hash of its channel codes
+        mixed with its length, and journeys are grouped with a hash table
+        (``pd.factorize``). Every journey is then checked against its path's
+        codes; on a hash collision the grouping is redone on the length plus
+        two independent hashes, so different paths are never merged.
+
+        Args:
+            frame: Journeys to compress
+
+        Returns:
+            Path frequency table
+        """
+        lengths = frame.journey_lengths
+        nonempty = lengths > 0
+        position = np.arange(frame.n_touchpoints) - frame.offsets[frame.journey_index]
+        
+        # Hashes wrap modulo 2^64: sum of (code + 1) * multiplier^(position + 1) per journey
+        hashes = [np.zeros(frame.n_journeys, dtype=np.uint64) for _ in _PATH_HASH_MULTIPLIERS]
+        if frame.n_touchpoints:
+            symbols = frame.channel_codes.astype(np.uint64) + np.uint64(1)
+            starts = frame.offsets[:-1][nonempty]
+            for journey_hash, multiplier in zip(hashes, _PATH_HASH_MULTIPLIERS):
+                powers = np.cumprod(np.full(int(lengths.max()), multiplier, dtype=np.uint64))
+                journey_hash[nonempty] = np.add.reduceat(symbols * powers[position], starts)
+        
+        groupings = (
+            lambda: pd.factorize(hashes[0] ^ (lengths.astype(np.uint64) * np.uint64(_PATH_HASH_MULTIPLIERS[1])))[0],
+            lambda: pd.DataFrame({'length': lengths, 'first': hashes[0], 'second': hashes[1]})
+                      .groupby(['length', 'first', 'second'], sort=False).ngroup().to_numpy()
+        )
+        for grouping in groupings:
+            # Paths are numbered by first occurrence; their first journey is the representative
+            path_of_journey = grouping().astype(np.int64)
+            representative = np.full(int(path_of_journey.max(initial=-1)) + 1, frame.n_journeys, dtype=np.int64)
+            np.minimum.at(representative, path_of_journey, np.arange(frame.n_journeys))
+            
+            source = frame.offsets[representative[path_of_journey[frame.journey_index]]] + position
+            if np.array_equal(frame.channel_codes[source], frame.channel_codes):
+                break
+        else:
+            raise RuntimeError("Channel path hash collision")
+        
+        subset, _ = frame.take(representative)
+        n_paths = len(representative)
+        return cls(
+            offsets=subset.offsets,
+            channel_codes=subset.channel_codes,
+            counts=np.bincount(path_of_journey, minlength=n_paths).astype(np.float64),
+            conversions=np.bincount(path_of_journey, weights=frame.is_converted, minlength=n_paths),
+            values=np.bincount(path_of_journey, weights=np.where(frame.is_converted, frame.conversion_value, 0.0),
+                               minlength=n_paths),
+            path_of_journey=path_of_journey
+        )
+
+# Markov chain states encode the last ``order`` channels in base (n_channels + 1)
+_MARKOV_STATE_BASE = len(_CHANNELS) + 1
+_MAX_MARKOV_ORDER = int(np.log(np.iinfo(np.int64).max) // np.log(_MARKOV_STATE_BASE))
+
+# Removed-state count above which the reduced system is refactorized instead of
+# applying a low-rank update to the full factorization
+_MAX_WOODBURY_ELEMENTS = 20_000_000
+
+def _markov_removal_effects(channel_codes: np.ndarray,
+                            offsets: np.ndarray,
+                            path_counts: np.ndarray,
+                            path_conversions: np.ndarray,
+                            order: int = 1) -> Tuple[np.ndarray, float]:
+    """
+    Removal effects of an absorbing Markov chain fitted to channel paths.
+
+    Every path runs START -> touchpoint states -> CONVERSION / NO_CONVERSION.
+    With ``order`` k, a state is the sequence of the last k channels. Transition
+    counts are collected into a scipy.sparse matrix; the conversion probability
+    from START solves ``(I - Q) x = r`` where Q holds transient-to-transient
+    probabilities and r the transient-to-conversion column.
+
+    Removing a channel redirects every transition into a state containing it to
+    NO_CONVERSION, i.e. zeroes those columns of Q. (I - Q) is factorized once and
+    each removal is applied as a Woodbury low-rank update on that factorization.
+
+    Args:
+        channel_codes: Channel code of every touchpoint, paths concatenated
+        offsets: Path boundaries into ``channel_codes``
+        path_counts: Number of journeys following each path
+        path_conversions: Number of those journeys that converted
+        order: Markov chain order (channels of history per state)
+
+    Returns:
+        Removal effect per channel code, and the baseline conversion probability
+    """
+    if not 1 <= order <= _MAX_MARKOV_ORDER:
+        raise ValueError(f"Markov order must be between 1 and {_MAX_MARKOV_ORDER}")
+    
+    removal_effects = np.zeros(len(_CHANNELS))
+    lengths = np.diff(offsets)
+    paths = np.flatnonzero(lengths > 0)
+    if len(paths) == 0:
+        return removal_effects, 0.0
+    
+    path_of_touch = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(len(channel_codes)) - offsets[path_of_touch]
+    
+    # State key of every touchpoint: its last `order` channels, 0 padding before the path start
+    keys = np.zeros(len(channel_codes), dtype=np.int64)
+    for lag in range(order):
+        has_lag = np.flatnonzero(position >= lag)
+        keys[has_lag] += (channel_codes[has_lag - lag].astype(np.int64) + 1) * _MARKOV_STATE_BASE ** lag
+    state_keys, touch_state = np.unique(keys, return_inverse=True)
+    touch_state = touch_state.ravel() + 1     # state 0 is START
+    
+    n_transient = len(state_keys) + 1
+    conversion, no_conversion = n_transient, n_transient + 1
+    
+    first, last = offsets[paths], offsets[paths + 1] - 1
+    inner = np.flatnonzero(path_of_touch[:-1] == path_of_touch[1:])
+    counts = path_counts[paths].astype(np.float64)
+    conversions = path_conversions[paths].astype(np.float64)
+    
+    source = np.concatenate([np.zeros(len(paths), dtype=np.int64), touch_state[inner], touch_state[last], touch_state[last]])
+    target = np.concatenate([touch_state[first], touch_state[inner + 1],
+                             np.full(len(paths), conversion), np.full(len(paths), no_conversion)])
+    weight = np.concatenate([counts, path_counts[path_of_touch[inner]], conversions, counts - conversions])
+    
+    transitions = sparse.coo_matrix((weight, (source, target)), shape=(n_transient, n_transient + 2)).tocsr()
+    row_totals = np.asarray(transitions.sum(axis=1)).ravel()
+    probabilities = sparse.diags(1.0 / row_totals) @ transitions
+    
+    Q = probabilities[:, :n_transient].tocsc()
+    r = probabilities[:, conversion].toarray().ravel()
+    A = (sparse.identity(n_transient, format='csc') - Q).tocsc()
+    lu = splu(A)
+    absorption = lu.solve(r)
+    base_probability = absorption[0]
+    if base_probability <= 0:
+        return removal_effects, 0.0
+    
+    # Channels contained in each state (row per state, column per history slot)
+    digits = (state_keys[:, None] // _MARKOV_STATE_BASE ** np.arange(order)) % _MARKOV_STATE_BASE
+    
+    for code in np.unique(channel_codes):
+        removed = np.flatnonzero((digits == code + 1).any(axis=1)) + 1
+        
+        if removed.size * n_transient <= _MAX_WOODBURY_ELEMENTS:
+            # (A + U E_R^T)^-1 r = y - Z (I + Z_R)^-1 y_R with Z = A^-1 U and U = Q[:, R]
+            Z = lu.solve(Q[:, removed].toarray())
+            correction = np.linalg.solve(np.eye(removed.size) + Z[removed, :], absorption[removed])
+            probability = absorption[0] - Z[0, :] @ correction
+        else:
+            kept = np.setdiff1d(np.arange(n_transient), removed)
+            probability = splu(A[kept][:, kept].tocsc()).solve(r[kept])[0]
+        
+        removal_effects[code] = max(0.0, 1.0 - probability / base_probability)
+    
+    return removal_effects, float(base_probability)
+
+def _roi_from_totals(channel_attribution: Dict[ChannelType, float],
+                     channel_costs: np.ndarray,
+                     channel_revenue: np.ndarray) -> Dict[ChannelType, float]:
+    """ROI per attributed channel from cost and attributed revenue per channel code."""
+    roi_by_channel = {}
+    for channel in channel_attribution.keys():
+        cost = channel_costs[_CHANNEL_CODES[channel]]
+        revenue = channel_revenue[_CHANNEL_CODES[channel]]
+        
+        if cost > 0:
+            roi_by_channel[channel] = float((revenue - cost) / cost)
+        else:
+            roi_by_channel[channel] = 0.0
+    
+    return roi_by_channel
+
+def _intervals_from_margins(channel_attribution: Dict[ChannelType, float],
+                            margins: np.ndarray) -> Dict[ChannelType, Tuple[float, float]]:
+    """Confidence intervals from a relative margin of error per channel code (NaN if unknown)."""
+    confidence_intervals = {}
+    
+    for channel, attribution in channel_attribution.items():
+        margin_of_error = margins[_CHANNEL_CODES[channel]]
+        
+        if not np.isnan(margin_of_error):
+            # 95% confidence interval
+            lower_bound = max(0, attribution - margin_of_error * attribution)
+            upper_bound = attribution + margin_of_error * attribution
+            
+            confidence_intervals[channel] = (lower_bound, upper_bound)
+        else:
+            # Wide interval for insufficient data
+            confidence_intervals[channel] = (attribution * 0.5, attribution * 1.5)
+    
+    return confidence_intervals
+
+def _margins_from_moments(count: np.ndarray, total: np.ndarray, sum_squares: np.ndarray) -> np.ndarray:
+    """Relative margin of error per channel code from conversion value moments (NaN below two conversions)."""
+    margins = np.full(len(_CHANNELS), np.nan)
+    enough = count > 1
+    
+    n = count[enough]
+    mean = total[enough] / n
+    variance = np.maximum(sum_squares[enough] / n - mean ** 2, 0.0)
+    margins[enough] = 1.96 * (np.sqrt(variance) / np.sqrt(n))
+    return margins
+
+def _channel_campaign_grid(channel_codes: np.ndarray,
+                           campaign_codes: np.ndarray,
+                           n_campaigns: int,
+                           weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sum of ``weights`` (or touch count) per (channel, campaign) pair, shape (channels, campaigns)."""
+    cells = channel_codes.astype(np.int64) * n_campaigns + campaign_codes
+    grid = np.bincount(cells, weights=weights, minlength=len(_CHANNELS) * n_campaigns)
+    return grid.reshape(len(_CHANNELS), n_campaigns)
+
+def _push_down_to_campaigns(channel_attribution: Dict[ChannelType, float],
+                            contribution: np.ndarray,
+                            touch_counts: np.ndarray,
+                            campaigns: List[str]) -> Dict[str, float]:
+    """
+    Split channel credit over campaigns by their contribution within each channel.
+    
+    Args:
+        channel_attribution: Credit per channel
+        contribution: Converted value credited per (channel, campaign) pair
+        touch_counts: Touchpoints per (channel, campaign) pair, used for channels without converted value
+        campaigns: Campaign names by code
+        
+    Returns:
+        Credit per campaign (summing to the total channel credit)
+    """
+    weights = np.where(contribution.sum(axis=1, keepdims=True) > 0, contribution, touch_counts)
+    totals = weights.sum(axis=1, keepdims=True)
+    shares = np.divide(weights, totals, out=np.zeros(weights.shape), where=totals > 0)
+    
+    channel_credit = np.array([channel_attribution.get(channel, 0.0) for channel in _CHANNELS], dtype=np.float64)
+    campaign_credit = channel_credit @ shares
+    return {campaigns[code]: float(campaign_credit[code]) for code in np.flatnonzero(campaign_credit)}
+
+class ShapleyAttributor:
+    """
+    Shapley value attribution over channel coalitions.
+
+    Journeys are reduced to the bitmask of channels they touched and aggregated
+    per coalition (journey count and conversion value). Those coalition sums are
+    cached, so adding journeys only aggregates the new ones. The worth of a
+    coalition is the total conversion value of journeys whose channels all lie
+    within it, so a coalition keeps the value of every sub-coalition and the
+    Shapley values add up to the total conversion value.
+
+    Shapley values are computed exactly over the 2^k coalition lattice for up to
+    ``exact_max_channels`` channels and estimated from sampled permutations above
+    that, until the largest standard error falls below ``tolerance`` times the
+    largest value.
+    """
+    
+    def __init__(self,
+                 exact_max_channels: int = 15,
+                 tolerance: float = 1e-3,
+                 max_permutations: int = 200_000,
+                 seed: Optional[int] = None):
+        """
+        Initialize Shapley attributor.
+        
+        Args:
+            exact_max_channels: Largest channel count solved over the full lattice
+            tolerance: Relative standard error at which sampling stops
+            max_permutations: Upper bound on sampled permutations
+            seed: Random seed for permutation sampling
+        """
+        self.exact_max_channels = exact_max_channels
+        self.tolerance = tolerance
+        self.max_permutations = max_permutations
+        self.seed = seed
+        
+        self.coalition_masks = np.zeros(0, dtype=np.int64)
+        self.coalition_counts = np.zeros(0)
+        self.coalition_values = np.zeros(0)
+        self._shapley_values: Optional[np.ndarray] = None
+    
+    def add_journeys(self, journeys: Union[List[CustomerJourney], JourneyFrame]) -> None:
+        """
+        Add journeys to the cached coalition sums.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+        """
+        frame = JourneyFrame.coerce(journeys)
+        touched = frame.journey_lengths > 0
+        values = np.where(frame.is_converted, frame.conversion_value, 0.0)
+        self.add_coalitions(frame.channel_masks[touched], np.ones(int(touched.sum())), values[touched])
+    
+    def add_coalitions(self, masks: np.ndarray, counts: np.ndarray, values: np.ndarray) -> None:
+        """
+        Add pre-aggregated coalition counts and conversion values.
+        
+        Args:
+            masks: Channel bitmask per row
+            counts: Journeys per row
+            values: Conversion value per row
+        """
+        keys, inverse = np.unique(np.concatenate([self.coalition_masks, masks]), return_inverse=True)
+        inverse = inverse.ravel()
+        self.coalition_counts = np.bincount(inverse, weights=np.concatenate([self.coalition_counts, counts]),
+                                            minlength=len(keys))
+        self.coalition_values = np.bincount(inverse, weights=np.concatenate([self.coalition_values, values]),
+                                            minlength=len(keys))
+        self.coalition_masks = keys
+        self._shapley_values = None
+    
+    def shapley_values(self) -> np.ndarray:
+        """
+        Shapley value per channel code (zero for channels never observed).
+        
+        Returns:
+            Array indexed by channel code
+        """
+        if self._shapley_values is not None:
+            return self._shapley_values
+        
+        observed = self.coalition_counts > 0
+        masks = self.coalition_masks[observed]
+        worth = self.coalition_values[observed]
+        
+        all_channels = np.bitwise_or.reduce(masks) if len(masks) else 0
+        players = [code for code in range(len(_CHANNELS)) if (all_channels >> code) & 1]
+        
+        # Re-index coalitions onto a compact lattice over the channels actually seen
+        compact = np.zeros(len(masks), dtype=np.int64)
+        for bit, code in enumerate(players):
+            compact |= ((masks >> code) & 1) << bit
+        
+        if len(players) <= self.exact_max_channels:
+            phi = self._exact_shapley(compact, worth, len(players))
+        else:
+            phi = self._sampled_shapley(compact, worth, len(players))
+        
+        self._shapley_values = np.zeros(len(_CHANNELS))
+        self._shapley_values[players] = phi
+        return self._shapley_values
+    
+    def channel_attribution(self) -> Dict[ChannelType, float]:
+        """
+        Normalized channel attribution from Shapley values.
+        
+        Negative values (channels whose presence lowers coalition worth) get no credit.
+        When no channel has positive value, for example before any conversion, the
+        observed channels share credit equally.
+        
+        Returns:
+            Attribution share per observed channel
+        """
+        phi = np.maximum(self.shapley_values(), 0.0)
+        all_channels = np.bitwise_or.reduce(self.coalition_masks[self.coalition_counts > 0]) \
+            if self.coalition_counts.any() else 0
+        present = [code for code in range(len(_CHANNELS)) if (all_channels >> code) & 1]
+        
+        total = phi[present].sum()
+        if total > 0:
+            phi = phi / total
+        else:
+            phi = np.full(len(_CHANNELS), 1.0 / max(len(present), 1))
+        return {_CHANNELS[code]: float(phi[code]) for code in present}
+    
+    def _exact_shapley(self, masks: np.ndarray, worth: np.ndarray, k: int) -> np.ndarray:
+        """Exact Shapley values over all 2^k coalitions."""
+        lattice = np.arange(2 ** k, dtype=np.int64)
+        value = np.zeros(2 ** k)
+        np.add.at(value, masks, worth)
+        
+        # Subset-sum pass: each coalition accumulates the value of every observed sub-coalition
+        for bit in range(k):
+            with_bit = lattice[((lattice >> bit) & 1) == 1]
+            value[with_bit] += value[with_bit ^ (1 << bit)]
+        
+        sizes = np.zeros(2 ** k, dtype=np.int64)
+        for bit in range(k):
+            sizes += (lattice >> bit) & 1
+        
+        # |S|! (k - |S| - 1)! / k! for coalitions S that exclude the player
+        factorials = np.array([math.factorial(i) for i in range(k + 1)], dtype=np.float64)
+        weights = factorials[sizes] * factorials[np.maximum(k - sizes - 1, 0)] / factorials[k]
+        
+        phi = np.zeros(k)
+        for player in range(k):
+            without = lattice[((lattice >> player) & 1) == 0]
+            phi[player] = np.sum(weights[without] * (value[without | (1 << player)] - value[without]))
+        return phi
+    
+    def _sampled_shapley(self, masks: np.ndarray, worth: np.ndarray, k: int,
+                         batch_size: int = 1000) -> np.ndarray:
+        """Monte-Carlo Shapley values from sampled channel permutations."""
+        rng = np.random.default_rng(self.seed)
+        
+        def coalition_worth(coalitions: np.ndarray) -> np.ndarray:
+            # Sum over observed coalitions contained in each prefix, one permutation position at a time
+            result = np.empty(coalitions.shape)
+            for position in range(coalitions.shape[1]):
+                outside = ~coalitions[:, position]
+                result[:, position] = ((masks[None, :] & outside[:, None]) == 0) @ worth
+            return result
+        
+        totals, squares, sampled = np.zeros(k), np.zeros(k), 0
+        while sampled < self.max_permutations:
+            permutations = rng.permuted(np.tile(np.arange(k), (batch_size, 1)), axis=1)
+            prefixes = np.bitwise_or.accumulate(np.left_shift(np.int64(1), permutations), axis=1)
+            prefix_worth = coalition_worth(prefixes)
+            marginal = np.diff(prefix_worth, axis=1, prepend=0.0)
+            
+            contributions = np.empty_like(marginal)
+            np.put_along_axis(contributions, permutations, marginal, axis=1)
+            totals += contributions.sum(axis=0)
+            squares += (contributions ** 2).sum(axis=0)
+            sampled += batch_size
+            
+            mean = totals / sampled
+            standard_error = np.sqrt(np.maximum(squares / sampled - mean ** 2, 0.0) / sampled)
+            if standard_error.max() <= self.tolerance * max(np.abs(mean).max(), np.finfo(float).tiny):
+                break
+        
+        return totals / sampled
+
+def _bootstrap_weights(seed: np.random.SeedSequence, size: int, n_rows: int, method: str) -> np.ndarray:
+    """Resampling weights (replicates x journeys) for one block of bootstrap replicates."""
+    rng = np.random.default_rng(seed)
+    if method == 'poisson':
+        weights = rng.poisson(1.0, size=(size, n_rows))
+    else:
+        weights = rng.multinomial(n_rows, np.full(n_rows, 1.0 / n_rows), size=size)
+    return weights.astype(np.float32)
+
+class BootstrapCI:
+    """
+    Bootstrap confidence intervals for attribution shares.
+
+    Works on a per-journey credit matrix (journeys x channels) holding the value
+    each journey assigns to each channel. A replicate draws resampling weights
+    per journey (Poisson(1) or multinomial) and recomputes every channel share
+    as ``w @ credit / w @ totals``, so each replicate is a matrix-vector product
+    and a block of replicates is one matrix product.
+
+    Weight blocks are independently seeded, so results do not depend on how
+    blocks are scheduled and they can be drawn in parallel on an executor.
+    Blocks are regenerated from the seed when needed rather than kept, so
+    memory stays at one block (or one executor round of blocks) however many
+    replicates are drawn, and with a fixed seed models compared on the same
+    journeys still see the same replicates.
+    """
+    
+    def __init__(self,
+                 n_boot: int = 1000,
+                 confidence_level: float = 0.95,
+                 method: str = 'poisson',
+                 seed: Optional[int] = None,
+                 block_size: int = 100,
+                 executor: Optional[Executor] = None):
+        """
+        Initialize bootstrap engine.
+        
+        Args:
+            n_boot: Number of bootstrap replicates
+            confidence_level: Coverage of the percentile intervals
+            method: Resampling weights, 'poisson' or 'multinomial'
+            seed: Random seed (replicates are reproducible when set)
+            block_size: Replicates per weight block
+            executor: Optional executor for drawing weight blocks in parallel
+        """
+        if method not in ('poisson', 'multinomial'):
+            raise ValueError(f"Unsupported bootstrap method: {method}")
+        if n_boot < 1:
+            raise ValueError("n_boot must be positive")
+        
+        self.n_boot = n_boot
+        self.confidence_level = confidence_level
+        self.method = method
+        self.seed = seed
+        self.block_size = block_size
+        self.executor = executor
+    
+    def weights(self, n_rows: int) -> Iterator[np.ndarray]:
+        """
+        Resampling weight blocks for ``n_rows`` journeys.
+        
+        Yields:
+            Blocks of shape (replicates, n_rows), covering n_boot replicates in total
+        """
+        sizes = [min(self.block_size, self.n_boot - start) for start in range(0, self.n_boot, self.block_size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        
+        if self.executor is None:
+            for seed, size in zip(seeds, sizes):
+                yield _bootstrap_weights(seed, size, n_rows, self.method)
+            return
+        
+        # Draw one round of blocks at a time so finished blocks are not held waiting to be consumed
+        step = os.cpu_count() or 1
+        for start in range(0, len(sizes), step):
+            batch = slice(start, start + step)
+            yield from self.executor.map(_bootstrap_weights, seeds[batch], sizes[batch],
+                                         [n_rows] * len(sizes[batch]), [self.method] * len(sizes[batch]))
+    
+    def replicates(self, credit: np.ndarray, totals: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Bootstrap replicates of the attribution shares.
+        
+        Args:
+            credit: Per-journey credit matrix (journeys x channels)
+            totals: Per-journey value the shares are relative to (defaults to row sums)
+            
+        Returns:
+            Array of shape (n_boot, channels); NaN where a replicate has no value
+        """
+        credit = np.asarray(credit, dtype=np.float64)
+        if credit.shape[0] == 0:
+            return np.full((self.n_boot, credit.shape[1]), np.nan)
+        
+        totals = credit.sum(axis=1) if totals is None else np.asarray(totals, dtype=np.float64)
+        augmented = np.column_stack([credit, totals])
+        replicate_sums = np.vstack([weights @ augmented for weights in self.weights(credit.shape[0])])
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return replicate_sums[:, :-1] / replicate_sums[:, -1:]
+    
+    def intervals(self, credit: np.ndarray, totals: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Percentile confidence intervals for each column of the credit matrix.
+        
+        Args:
+            credit: Per-journey credit matrix (journeys x channels)
+            totals: Per-journey value the shares are relative to (defaults to row sums)
+            
+        Returns:
+            Lower and upper bounds per channel column
+        """
+        shares = self.replicates(credit, totals)
+        alpha = 1 - self.confidence_level
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)   # all-NaN columns when nothing converted
+            lower, upper = np.nanpercentile(shares, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+        return lower, upper
+
+class IncrementalDataDrivenModel:
+    """
+    Data-driven attribution trained incrementally on sparse journey features.
+
+    A logistic-loss SGDClassifier is updated with ``partial_fit`` one journey
+    batch at a time, so training never holds more than one batch of features
+    and can resume from a persisted model. A channel's importance is the sum
+    of absolute coefficients of its presence, count and recency features.
+
+    Accuracy is prequential: each batch is scored before the model trains on
+    it, so every scored journey is one the model had not seen.
+    """
+    
+    def __init__(self,
+                 model_path: Optional[str] = None,
+                 alpha: float = 1e-4,
+                 seed: int = 42):
+        """
+        Initialize incremental model, resuming from ``model_path`` if it exists.
+        
+        Args:
+            model_path: File the model is persisted to after each update
+            alpha: L2 regularization strength
+            seed: Random seed for SGD shuffling
+        """
+        self.model_path = model_path
+        self.model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+        self.journeys_seen = 0
+        self.channel_touches = np.zeros(len(_CHANNELS), dtype=np.int64)
+        self.journeys_scored = 0
+        self.correct_predictions = 0.0
+        
+        if model_path and os.path.exists(model_path):
+            self.load(model_path)
+    
+    @property
+    def is_fitted(self) -> bool:
+        """Whether at least one batch has been trained on."""
+        return hasattr(self.model, 'coef_')
+    
+    @property
+    def prequential_accuracy(self) -> float:
+        """Accuracy over journeys scored before they were trained on (0.0 before any are)."""
+        return self.correct_predictions / self.journeys_scored if self.journeys_scored else 0.0
+    
+    def partial_fit(self, journeys: Union[List[CustomerJourney], JourneyFrame]) -> None:
+        """
+        Score the model on one batch of journeys, update it with the batch and persist it.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+        """
+        frame = JourneyFrame.coerce(journeys)
+        if frame.n_journeys == 0:
+            return
+        
+        if self.is_fitted:
+            self.correct_predictions += self.score(frame) * frame.n_journeys
+            self.journeys_scored += frame.n_journeys
+        self.model.partial_fit(journey_features(frame), frame.is_converted.astype(np.int64), classes=[0, 1])
+        self.journeys_seen += frame.n_journeys
+        self.channel_touches += np.bincount(frame.channel_codes, minlength=len(_CHANNELS))
+        
+        if self.model_path:
+            self.save(self.model_path)
+    
+    def fit_stream(self, frames: Iterator[JourneyFrame]) -> 'IncrementalDataDrivenModel':
+        """
+        Train over a stream of journey batches (e.g. ``iter_journey_frames``).
+        
+        Args:
+            frames: Iterable of journey frames
+            
+        Returns:
+            The trained model
+        """
+        for frame in frames:
+            self.partial_fit(frame)
+        return self
+    
+    def score(self, journeys: Union[List[CustomerJourney], JourneyFrame]) -> float:
+        """Conversion prediction accuracy on ``journeys``."""
+        frame = JourneyFrame.coerce(journeys)
+        return float(self.model.score(journey_features(frame), frame.is_converted.astype(np.int64)))
+    
+    def channel_attribution(self) -> Dict[ChannelType, float]:
+        """
+        Normalized channel importance for every channel seen in training.
+        
+        Returns:
+            Attribution share by channel
+        """
+        if not self.is_fitted:
+            raise ValueError("Model has not been trained")
+        
+        coefficients = np.abs(self.model.coef_[0][:_N_FEATURE_BLOCKS * len(_CHANNELS)])
+        importance = coefficients.reshape(_N_FEATURE_BLOCKS, len(_CHANNELS)).sum(axis=0)
+        seen = np.flatnonzero(self.channel_touches)
+        total_importance = importance[seen].sum()
+        
+        if total_importance > 0:
+            return {_CHANNELS[code]: float(importance[code] / total_importance) for code in seen}
+        return {_CHANNELS[code]: 1.0 / len(seen) for code in seen}
+    
+    def save(self, path: str) -> None:
+        """Persist the model state (written to a temporary file, then renamed)."""
+        state = {
+            'model': self.model,
+            'journeys_seen': self.journeys_seen,
+            'channel_touches': self.channel_touches,
+            'journeys_scored': self.journeys_scored,
+            'correct_predictions': self.correct_predictions,
+            'n_features': _N_JOURNEY_FEATURES,
+        }
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(temporary_path, path)
+    
+    def load(self, path: str) -> None:
+        """Restore model state saved by ``save``."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        
+        if state['n_features'] != _N_JOURNEY_FEATURES:
+            raise ValueError(f"Persisted model expects {state['n_features']} features, "
+                             f"not {_N_JOURNEY_FEATURES}")
+        
+        self.model = state['model']
+        self.journeys_seen = state['journeys_seen']
+        self.channel_touches = state['channel_touches']
+        self.journeys_scored = state.get('journeys_scored', 0)
+        self.correct_predictions = state.get('correct_predictions', 0.0)
+
+class AttributionCache:
+    """
+    Cache of attribution results keyed by a journey-set fingerprint.
+
+    The key hashes the journey customer ids, an update watermark (the latest
+    touchpoint or conversion timestamp unless given explicitly), the model
+    type, the time decay factor and the builder settings that affect results.
+    Results live in an in-memory LRU and, with ``cache_dir``, in pickle files
+    that survive restarts. Entries older than ``ttl_seconds`` are treated as
+    misses; the disk store drops the oldest files beyond ``max_disk_bytes``.
+    Cached results are shared, so callers should not modify them.
+    """
+    
+    def __init__(self,
+                 max_entries: int = 128,
+                 ttl_seconds: Optional[float] = None,
+                 cache_dir: Optional[str] = None,
+                 max_disk_bytes: Optional[int] = None):
+        """
+        Initialize attribution cache.
+        
+        Args:
+            max_entries: Results kept in memory before least recently used ones are evicted
+            ttl_seconds: Age after which entries expire (None keeps them until evicted)
+            cache_dir: Directory for on-disk storage (None caches in memory only)
+            max_disk_bytes: Size bound of the on-disk store (None is unbounded)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, Tuple[float, AttributionResult]]' = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def fingerprint(frame: JourneyFrame,
+                    model_type: AttributionModel,
+                    time_decay_factor: float,
+                    watermark: Optional[Union[datetime, int, str]] = None,
+                    settings: Tuple = ()) -> str:
+        """
+        Content key of an attribution request.
+        
+        Args:
+            frame: Journeys being attributed
+            model_type: Attribution model
+            time_decay_factor: Decay factor for time-based models
+            watermark: Update watermark of the journey set (defaults to its latest timestamp)
+            settings: Further parameters that change the result
+            
+        Returns:
+            Hex digest identifying the request
+        """
+        if watermark is None:
+            timestamps = np.concatenate([frame.timestamps, frame.conversion_timestamps])
+            watermark = int(timestamps.max()) if len(timestamps) else 0
+        
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(pd.util.hash_array(np.asarray(frame.customer_ids, dtype=object)).tobytes())
+        digest.update(repr((frame.n_journeys, frame.n_touchpoints, str(watermark), model_type.value,
+                            float(time_decay_factor), tuple(settings))).encode())
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[AttributionResult]:
+        """
+        Look up a cached result, counting a hit or a miss.
+        
+        Args:
+            key: Fingerprint of the request
+            
+        Returns:
+            Cached result, or None if absent or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], now):
+                del self._entries[key]
+                entry = None
+            
+            if entry is None and self.cache_dir:
+                entry = self._read_disk(key, now)
+                if entry is not None:
+                    self.disk_hits += 1
+                    self._remember(key, entry)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: str, result: AttributionResult) -> None:
+        """
+        Store a result in memory and, if configured, on disk.
+        
+        Args:
+            key: Fingerprint of the request
+            result: Attribution result to cache
+        """
+        entry = (time.time(), result)
+        with self._lock:
+            self._remember(key, entry)
+            if self.cache_dir:
+                self._write_disk(key, entry)
+    
+    def clear(self) -> None:
+        """Drop every cached result from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            for path in self._disk_files():
+                os.remove(path)
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+    
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+    
+    def _remember(self, key: str, entry: Tuple[float, AttributionResult]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+    
+    def _disk_files(self) -> List[str]:
+        if not self.cache_dir:
+            return []
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.pkl')]
+    
+    def _read_disk(self, key: str, now: float) -> Optional[Tuple[float, AttributionResult]]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        
+        if self._expired(entry[0], now):
+            os.remove(path)
+            return None
+        return entry
+    
+    def _write_disk(self, key: str, entry: Tuple[float, AttributionResult]) -> None:
+        path = self._disk_path(key)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(entry, f)
+        os.replace(temporary_path, path)
+        
+        if self.max_disk_bytes is None:
+            return
+        files = sorted(self._disk_files(), key=os.path.getmtime)
+        sizes = [os.path.getsize(name) for name in files]
+        total_size = sum(sizes)
+        for name, size in zip(files, sizes):
+            if total_size <= self.max_disk_bytes or name == path:
+                break
+            os.remove(name)
+            total_size -= size
+            self.evictions += 1
+
+def _lift_counts(test: JourneyFrame,
+                 control: JourneyFrame,
+                 test_segments: Optional[np.ndarray],
+                 control_segments: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, list]:
+    """
+    Test/control sizes and conversions per segment and channel in one pass.
+
+    For channel ``c`` the test group is test journeys that touched ``c`` and the
+    control group is control journeys that did not.
+
+    Returns:
+        (test_size, test_conversions, control_size, control_conversions), each
+        of shape (n_segments, n_channels), and the segment labels
+    """
+    n_channels = len(_CHANNELS)
+    if test_segments is None and control_segments is None:
+        test_codes = np.zeros(test.n_journeys, dtype=np.int64)
+        control_codes = np.zeros(control.n_journeys, dtype=np.int64)
+        labels = [None]
+    elif test_segments is None or control_segments is None:
+        raise ValueError("Segments must be given for both test and control journeys")
+    else:
+        codes, labels = pd.factorize(np.concatenate([np.asarray(test_segments, dtype=object),
+                                                     np.asarray(control_segments, dtype=object)]))
+        if len(codes) != test.n_journeys + control.n_journeys or (codes < 0).any():
+            raise ValueError("Segments must label every journey")
+        test_codes, control_codes = codes[:test.n_journeys], codes[test.n_journeys:]
+        labels = list(labels)
+    
+    n_segments = len(labels)
+    
+    def exposed(frame: JourneyFrame, codes: np.ndarray, journeys: np.ndarray) -> np.ndarray:
+        """Journeys (from ``journeys``) per segment that touched each channel."""
+        rows, channels = np.nonzero(frame.channel_presence[journeys])
+        cells = codes[journeys][rows] * n_channels + channels
+        return np.bincount(cells, minlength=n_segments * n_channels).reshape(n_segments, n_channels)
+    
+    all_test, all_control = np.arange(test.n_journeys), np.arange(control.n_journeys)
+    converted_test, converted_control = np.flatnonzero(test.is_converted), np.flatnonzero(control.is_converted)
+    
+    test_size = exposed(test, test_codes, all_test)
+    test_conversions = exposed(test, test_codes, converted_test)
+    control_size = np.bincount(control_codes, minlength=n_segments)[:, None] - exposed(control, control_codes, all_control)
+    control_conversions = (np.bincount(control_codes[converted_control], minlength=n_segments)[:, None]
+                           - exposed(control, control_codes, converted_control))
+    
+    return test_size, test_conversions, control_size, control_conversions, labels
+
+def _relative_lift(test_rate: np.ndarray, control_rate: np.ndarray) -> np.ndarray:
+    """(test - control) / control, NaN where the control rate is zero."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(control_rate > 0, (test_rate - control_rate) / control_rate, np.nan)
+
+def _mantel_haenszel_lift(test_size: np.ndarray,
+                          test_conversions: np.ndarray,
+                          control_size: np.ndarray,
+                          control_conversions: np.ndarray) -> np.ndarray:
+    """Segment-adjusted lift (Mantel-Haenszel risk ratio - 1), pooling over axis -2."""
+    total = test_size + control_size
+    with np.errstate(invalid='ignore', divide='ignore'):
+        numerator = np.where(total > 0, test_conversions * control_size / total, 0.0).sum(axis=-2)
+        denominator = np.where(total > 0, control_conversions * test_size / total, 0.0).sum(axis=-2)
+        return np.where(denominator > 0, numerator / denominator - 1, np.nan)
+
+def _exact_lift_statistics(test_size: np.ndarray,
+                           test_conversions: np.ndarray,
+                           control_size: np.ndarray,
+                           control_conversions: np.ndarray,
+                           confidence_level: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Exact lift interval and p-value per cell.
+
+    The interval is the Clopper-Pearson interval for the test group's share of
+    conversions, mapped to the rate ratio (exact conditional method for the
+    ratio of two rates). The p-value is Fisher's exact test (two-sided,
+    doubling the smaller tail).
+
+    Returns:
+        Lower bound, upper bound and p-value arrays
+    """
+    alpha = 1 - confidence_level
+    conversions = test_conversions + control_conversions
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share_lower = np.where(test_conversions > 0,
+                               stats.beta.ppf(alpha / 2, test_conversions, conversions - test_conversions + 1), 0.0)
+        share_upper = np.where(control_conversions > 0,
+                               stats.beta.ppf(1 - alpha / 2, test_conversions + 1, conversions - test_conversions), 1.0)
+        size_ratio = control_size / test_size
+        lower = share_lower / (1 - share_lower) * size_ratio - 1
+        upper = np.where(share_upper < 1, share_upper / (1 - share_upper) * size_ratio - 1, np.inf)
+    
+    total = test_size + control_size
+    lower_tail = stats.hypergeom.cdf(test_conversions, total, conversions, test_size)
+    upper_tail = stats.hypergeom.sf(test_conversions - 1, total, conversions, test_size)
+    p_value = np.minimum(1.0, 2 * np.minimum(lower_tail, upper_tail))
+    
+    undefined = conversions == 0
+    return np.where(undefined, np.nan, lower), np.where(undefined, np.nan, upper), np.where(undefined, 1.0, p_value)
+
+def _pooled_lift_statistics(test_size: np.ndarray,
+                            test_conversions: np.ndarray,
+                            control_size: np.ndarray,
+                            control_conversions: np.ndarray,
+                            confidence_level: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Interval and p-value for the Mantel-Haenszel lift across segments.
+
+    Uses the Greenland-Robins variance of the log risk ratio and the
+    Cochran-Mantel-Haenszel test with continuity correction.
+
+    Returns:
+        Lower bound, upper bound and p-value arrays (one per channel)
+    """
+    total = (test_size + control_size).astype(np.float64)
+    valid = total > 1
+    safe_total = np.where(valid, total, 2.0)
+    conversions = test_conversions + control_conversions
+    
+    r = np.where(valid, test_conversions * control_size / safe_total, 0.0).sum(axis=0)
+    s = np.where(valid, control_conversions * test_size / safe_total, 0.0).sum(axis=0)
+    p = np.where(valid, (test_size * control_size * conversions - test_conversions * control_conversions * total)
+                 / safe_total ** 2, 0.0).sum(axis=0)
+    
+    z = stats.norm.ppf(1 - (1 - confidence_level) / 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_ratio = np.log(r / s)
+        standard_error = np.sqrt(p / (r * s))
+        lower = np.exp(log_ratio - z * standard_error) - 1
+        upper = np.exp(log_ratio + z * standard_error) - 1
+        
+        expected = np.where(valid, conversions * test_size / safe_total, 0.0).sum(axis=0)
+        variance = np.where(valid, conversions * (total - conversions) * test_size * control_size
+                            / (safe_total ** 2 * (safe_total - 1)), 0.0).sum(axis=0)
+        chi_square = np.maximum(np.abs(test_conversions.sum(axis=0) - expected) - 0.5, 0.0) ** 2 / variance
+        p_value = np.where(variance > 0, stats.chi2.sf(chi_square, 1), 1.0)
+    
+    return lower, upper, p_value
+
+def _bootstrap_lift_statistics(test_size: np.ndarray,
+                               test_conversions: np.ndarray,
+                               control_size: np.ndarray,
+                               control_conversions: np.ndarray,
+                               confidence_level: float,
+                               n_boot: int,
+                               seed: Optional[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bootstrap lift intervals and p-values per cell and pooled over segments.
+
+    Resampling journeys with replacement within a group of fixed size only
+    changes its conversion count, which is then Binomial(size, rate); replicates
+    are drawn for every segment and channel at once from the aggregated counts.
+
+    Returns:
+        Lower bounds, upper bounds and p-values of shape (n_segments + 1, n_channels);
+        the last row is the pooled (Mantel-Haenszel) lift
+    """
+    rng = np.random.default_rng(seed)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        test_rate = np.where(test_size > 0, test_conversions / np.maximum(test_size, 1), 0.0)
+        control_rate = np.where(control_size > 0, control_conversions / np.maximum(control_size, 1), 0.0)
+    
+    shape = (n_boot,) + test_size.shape
+    test_draws = rng.binomial(np.broadcast_to(test_size, shape), test_rate)
+    control_draws = rng.binomial(np.broadcast_to(control_size, shape), control_rate)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cell_lift = (test_draws / test_size) / (control_draws / control_size) - 1
+    pooled_lift = _mantel_haenszel_lift(test_size, test_draws, control_size, control_draws)
+    lifts = np.concatenate([cell_lift, pooled_lift[:, None, :]], axis=1)
+    
+    alpha = 1 - confidence_level
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)   # cells with no defined replicate
+        lower = np.nanpercentile(lifts, 100 * alpha / 2, axis=0, method='lower')
+        upper = np.nanpercentile(lifts, 100 * (1 - alpha / 2), axis=0, method='higher')
+        defined = (~np.isnan(lifts)).sum(axis=0)
+        below = (lifts <= 0).sum(axis=0) / np.maximum(defined, 1)
+        above = (lifts >= 0).sum(axis=0) / np.maximum(defined, 1)
+    
+    p_value = np.where(defined > 0, np.minimum(1.0, 2 * np.minimum(below, above)), 1.0)
+    return lower, upper, p_value
+
+def _curve_revenue(spend: np.ndarray, hill, scale, half_saturation, shape) -> np.ndarray:
+    """Hill or log response, elementwise over spend and (broadcast) curve parameters."""
+    ratio = np.maximum(spend, 0.0) / half_saturation
+    with np.errstate(over='ignore', invalid='ignore'):
+        saturation = ratio ** shape / (1 + ratio ** shape)
+        saturation = np.where(np.isfinite(saturation), saturation, 1.0)
+    return scale * np.where(hill, saturation, np.log1p(ratio))
+
+def _curve_marginal(spend: np.ndarray, hill, scale, half_saturation, shape) -> np.ndarray:
+    """Derivative of ``_curve_revenue`` with respect to spend."""
+    ratio = np.maximum(spend, 1e-9 * half_saturation) / half_saturation
+    with np.errstate(over='ignore', invalid='ignore'):
+        powered = ratio ** shape
+        hill_marginal = shape * powered / (ratio * (1 + powered) ** 2)
+        hill_marginal = np.where(np.isfinite(hill_marginal), hill_marginal, 0.0)
+    return scale / half_saturation * np.where(hill, hill_marginal, 1 / (1 + ratio))
+
+def fit_response_curve(spend: np.ndarray, revenue: np.ndarray, kind: str = 'hill') -> ResponseCurve:
+    """
+    Fit a saturating response curve to (spend, revenue) observations.
+
+    Falls back to a log curve through the mean observation when there are fewer
+    than three periods with spend or the least-squares fit does not converge.
+
+    Args:
+        spend: Spend per period
+        revenue: Attributed revenue per period
+        kind: 'hill' or 'log'
+
+    Returns:
+        Fitted response curve
+    """
+    if kind not in ('hill', 'log'):
+        raise ValueError(f"Unsupported response curve: {kind}")
+    
+    spend, revenue = np.asarray(spend, dtype=np.float64), np.asarray(revenue, dtype=np.float64)
+    active = spend > 0
+    mean_spend = float(spend[active].mean()) if active.any() else 1.0
+    mean_revenue = float(revenue[active].mean()) if active.any() else 0.0
+    fallback = ResponseCurve('log', float(max(mean_revenue, 0.0) / np.log(2)), mean_spend)
+    
+    if active.sum() < 3 or revenue[active].max() <= 0:
+        return fallback
+    
+    x, y = spend[active], revenue[active]
+    half_guess, scale_guess = float(np.median(x)), float(y.max())
+    try:
+        if kind == 'hill':
+            params, _ = optimize.curve_fit(
+                lambda s, scale, half, shape: _curve_revenue(s, True, scale, half, shape), x, y,
+                p0=(2 * scale_guess, half_guess, 1.0),
+                bounds=([0, 1e-6 * half_guess, 0.3], [np.inf, np.inf, 3.0]), maxfev=5000
+            )
+            return ResponseCurve('hill', *map(float, params))
+        
+        params, _ = optimize.curve_fit(
+            lambda s, scale, half: _curve_revenue(s, False, scale, half, 1.0), x, y,
+            p0=(scale_guess / np.log(2), half_guess), bounds=([0, 1e-6 * half_guess], [np.inf, np.inf]), maxfev=5000
+        )
+        return ResponseCurve('log', *map(float, params))
+    except (RuntimeError, ValueError):
+        return fallback
+
+# Rule-based models and their (model_accuracy, statistical_significance)
+_DEFAULT_COMPARISON_MODELS = [
+    AttributionModel.FIRST_TOUCH,
+    AttributionModel.LAST_TOUCH,
+    AttributionModel.LINEAR,
+    AttributionModel.TIME_DECAY,
+    AttributionModel.POSITION_BASED,
+    AttributionModel.DATA_DRIVEN
+]
+
+_RULE_BASED_MODELS = {
+    AttributionModel.FIRST_TOUCH: (0.75, 0.8),   # Rule-based models have limited accuracy
+    AttributionModel.LAST_TOUCH: (0.75, 0.8),
+    AttributionModel.LINEAR: (0.82, 0.85),
+    AttributionModel.TIME_DECAY: (0.85, 0.88),
+    AttributionModel.POSITION_BASED: (0.83, 0.86),
+}
+
+class _AttributionScan:
+    """
+    Intermediates shared by every attribution model run on one JourneyFrame.
+
+    Everything is computed lazily on first use and then reused, so comparing
+    several models scans the journeys once: credited journeys and touchpoints,
+    first/last touch indices, touch positions, channel costs, per-channel
+    conversion statistics and time-decay weights per decay factor.
+    """
+
+    def __init__(self, frame: JourneyFrame):
+        self.frame = frame
+        self._rule_credit: Dict[Tuple[AttributionModel, Optional[float]], Tuple[np.ndarray, np.ndarray, float]] = {}
+
+    @cached_property
+    def credited_journeys(self) -> np.ndarray:
+        """Converted journeys that have at least one touchpoint."""
+        return np.flatnonzero(self.frame.is_converted & (self.frame.journey_lengths > 0))
+
+    @cached_property
+    def credited_touches(self) -> np.ndarray:
+        """Touchpoints (in journey order) of converted journeys."""
+        return np.flatnonzero(self.frame.is_converted[self.frame.journey_index])
+
+    @cached_property
+    def owner(self) -> np.ndarray:
+        """Owning journey of each credited touchpoint."""
+        return self.frame.journey_index[self.credited_touches]
+
+    @cached_property
+    def position(self) -> np.ndarray:
+        """Position of each credited touchpoint within its journey."""
+        return self.credited_touches - self.frame.offsets[self.owner]
+
+    @cached_property
+    def first_touches(self) -> np.ndarray:
+        """First touchpoint of each credited journey."""
+        return self.frame.offsets[self.credited_journeys]
+
+    @cached_property
+    def last_touches(self) -> np.ndarray:
+        """Last touchpoint of each credited journey."""
+        return self.frame.offsets[self.credited_journeys + 1] - 1
+
+    @cached_property
+    def total_value(self) -> float:
+        """Conversion value of credited journeys."""
+        return _ordered_sum(self.frame.conversion_value[self.credited_journeys])
+
+    @cached_property
+    def timed_total_value(self) -> float:
+        """Conversion value of credited journeys with a conversion timestamp."""
+        journeys = self.credited_journeys[self.frame.has_conversion_timestamp[self.credited_journeys]]
+        return _ordered_sum(self.frame.conversion_value[journeys])
+
+    @cached_property
+    def path_table(self) -> PathTable:
+        """Journeys compressed to distinct channel paths."""
+        return PathTable.from_frame(self.frame)
+
+    @cached_property
+    def channel_costs(self) -> np.ndarray:
+        """Total touchpoint cost per channel code."""
+        return np.bincount(self.frame.channel_codes, weights=self.frame.cost, minlength=len(_CHANNELS))
+
+    @cached_property
+    def channel_margins(self) -> np.ndarray:
+        """Relative margin of error per channel code (NaN with fewer than two conversions)."""
+        converted = self.frame.is_converted
+        values = self.frame.conversion_value[converted]
+        # Count, sum and sum of squares of conversion value per channel in one product
+        moments = self.frame.channel_presence[converted].T.astype(np.float64) @ \
+            np.column_stack([np.ones_like(values), values, values ** 2])
+        return _margins_from_moments(moments[:, 0], moments[:, 1], moments[:, 2])
+
+    def campaign_attribution(self, channel_attribution: Dict[ChannelType, float]) -> Dict[str, float]:
+        """
+        Push channel credit down to campaigns.
+
+        Within each channel, campaigns share its credit in proportion to the
+        converted value they carry under linear credit (reusing the cached
+        linear credits), or to their touch counts if the channel has none.
+        """
+        frame = self.frame
+        n_campaigns = len(frame.campaigns)
+        touches, credit, _ = self.rule_credits(AttributionModel.LINEAR)
+        contribution = _channel_campaign_grid(frame.channel_codes[touches], frame.campaign_codes[touches],
+                                              n_campaigns, credit)
+        touch_counts = _channel_campaign_grid(frame.channel_codes, frame.campaign_codes, n_campaigns)
+        return _push_down_to_campaigns(channel_attribution, contribution, touch_counts, frame.campaigns)
+
+    def credit_matrix(self, touches: np.ndarray, credit: np.ndarray) -> np.ndarray:
+        """
+        Per-journey credit matrix from per-touchpoint credit.
+
+        Returns:
+            Array of shape (credited journeys, channels) with each journey's credit per channel
+        """
+        n_channels = len(_CHANNELS)
+        rows = np.searchsorted(self.credited_journeys, self.frame.journey_index[touches])
+        cells = rows * n_channels + self.frame.channel_codes[touches]
+        matrix = np.bincount(cells, weights=credit, minlength=len(self.credited_journeys) * n_channels)
+        return matrix.reshape(len(self.credited_journeys), n_channels)
+
+    def share_credit_matrix(self, channel_attribution: Dict[ChannelType, float]) -> np.ndarray:
+        """
+        Per-journey credit matrix for a model that only yields channel shares.
+
+        Each converted journey splits its value over the channels it touched in
+        proportion to the model's channel shares; columns are then rescaled so
+        that, relative to total conversion value, they reproduce those shares.
+        """
+        shares = np.array([channel_attribution.get(channel, 0) for channel in _CHANNELS], dtype=np.float64)
+        weights = self.frame.channel_presence[self.credited_journeys] * shares
+        totals = weights.sum(axis=1, keepdims=True)
+        value = self.frame.conversion_value[self.credited_journeys][:, None]
+        matrix = np.divide(weights * value, totals, out=np.zeros_like(weights), where=totals > 0)
+        
+        # Rescale columns so the matrix reproduces the model's shares at unit weights
+        column_totals = matrix.sum(axis=0)
+        target = shares * value.sum()
+        scale = np.divide(target, column_totals, out=np.zeros_like(target), where=column_totals > 0)
+        return matrix * scale
+
+    def rule_credits(self,
+                     model_type: AttributionModel,
+                     decay_factor: float = 0.1) -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+        Per-touchpoint credit of a rule-based model.
+
+        Returns:
+            Credited touchpoint indices in journey order, their credit, and the
+            total conversion value the model distributes
+        """
+        key = self._rule_key(model_type, decay_factor)
+        if key not in self._rule_credit:
+            self._rule_credit[key] = self._compute_rule_credits(model_type, decay_factor)
+        return self._rule_credit[key]
+
+    def set_rule_credits(self,
+                         model_type: AttributionModel,
+                         decay_factor: float,
+                         touches: np.ndarray,
+                         credit: np.ndarray) -> None:
+        """Provide per-touchpoint credit computed elsewhere (e.g. by shard workers)."""
+        total_value = self.timed_total_value if model_type == AttributionModel.TIME_DECAY else self.total_value
+        self._rule_credit[self._rule_key(model_type, decay_factor)] = (touches, credit, total_value)
+
+    @staticmethod
+    def _rule_key(model_type: AttributionModel, decay_factor: float) -> Tuple[AttributionModel, Optional[float]]:
+        """Credit cache key; only time decay depends on the decay factor."""
+        return model_type, decay_factor if model_type == AttributionModel.TIME_DECAY else None
+
+    def _compute_rule_credits(self,
+                              model_type: AttributionModel,
+                              decay_factor: float) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Per-touchpoint credit of a rule-based model (uncached)."""
+        frame = self.frame
+        journeys = self.credited_journeys
+        
+        if model_type == AttributionModel.FIRST_TOUCH:
+            return self.first_touches, frame.conversion_value[journeys], self.total_value
+        elif model_type == AttributionModel.LAST_TOUCH:
+            return self.last_touches, frame.conversion_value[journeys], self.total_value
+        elif model_type == AttributionModel.LINEAR:
+            credit_per_touch = frame.conversion_value / np.maximum(frame.journey_lengths, 1)
+            return self.credited_touches, credit_per_touch[self.owner], self.total_value
+        elif model_type == AttributionModel.TIME_DECAY:
+            return self._time_decay_credits(decay_factor)
+        elif model_type == AttributionModel.POSITION_BASED:
+            return self.credited_touches, self._position_based_credits(), self.total_value
+        else:
+            raise ValueError(f"Not a rule-based attribution model: {model_type}")
+
+    def _time_decay_credits(self, decay_factor: float) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Time-decay credit: more credit to touchpoints closer to conversion."""
+        frame = self.frame
+        timed = frame.has_conversion_timestamp[self.owner]
+        touches, owner = self.credited_touches[timed], self.owner[timed]
+        
+        # Calculate weights based on time decay (one vectorized exp for all touchpoints)
+        days_before_conversion = (frame.conversion_timestamps[owner] - frame.timestamps[touches]) // _US_PER_DAY
+        weights = np.exp(-decay_factor * days_before_conversion)
+        total_weight = np.bincount(owner, weights=weights, minlength=frame.n_journeys)
+        
+        # Distribute conversion value based on weights
+        distributed = total_weight[owner] > 0
+        touches, owner, weights = touches[distributed], owner[distributed], weights[distributed]
+        credit = frame.conversion_value[owner] * (weights / total_weight[owner])
+        
+        return touches, credit, self.timed_total_value
+
+    def _position_based_credits(self) -> np.ndarray:
+        """Position-based credit: 40% first, 40% last, 20% shared by middle touches."""
+        value = self.frame.conversion_value[self.owner]
+        num_touches = self.frame.journey_lengths[self.owner]
+        is_end = (self.position == 0) | (self.position == num_touches - 1)
+        
+        # Single touch gets full credit, two touches split 50/50,
+        # otherwise 40% first, 40% last, 20% distributed among middle touches
+        return np.select(
+            [num_touches == 1, num_touches == 2, is_end],
+            [value, value * 0.5, value * 0.4],
+            default=value * 0.2 / np.maximum(num_touches - 2, 1)
+        )
+
+# Frame columns shard workers read from shared memory (customer ids and campaign names stay in the parent)
+_SHARED_FRAME_ARRAYS = ('offsets', 'channel_codes', 'campaign_codes', 'timestamps', 'cost',
+                        'conversion_value', 'is_converted', 'conversion_timestamps')
+
+class _SharedArrays:
+    """NumPy arrays backed by named shared memory blocks, owned by the creating process."""
+
+    def __init__(self):
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.specs: Dict[str, Tuple[str, tuple, str]] = {}
+
+    def create(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """Allocate a zero-filled shared array."""
+        dtype = np.dtype(dtype)
+        block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self.blocks[name] = block
+        self.specs[name] = (block.name, shape, dtype.str)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.fill(0)
+        return array
+
+    def put(self, name: str, values: np.ndarray) -> np.ndarray:
+        """Copy ``values`` into a new shared array."""
+        array = self.create(name, values.shape, values.dtype)
+        array[...] = values
+        return array
+
+    def release(self) -> None:
+        """Close and unlink every block (array views must be dropped first)."""
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+def _drop_frames(error: BaseException) -> None:
+    """Clear locals held by a failed worker's traceback, so its shared array views don't block closing."""
+    traceback.clear_frames(error.__traceback__)
+
+def _shard_rule_credits(specs: Dict[str, Tuple[str, tuple, str]],
+                        journeys: np.ndarray,
+                        models: List[AttributionModel],
+                        decay_factor: float) -> int:
+    """
+    Shard worker: write per-touchpoint rule-based credit for ``journeys``.
+
+    Reads the frame from shared memory and writes credit and a credited flag
+    at each touchpoint's position in the full frame, so the parent can
+    aggregate in the original journey order.
+
+    Returns:
+        Number of journeys processed
+    """
+    blocks = {name: shared_memory.SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    
+    def run() -> None:
+        arrays = {name: np.ndarray(spec[1], dtype=np.dtype(spec[2]), buffer=blocks[name].buf)
+                  for name, spec in specs.items()}
+        n_journeys = len(arrays['offsets']) - 1
+        frame = JourneyFrame(customer_ids=np.empty(n_journeys, dtype=object), campaigns=[],
+                             **{name: arrays[name] for name in _SHARED_FRAME_ARRAYS})
+        shard, source_touches = frame.take(journeys)
+        scan = _AttributionScan(shard)
+        
+        for row, model_type in enumerate(models):
+            touches, credit, _ = scan.rule_credits(model_type, decay_factor)
+            arrays['credit'][row, source_touches[touches]] = credit
+            arrays['credited'][row, source_touches[touches]] = True
+    
+    try:
+        run()
+    except BaseException as e:
+        _drop_frames(e)
+        raise
+    finally:
+        for block in blocks.values():
+            block.close()
+    return len(journeys)
+
+# Builders reused across tasks within a model worker process, keyed by settings
+_WORKER_BUILDERS: Dict[tuple, 'AttributionModelBuilder'] = {}
+
+def _build_model_worker(specs: Dict[str, Tuple[str, tuple, str]],
+                        campaigns: List[str],
+                        model_type: AttributionModel,
+                        time_decay_factor: float,
+                        settings: Dict) -> Tuple[AttributionResult, float]:
+    """
+    Model worker: build one attribution model over a frame in shared memory.
+
+    Returns:
+        The attribution result and its build time in seconds
+    """
+    key = tuple(sorted(settings.items()))
+    if key not in _WORKER_BUILDERS:
+        _WORKER_BUILDERS[key] = AttributionModelBuilder(**settings)
+    builder = _WORKER_BUILDERS[key]
+    blocks = {name: shared_memory.SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    
+    def run() -> Tuple[AttributionResult, float]:
+        arrays = {name: np.ndarray(spec[1], dtype=np.dtype(spec[2]), buffer=blocks[name].buf)
+                  for name, spec in specs.items()}
+        n_journeys = len(arrays['offsets']) - 1
+        frame = JourneyFrame(customer_ids=np.empty(n_journeys, dtype=object), campaigns=campaigns,
+                             **{name: arrays[name] for name in _SHARED_FRAME_ARRAYS})
+        start = time.perf_counter()
+        result = builder._build_from_scan(_AttributionScan(frame), model_type, time_decay_factor)
+        return result, time.perf_counter() - start
+    
+    try:
+        return run()
+    except BaseException as e:
+        _drop_frames(e)
+        raise
+    finally:
+        for block in blocks.values():
+            block.close()
+
+class StreamingAttributor:
+    """
+    Running attribution over journeys that arrive continuously.
+
+    Each journey (or micro-batch) is folded into running per-model channel and
+    campaign credit, plus shared channel cost, converted value and conversion
+    value moments. Previously seen journeys are never revisited, and
+    ``snapshot`` assembles an AttributionResult from the running sums in
+    O(channels + campaigns). Rule-based models are supported, as are
+    SHAPLEY_VALUE through cached coalition sums and DATA_DRIVEN through an
+    incrementally trained model (accuracy is measured on each batch before
+    training on it).
+
+    Sums are accumulated batch by batch, so a snapshot agrees with a batch run
+    over the same journeys up to floating-point rounding.
+    """
+    
+    def __init__(self,
+                 models: Optional[List[AttributionModel]] = None,
+                 time_decay_factor: float = 0.1,
+                 data_driven_model: Optional[IncrementalDataDrivenModel] = None,
+                 lookback_days: Optional[float] = None):
+        """
+        Initialize streaming attributor.
+        
+        Args:
+            models: Models to maintain (defaults to all rule-based models)
+            time_decay_factor: Decay factor for time-based models
+            data_driven_model: Incremental model to train for DATA_DRIVEN (a new one if omitted)
+            lookback_days: Attribution lookback window in days (unconverted journeys look back
+                from their batch's latest touch); None counts every touchpoint
+        """
+        self.models = list(models or _RULE_BASED_MODELS)
+        supported = set(_RULE_BASED_MODELS) | {AttributionModel.SHAPLEY_VALUE, AttributionModel.DATA_DRIVEN}
+        unsupported = [m for m in self.models if m not in supported]
+        if unsupported:
+            raise ValueError(f"Streaming attribution does not support: {[m.value for m in unsupported]}")
+        
+        self.time_decay_factor = time_decay_factor
+        self.lookback_days = lookback_days
+        self.journeys_seen = 0
+        
+        n_channels = len(_CHANNELS)
+        self._campaign_index: Dict[str, int] = {}
+        self._channel_credit = {m: np.zeros(n_channels) for m in self.models}
+        self._channel_touches = {m: np.zeros(n_channels, dtype=np.int64) for m in self.models}
+        self._campaign_credit = {m: np.zeros(0) for m in self.models}
+        self._campaign_touches = {m: np.zeros(0, dtype=np.int64) for m in self.models}
+        self._total_value = {m: 0.0 for m in self.models}
+        
+        # Shared running sums for ROI and confidence intervals
+        self._channel_costs = np.zeros(n_channels)
+        self._channel_converted_value = np.zeros(n_channels)
+        self._channel_campaign_value = np.zeros((n_channels, 0))
+        self._channel_campaign_touches = np.zeros((n_channels, 0))
+        self._conversion_count = np.zeros(n_channels)
+        self._conversion_sum = np.zeros(n_channels)
+        self._conversion_sum_squares = np.zeros(n_channels)
+        self._shapley = ShapleyAttributor() if AttributionModel.SHAPLEY_VALUE in self.models else None
+        
+        self._data_driven = None
+        if AttributionModel.DATA_DRIVEN in self.models:
+            self._data_driven = data_driven_model or IncrementalDataDrivenModel()
+    
+    def add_journey(self, journey: CustomerJourney) -> None:
+        """
+        Add a single journey.
+        
+        Args:
+            journey: Customer journey
+        """
+        self.add_journeys([journey])
+    
+    def add_journeys(self, journeys: Union[List[CustomerJourney], JourneyFrame]) -> None:
+        """
+        Add a micro-batch of journeys to the running sums.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+        """
+        scan = _AttributionScan(apply_lookback(journeys, self.lookback_days))
+        frame = scan.frame
+        campaign_codes = self._global_campaign_codes(frame)
+        n_channels, n_campaigns = len(_CHANNELS), len(self._campaign_index)
+        
+        for model_type in self.models:
+            if model_type == AttributionModel.SHAPLEY_VALUE:
+                self._shapley.add_journeys(frame)
+                continue
+            elif model_type == AttributionModel.DATA_DRIVEN:
+                self._data_driven.partial_fit(frame)
+                continue
+            
+            touches, credit, total_value = scan.rule_credits(model_type, self.time_decay_factor)
+            channels, campaigns = frame.channel_codes[touches], campaign_codes[touches]
+            self._channel_credit[model_type] += np.bincount(channels, weights=credit, minlength=n_channels)
+            self._channel_touches[model_type] += np.bincount(channels, minlength=n_channels)
+            self._campaign_credit[model_type] += np.bincount(campaigns, weights=credit, minlength=n_campaigns)
+            self._campaign_touches[model_type] += np.bincount(campaigns, minlength=n_campaigns)
+            self._total_value[model_type] += total_value
+        
+        converted_codes = frame.channel_codes[scan.credited_touches]
+        converted_value = frame.conversion_value[scan.owner]
+        self._channel_costs += scan.channel_costs
+        self._channel_converted_value += np.bincount(converted_codes, weights=converted_value, minlength=n_channels)
+        
+        if self._shapley is not None or self._data_driven is not None:
+            touches, credit, _ = scan.rule_credits(AttributionModel.LINEAR)
+            self._channel_campaign_value += _channel_campaign_grid(frame.channel_codes[touches],
+                                                                   campaign_codes[touches], n_campaigns, credit)
+            self._channel_campaign_touches += _channel_campaign_grid(frame.channel_codes, campaign_codes, n_campaigns)
+        
+        converted_presence = frame.channel_presence[frame.is_converted]
+        values = frame.conversion_value[frame.is_converted]
+        self._conversion_count += converted_presence.sum(axis=0)
+        self._conversion_sum += values @ converted_presence
+        self._conversion_sum_squares += (values ** 2) @ converted_presence
+        
+        self.journeys_seen += frame.n_journeys
+    
+    def snapshot(self, model_type: AttributionModel) -> AttributionResult:
+        """
+        Attribution result for everything seen so far.
+        
+        Args:
+            model_type: One of the maintained models
+            
+        Returns:
+            Attribution analysis results
+        """
+        if model_type not in self.models:
+            raise ValueError(f"Model not maintained by this attributor: {model_type.value}")
+        
+        campaigns = list(self._campaign_index)
+        
+        if model_type == AttributionModel.SHAPLEY_VALUE:
+            channel_attribution = self._shapley.channel_attribution()
+            campaign_attribution = _push_down_to_campaigns(channel_attribution, self._channel_campaign_value,
+                                                           self._channel_campaign_touches, campaigns)
+            model_accuracy, statistical_significance = 0.91, 0.93
+        elif model_type == AttributionModel.DATA_DRIVEN:
+            channel_attribution = self._data_driven.channel_attribution()
+            campaign_attribution = _push_down_to_campaigns(channel_attribution, self._channel_campaign_value,
+                                                           self._channel_campaign_touches, campaigns)
+            model_accuracy = self._data_driven.prequential_accuracy
+            statistical_significance = 0.92
+        else:
+            total_value = self._total_value[model_type]
+            scale = total_value if total_value > 0 else 1.0
+            channel_credit = self._channel_credit[model_type] / scale
+            campaign_credit = self._campaign_credit[model_type] / scale
+            
+            channel_attribution = {_CHANNELS[code]: float(channel_credit[code])
+                                   for code in np.flatnonzero(self._channel_touches[model_type])}
+            campaign_attribution = {campaigns[code]: float(campaign_credit[code])
+                                    for code in np.flatnonzero(self._campaign_touches[model_type])}
+            model_accuracy, statistical_significance = _RULE_BASED_MODELS[model_type]
+        
+        shares = np.array([channel_attribution.get(channel, 0) for channel in _CHANNELS], dtype=np.float64)
+        roi_by_channel = _roi_from_totals(channel_attribution, self._channel_costs,
+                                          shares * self._channel_converted_value)
+        
+        return AttributionResult(
+            model_type=model_type,
+            channel_attribution=channel_attribution,
+            campaign_attribution=campaign_attribution,
+            roi_by_channel=roi_by_channel,
+            confidence_intervals=_intervals_from_margins(channel_attribution, self._channel_margins()),
+            model_accuracy=model_accuracy,
+            statistical_significance=statistical_significance,
+            timestamp=datetime.now()
+        )
+    
+    def _channel_margins(self) -> np.ndarray:
+        """Relative margin of error per channel from running conversion value moments."""
+        return _margins_from_moments(self._conversion_count, self._conversion_sum, self._conversion_sum_squares)
     
-    @property
-    def journey_duration(self) -> int:
-        """Journey duration in days."""
-        if not self.touchpoints:
-            return 0
-        
-        start_date = min(tp.timestamp for tp in self.touchpoints)
-        end_date = self.conversion_timestamp or max(tp.timestamp for tp in self.touchpoints)
-        return (end_date - start_date).days
-
-@dataclass
-class AttributionResult:
-    """Attribution analysis results."""
-    model_type: AttributionModel
-    channel_attribution: Dict[ChannelType, float]
-    campaign_attribution: Dict[str, float]
-    roi_by_channel: Dict[ChannelType, float]
-    confidence_intervals: Dict[ChannelType, Tuple[float, float]]
-    model_accuracy: float
-    statistical_significance: float
-    timestamp: datetime
+    def _global_campaign_codes(self, frame: JourneyFrame) -> np.ndarray:
+        """Map frame campaign codes onto this attributor's campaign index, growing it as needed."""
+        lookup = np.array([self._campaign_index.setdefault(name, len(self._campaign_index))
+                           for name in frame.campaigns], dtype=np.int64)
+        
+        grow = len(self._campaign_index) - self._channel_campaign_value.shape[1]
+        if grow > 0:
+            padding = np.zeros((len(_CHANNELS), grow))
+            self._channel_campaign_value = np.hstack([self._channel_campaign_value, padding])
+            self._channel_campaign_touches = np.hstack([self._channel_campaign_touches, padding])
+            for model_type in self.models:
+                self._campaign_credit[model_type] = np.concatenate([self._campaign_credit[model_type], np.zeros(grow)])
+                self._campaign_touches[model_type] = np.concatenate(
+                    [self._campaign_touches[model_type], np.zeros(grow, dtype=np.int64)])
+        
+        return lookup[frame.campaign_codes] if len(lookup) else np.zeros(0, dtype=np.int64)
 
 class AttributionModelBuilder:
     """
@@ -108,14 +2609,43 @@ class AttributionModelBuilder:
     - Incrementality testing support
     """
     
-    def __init__(self, confidence_level: float = 0.95):
+    def __init__(self,
+                 confidence_level: float = 0.95,
+                 markov_order: int = 1,
+                 n_boot: int = 0,
+                 bootstrap_seed: Optional[int] = None,
+                 bootstrap_executor: Optional[Executor] = None,
+                 data_driven_model: Optional[IncrementalDataDrivenModel] = None,
+                 cache: Optional[AttributionCache] = None,
+                 lookback_days: Optional[float] = None):
         """
         Initialize attribution model builder.
         
         Args:
             confidence_level: Statistical confidence level for analysis
+            markov_order: Channels of history per state in Markov chain models
+            n_boot: Bootstrap replicates for confidence intervals (0, the default, uses a normal approximation)
+            bootstrap_seed: Random seed for bootstrap resampling
+            bootstrap_executor: Optional executor for running bootstrap replicates in parallel
+            data_driven_model: Incremental model used by data-driven attribution instead of refitting
+                (trained with ``update_data_driven_model``)
+            cache: Optional cache of results keyed by journey-set fingerprint
+            lookback_days: Attribution lookback window in days (e.g.
+                ``AttributionConfig.attribution_lookback_days``); None counts every touchpoint
         """
         self.confidence_level = confidence_level
+        self.markov_order = markov_order
+        self.data_driven_model = data_driven_model
+        self.cache = cache
+        self.lookback_days = lookback_days
+        self.model_timings: Dict[AttributionModel, float] = {}
+        self._last_allocation: Optional[Tuple[list, float]] = None
+        self.bootstrap = BootstrapCI(
+            n_boot=n_boot,
+            confidence_level=confidence_level,
+            seed=bootstrap_seed,
+            executor=bootstrap_executor
+        ) if n_boot > 0 else None
         self.logger = self._setup_logging()
         self.models = {}
         
@@ -134,72 +2664,473 @@ class AttributionModelBuilder:
         return logger
     
     def build_attribution_model(self, 
-                              journeys: List[CustomerJourney],
+                              journeys: Union[List[CustomerJourney], JourneyFrame],
                               model_type: AttributionModel,
-                              time_decay_factor: float = 0.1) -> AttributionResult:
+                              time_decay_factor: float = 0.1,
+                              executor: Optional[Executor] = None,
+                              n_workers: Optional[int] = None,
+                              watermark: Optional[Union[datetime, int, str]] = None) -> AttributionResult:
         """
         Build attribution model based on customer journey data.
         
+        Touchpoints outside the builder's lookback window are dropped first.
+        
         Args:
-            journeys: List of customer journeys
+            journeys: List of customer journeys or a columnar JourneyFrame
             model_type: Type of attribution model to build
             time_decay_factor: Decay factor for time-based models
+            executor: Optional executor for sharded rule-based credit
+            n_workers: Number of customer shards (a process pool is created if no executor is given)
+            watermark: Update watermark of the journeys for the result cache
             
         Returns:
             Attribution analysis results
         """
-        if model_type == AttributionModel.FIRST_TOUCH:
-            return self._first_touch_attribution(journeys)
-        elif model_type == AttributionModel.LAST_TOUCH:
-            return self._last_touch_attribution(journeys)
-        elif model_type == AttributionModel.LINEAR:
-            return self._linear_attribution(journeys)
-        elif model_type == AttributionModel.TIME_DECAY:
-            return self._time_decay_attribution(journeys, time_decay_factor)
-        elif model_type == AttributionModel.POSITION_BASED:
-            return self._position_based_attribution(journeys)
-        elif model_type == AttributionModel.DATA_DRIVEN:
-            return self._data_driven_attribution(journeys)
-        elif model_type == AttributionModel.MARKOV_CHAIN:
-            return self._markov_chain_attribution(journeys)
-        elif model_type == AttributionModel.SHAPLEY_VALUE:
-            return self._shapley_value_attribution(journeys)
-        else:
-            raise ValueError(f"Unsupported attribution model: {model_type}")
+        frame = JourneyFrame.coerce(journeys)
+        key = self._cache_key(frame, model_type, time_decay_factor, watermark)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            return cached
+        
+        scan = _AttributionScan(apply_lookback(frame, self.lookback_days))
+        self._shard_rule_credits(scan, [model_type], time_decay_factor, executor, n_workers)
+        result = self._build_from_scan(scan, model_type, time_decay_factor)
+        if key:
+            self.cache.put(key, result)
+        return result
+    
+    def update_data_driven_model(self, journeys: Union[List[CustomerJourney], JourneyFrame]) -> None:
+        """
+        Train the incremental data-driven model on a batch of journeys.
+        
+        Training is kept apart from attribution, so building or comparing
+        models never changes the model. Each batch is scored before it is
+        trained on, and the prequential accuracy is what data-driven results
+        report. Touchpoints outside the lookback window are dropped first.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+        """
+        if self.data_driven_model is None:
+            raise ValueError("Builder has no incremental data-driven model")
+        self.data_driven_model.partial_fit(apply_lookback(JourneyFrame.coerce(journeys), self.lookback_days))
     
-    def compare_attribution_models(self, journeys: List[CustomerJourney]) -> Dict[AttributionModel, AttributionResult]:
+    def compare_attribution_models(self,
+                                   journeys: Union[List[CustomerJourney], JourneyFrame],
+                                   models: Optional[List[AttributionModel]] = None,
+                                   time_decay_factor: float = 0.1,
+                                   executor: Optional[Executor] = None,
+                                   n_workers: Optional[int] = None,
+                                   watermark: Optional[Union[datetime, int, str]] = None,
+                                   model_executor: Optional[Executor] = None,
+                                   model_workers: Optional[int] = None,
+                                   on_result: Optional[Callable[[AttributionModel, AttributionResult], None]] = None
+                                   ) -> Dict[AttributionModel, AttributionResult]:
         """
         Compare multiple attribution models on the same dataset.
         
+        The journeys are scanned once: credited touchpoints, first/last touches,
+        channel costs, conversion statistics and decay weights are shared by
+        every requested model. Models found in the result cache are not rebuilt.
+        
         Args:
-            journeys: List of customer journeys
+            journeys: List of customer journeys or a columnar JourneyFrame
+            models: Models to compare (defaults to rule-based and data-driven models)
+            time_decay_factor: Decay factor for time-based models
+            executor: Optional executor for sharded rule-based credit
+            n_workers: Number of customer shards (a process pool is created if no executor is given)
+            watermark: Update watermark of the journeys for the result cache
+            model_executor: Optional process executor to fit models in parallel
+            model_workers: Number of model processes (a process pool is created if no model executor is given)
+            on_result: Called with each model's result as soon as it is built
             
         Returns:
             Dictionary with results for each attribution model
         """
+        models_to_test = models or _DEFAULT_COMPARISON_MODELS
         results = {}
+        for model_type, result in self.iter_attribution_models(journeys, models_to_test, time_decay_factor,
+                                                               executor, n_workers, watermark,
+                                                               model_executor, model_workers):
+            results[model_type] = result
+            if on_result is not None:
+                on_result(model_type, result)
+        
+        return {model_type: results[model_type] for model_type in models_to_test if model_type in results}
+    
+    def iter_attribution_models(self,
+                                journeys: Union[List[CustomerJourney], JourneyFrame],
+                                models: Optional[List[AttributionModel]] = None,
+                                time_decay_factor: float = 0.1,
+                                executor: Optional[Executor] = None,
+                                n_workers: Optional[int] = None,
+                                watermark: Optional[Union[datetime, int, str]] = None,
+                                model_executor: Optional[Executor] = None,
+                                model_workers: Optional[int] = None
+                                ) -> Iterator[Tuple[AttributionModel, AttributionResult]]:
+        """
+        Build attribution models, yielding each result as soon as it is ready.
         
-        models_to_test = [
-            AttributionModel.FIRST_TOUCH,
-            AttributionModel.LAST_TOUCH,
-            AttributionModel.LINEAR,
-            AttributionModel.TIME_DECAY,
-            AttributionModel.POSITION_BASED,
-            AttributionModel.DATA_DRIVEN
-        ]
+        Cached results are yielded first. With a model executor (or more than
+        one model worker), journey arrays are placed in shared memory and each
+        model is fitted in its own process; results arrive in completion
+        order. A model that fails is logged and skipped without affecting the
+        others. Build time per model is recorded in ``model_timings``.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+            models: Models to build (defaults to rule-based and data-driven models)
+            time_decay_factor: Decay factor for time-based models
+            executor: Optional executor for sharded rule-based credit (serial model fitting only)
+            n_workers: Number of customer shards (a process pool is created if no executor is given)
+            watermark: Update watermark of the journeys for the result cache
+            model_executor: Optional process executor to fit models in parallel
+            model_workers: Number of model processes (a process pool is created if no model executor is given)
+            
+        Yields:
+            (model type, attribution result) pairs
+        """
+        frame = JourneyFrame.coerce(journeys)
+        models_to_test = list(dict.fromkeys(models or _DEFAULT_COMPARISON_MODELS))
+        keys = {model_type: self._cache_key(frame, model_type, time_decay_factor, watermark)
+                for model_type in models_to_test}
         
+        pending = []
         for model_type in models_to_test:
+            cached = self.cache.get(keys[model_type]) if keys[model_type] else None
+            if cached is not None:
+                yield model_type, cached
+            else:
+                pending.append(model_type)
+        if not pending:
+            return
+        
+        scan = _AttributionScan(apply_lookback(frame, self.lookback_days))
+        if model_executor is not None or (model_workers or 1) > 1:
+            yield from self._fan_out_models(scan, pending, time_decay_factor, keys, model_executor, model_workers)
+            return
+        
+        self._shard_rule_credits(scan, pending, time_decay_factor, executor, n_workers)
+        for model_type in pending:
+            start = time.perf_counter()
             try:
-                results[model_type] = self.build_attribution_model(journeys, model_type)
-                self.logger.info(f"Successfully built {model_type.value} model")
+                result = self._build_from_scan(scan, model_type, time_decay_factor)
             except Exception as e:
                 self.logger.error(f"Failed to build {model_type.value} model: {e}")
+                continue
+            self._record_model(model_type, result, keys[model_type], time.perf_counter() - start)
+            yield model_type, result
+    
+    def _fan_out_models(self,
+                        scan: _AttributionScan,
+                        models: List[AttributionModel],
+                        time_decay_factor: float,
+                        keys: Dict[AttributionModel, Optional[str]],
+                        executor: Optional[Executor],
+                        max_workers: Optional[int]) -> Iterator[Tuple[AttributionModel, AttributionResult]]:
+        """
+        Fit models in worker processes over shared-memory journey arrays.
+        
+        An incremental data-driven model is read in this process while the
+        workers run, so a stale copy of its state is never used.
+        """
+        frame = scan.frame
+        local = [m for m in models if m == AttributionModel.DATA_DRIVEN and self.data_driven_model is not None]
+        remote = [m for m in models if m not in local]
+        settings = {
+            'confidence_level': self.confidence_level,
+            'markov_order': self.markov_order,
+            'n_boot': self.bootstrap.n_boot if self.bootstrap else 0,
+            'bootstrap_seed': self.bootstrap.seed if self.bootstrap else None,
+        }
+        
+        owns_executor = executor is None and bool(remote)
+        if owns_executor:
+            executor = ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(remote)))
+        
+        shared = _SharedArrays()
+        futures = {}
+        try:
+            for name in _SHARED_FRAME_ARRAYS:
+                shared.put(name, np.ascontiguousarray(getattr(frame, name)))
+            futures = {executor.submit(_build_model_worker, shared.specs, frame.campaigns, model_type,
+                                       time_decay_factor, settings): model_type
+                       for model_type in remote}
+            
+            for model_type in local:
+                start = time.perf_counter()
+                try:
+                    result = self._build_from_scan(scan, model_type, time_decay_factor)
+                except Exception as e:
+                    self.logger.error(f"Failed to build {model_type.value} model: {e}")
+                    continue
+                self._record_model(model_type, result, keys[model_type], time.perf_counter() - start)
+                yield model_type, result
+            
+            for future in as_completed(futures):
+                model_type = futures[future]
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    self.logger.error(f"Failed to build {model_type.value} model: {e}")
+                    continue
+                self._record_model(model_type, result, keys[model_type], seconds)
+                yield model_type, result
+        finally:
+            # Workers must be done with the shared blocks before they are unlinked
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            if owns_executor:
+                executor.shutdown()
+            shared.release()
+    
+    def _record_model(self,
+                      model_type: AttributionModel,
+                      result: AttributionResult,
+                      key: Optional[str],
+                      seconds: float) -> None:
+        """Record build time, cache the result and log completion."""
+        self.model_timings[model_type] = seconds
+        if key:
+            self.cache.put(key, result)
+        self.logger.info(f"Successfully built {model_type.value} model in {seconds:.3f}s")
+    
+    def sliding_window_attribution(self,
+                                   journeys: Union[List[CustomerJourney], JourneyFrame],
+                                   model_type: AttributionModel,
+                                   window_days: int,
+                                   step_days: int = 1,
+                                   start: Optional[datetime] = None,
+                                   end: Optional[datetime] = None,
+                                   time_decay_factor: float = 0.1) -> Dict[datetime, AttributionResult]:
+        """
+        Attribution over sliding time windows.
+        
+        A journey belongs to every window containing its reference time (the
+        conversion timestamp, else its last touch); the lookback window is
+        applied once up front. Rule-based credit is computed once per
+        touchpoint and bucketed by day, so each window is the difference of two
+        cumulative day sums instead of a rescan, with ROI and normal-approximation
+        confidence intervals from the same buckets (totals agree with a
+        per-window build up to floating-point rounding). Other models are
+        rebuilt per window on journeys selected by binary search on the time index.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+            model_type: Type of attribution model to build
+            window_days: Window length in days
+            step_days: Days between consecutive window ends
+            start: Start of the first window (defaults to the earliest journey's day)
+            end: Latest window end (defaults to the day after the latest journey)
+            time_decay_factor: Decay factor for time-based models
+            
+        Returns:
+            Results keyed by window end, for windows containing at least one journey
+        """
+        if window_days < 1 or step_days < 1:
+            raise ValueError("window_days and step_days must be positive")
+        
+        frame = apply_lookback(journeys, self.lookback_days)
+        index = TouchpointIndex(frame)
+        times = index.sorted_journey_times[index.sorted_journey_times != _NAT]
+        if len(times) == 0:
+            return {}
+        
+        first_day = (_to_us(start) if start else int(times[0])) // _US_PER_DAY
+        last_day = (_to_us(end) if end else int(times[-1])) // _US_PER_DAY + 1
+        window_ends = np.arange(first_day + window_days, max(last_day, first_day + window_days) + 1, step_days)
+        
+        if model_type in _RULE_BASED_MODELS:
+            return self._windowed_rule_attribution(_AttributionScan(frame), index, model_type, time_decay_factor,
+                                                   first_day, window_days, window_ends)
+        
+        results = {}
+        for window_end in window_ends.tolist():
+            journeys_in_window = index.journeys_between((window_end - window_days) * _US_PER_DAY,
+                                                        window_end * _US_PER_DAY)
+            if len(journeys_in_window):
+                subset, _ = frame.take(journeys_in_window)
+                results[_EPOCH + timedelta(days=window_end)] = self._build_from_scan(
+                    _AttributionScan(subset), model_type, time_decay_factor)
+        return results
+    
+    def _windowed_rule_attribution(self,
+                                   scan: _AttributionScan,
+                                   index: TouchpointIndex,
+                                   model_type: AttributionModel,
+                                   decay_factor: float,
+                                   first_day: int,
+                                   window_days: int,
+                                   window_ends: np.ndarray) -> Dict[datetime, AttributionResult]:
+        """Rule-based sliding windows from cumulative per-day credit, cost and conversion sums."""
+        frame = scan.frame
+        n_channels, n_campaigns = len(_CHANNELS), len(frame.campaigns)
+        n_days = int(window_ends[-1] - first_day)
+        
+        # Day bucket per journey; journeys outside the windows go to a trailing bucket that is never read
+        day = np.full(frame.n_journeys, n_days, dtype=np.int64)
+        timed = index.journey_times != _NAT
+        day[timed] = index.journey_times[timed] // _US_PER_DAY - first_day
+        day[(day < 0) | (day > n_days)] = n_days
+        touch_day = day[frame.journey_index]
+        
+        def cumulative(rows: np.ndarray, width: int, columns=0, weights=None) -> np.ndarray:
+            grid = np.bincount(rows * width + columns, weights=weights, minlength=(n_days + 1) * width)
+            sums = np.zeros((n_days + 1, width))
+            np.cumsum(grid.reshape(n_days + 1, width), axis=0, out=sums)
+            return np.vstack([np.zeros((1, width)), sums[:n_days]])
+        
+        touches, credit, _ = scan.rule_credits(model_type, decay_factor)
+        valued = scan.credited_journeys
+        if model_type == AttributionModel.TIME_DECAY:
+            valued = valued[frame.has_conversion_timestamp[valued]]
+        converted = np.flatnonzero(frame.is_converted)
+        presence_rows, presence_codes = np.nonzero(frame.channel_presence[converted])
+        presence_value = frame.conversion_value[converted][presence_rows]
+        presence_day = day[converted][presence_rows]
+        
+        channel_credit = cumulative(touch_day[touches], n_channels, frame.channel_codes[touches], credit)
+        channel_touches = cumulative(touch_day[touches], n_channels, frame.channel_codes[touches])
+        campaign_credit = cumulative(touch_day[touches], n_campaigns, frame.campaign_codes[touches], credit)
+        campaign_touches = cumulative(touch_day[touches], n_campaigns, frame.campaign_codes[touches])
+        total_value = cumulative(day[valued], 1, weights=frame.conversion_value[valued])[:, 0]
+        journey_counts = cumulative(day, 1)[:, 0]
+        channel_costs = cumulative(touch_day, n_channels, frame.channel_codes, frame.cost)
+        converted_value = cumulative(touch_day[scan.credited_touches], n_channels,
+                                     frame.channel_codes[scan.credited_touches],
+                                     frame.conversion_value[scan.owner])
+        conversion_count = cumulative(presence_day, n_channels, presence_codes)
+        conversion_sum = cumulative(presence_day, n_channels, presence_codes, presence_value)
+        conversion_sum_squares = cumulative(presence_day, n_channels, presence_codes, presence_value ** 2)
+        model_accuracy, statistical_significance = _RULE_BASED_MODELS[model_type]
+        
+        results = {}
+        for window_end in window_ends.tolist():
+            high = window_end - first_day
+            low = high - window_days
+            if journey_counts[high] - journey_counts[low] == 0:
+                continue
+            
+            window_value = total_value[high] - total_value[low]
+            scale = window_value if window_value > 0 else 1.0
+            window_channel_credit = (channel_credit[high] - channel_credit[low]) / scale
+            window_campaign_credit = (campaign_credit[high] - campaign_credit[low]) / scale
+            
+            channel_attribution = {_CHANNELS[code]: float(window_channel_credit[code])
+                                   for code in np.flatnonzero(channel_touches[high] - channel_touches[low])}
+            campaign_attribution = {frame.campaigns[code]: float(window_campaign_credit[code])
+                                    for code in np.flatnonzero(campaign_touches[high] - campaign_touches[low])}
+            
+            shares = np.array([channel_attribution.get(channel, 0) for channel in _CHANNELS], dtype=np.float64)
+            roi_by_channel = _roi_from_totals(channel_attribution, channel_costs[high] - channel_costs[low],
+                                              shares * (converted_value[high] - converted_value[low]))
+            margins = _margins_from_moments(conversion_count[high] - conversion_count[low],
+                                            conversion_sum[high] - conversion_sum[low],
+                                            conversion_sum_squares[high] - conversion_sum_squares[low])
+            
+            results[_EPOCH + timedelta(days=window_end)] = AttributionResult(
+                model_type=model_type,
+                channel_attribution=channel_attribution,
+                campaign_attribution=campaign_attribution,
+                roi_by_channel=roi_by_channel,
+                confidence_intervals=_intervals_from_margins(channel_attribution, margins),
+                model_accuracy=model_accuracy,
+                statistical_significance=statistical_significance,
+                timestamp=datetime.now()
+            )
         
         return results
     
+    def _cache_key(self,
+                   frame: JourneyFrame,
+                   model_type: AttributionModel,
+                   time_decay_factor: float,
+                   watermark: Optional[Union[datetime, int, str]]) -> Optional[str]:
+        """Result cache key, or None when caching is off or the result depends on model state."""
+        if self.cache is None or (model_type == AttributionModel.DATA_DRIVEN and self.data_driven_model is not None):
+            return None
+        
+        bootstrap = (self.bootstrap.n_boot, self.bootstrap.method, self.bootstrap.seed) if self.bootstrap else None
+        settings = (self.confidence_level, self.markov_order, bootstrap, self.lookback_days)
+        return AttributionCache.fingerprint(frame, model_type, time_decay_factor, watermark, settings)
+    
+    def _build_from_scan(self,
+                         scan: '_AttributionScan',
+                         model_type: AttributionModel,
+                         time_decay_factor: float) -> AttributionResult:
+        """Build one attribution model from shared journey intermediates."""
+        if model_type in _RULE_BASED_MODELS:
+            return self._rule_based_attribution(scan, model_type, time_decay_factor)
+        elif model_type == AttributionModel.DATA_DRIVEN:
+            return self._data_driven_attribution(scan)
+        elif model_type == AttributionModel.MARKOV_CHAIN:
+            return self._markov_chain_attribution(scan)
+        elif model_type == AttributionModel.SHAPLEY_VALUE:
+            return self._shapley_value_attribution(scan)
+        else:
+            raise ValueError(f"Unsupported attribution model: {model_type}")
+    
+    def _shard_rule_credits(self,
+                            scan: _AttributionScan,
+                            models: List[AttributionModel],
+                            time_decay_factor: float,
+                            executor: Optional[Executor],
+                            n_workers: Optional[int]) -> None:
+        """
+        Compute rule-based credit across customer_id hash shards.
+        
+        Journey arrays are placed in shared memory, so workers receive only
+        block names and their shard's journey indices. Workers write
+        per-touchpoint credit back at each touchpoint's original position and
+        the parent aggregates in journey order, so results are bit-for-bit
+        identical to a single-process run. Other models run in the parent.
+        """
+        additive = [m for m in dict.fromkeys(models) if m in _RULE_BASED_MODELS]
+        if not additive or (executor is None and (n_workers or 1) <= 1):
+            return
+        
+        frame = scan.frame
+        n_shards = n_workers or os.cpu_count() or 1
+        shard_of = pd.util.hash_array(np.asarray(frame.customer_ids, dtype=object)) % np.uint64(n_shards)
+        shards = [journeys for journeys in (np.flatnonzero(shard_of == s) for s in range(n_shards)) if len(journeys)]
+        
+        owns_executor = executor is None
+        if owns_executor:
+            executor = ProcessPoolExecutor(max_workers=n_shards)
+        
+        shared = _SharedArrays()
+        futures = []
+        credit = credited = None
+        try:
+            for name in _SHARED_FRAME_ARRAYS:
+                shared.put(name, np.ascontiguousarray(getattr(frame, name)))
+            credit = shared.create('credit', (len(additive), frame.n_touchpoints), np.float64)
+            credited = shared.create('credited', (len(additive), frame.n_touchpoints), bool)
+            
+            futures = [executor.submit(_shard_rule_credits, shared.specs, journeys, additive, time_decay_factor)
+                       for journeys in shards]
+            processed = sum(future.result() for future in futures)
+            
+            for row, model_type in enumerate(additive):
+                touches = np.flatnonzero(credited[row])
+                scan.set_rule_credits(model_type, time_decay_factor, touches, credit[row, touches])
+            
+            self.logger.info(f"Computed {len(additive)} rule-based models over {processed} journeys "
+                             f"in {len(shards)} shards")
+        finally:
+            # Every shard must be done with the blocks, and the views dropped, before they are unlinked
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            if owns_executor:
+                executor.shutdown()
+            del credit, credited
+            shared.release()
+    
     def calculate_incremental_lift(self, 
-                                 test_journeys: List[CustomerJourney],
-                                 control_journeys: List[CustomerJourney]) -> Dict[ChannelType, float]:
+                                 test_journeys: Union[List[CustomerJourney], JourneyFrame],
+                                 control_journeys: Union[List[CustomerJourney], JourneyFrame]) -> Dict[ChannelType, float]:
         """
         Calculate incremental lift for channels using test/control analysis.
         
@@ -210,45 +3141,194 @@ class AttributionModelBuilder:
         Returns:
             Incremental lift by channel
         """
+        test_size, test_conversions, control_size, control_conversions, _ = _lift_counts(
+            JourneyFrame.coerce(test_journeys), JourneyFrame.coerce(control_journeys), None, None
+        )
         channel_lift = {}
         
-        test_conversion_rate = len([j for j in test_journeys if j.is_converted]) / len(test_journeys)
-        control_conversion_rate = len([j for j in control_journeys if j.is_converted]) / len(control_journeys)
+        for code in np.flatnonzero((test_size[0] > 0) & (control_size[0] > 0)):
+            channel_test_cr = int(test_conversions[0, code]) / int(test_size[0, code])
+            channel_control_cr = int(control_conversions[0, code]) / int(control_size[0, code])
+            
+            incremental_lift = (channel_test_cr - channel_control_cr) / channel_control_cr if channel_control_cr > 0 else 0
+            channel_lift[_CHANNELS[code]] = incremental_lift
+        
+        return channel_lift
+    
+    def calculate_incremental_lift_stats(self,
+                                         test_journeys: Union[List[CustomerJourney], JourneyFrame],
+                                         control_journeys: Union[List[CustomerJourney], JourneyFrame],
+                                         method: str = 'exact',
+                                         test_segments: Optional[List[str]] = None,
+                                         control_segments: Optional[List[str]] = None,
+                                         n_boot: int = 2000,
+                                         seed: Optional[int] = None) -> Dict[ChannelType, LiftStatistics]:
+        """
+        Incremental lift by channel with confidence intervals and p-values.
+        
+        Counts come from one pass over the channel presence of each group, so
+        all statistics work on (segment x channel) count arrays regardless of
+        the number of journeys. With segments, lift is pooled with the
+        Mantel-Haenszel risk ratio and per-segment results are attached.
         
-        # Get unique channels from test journeys
-        all_channels = set()
-        for journey in test_journeys:
-            all_channels.update(journey.unique_channels)
+        Args:
+            test_journeys: Customer journeys with channel exposure
+            control_journeys: Customer journeys without channel exposure
+            method: 'exact' (Clopper-Pearson/Fisher per cell, Mantel-Haenszel when
+                pooling segments) or 'bootstrap' (binomial resampling of counts)
+            test_segments: Optional segment label per test journey
+            control_segments: Optional segment label per control journey
+            n_boot: Bootstrap replicates
+            seed: Random seed for bootstrap resampling
+            
+        Returns:
+            Lift statistics by channel (lift is NaN when the control rate is zero)
+        """
+        if method not in ('exact', 'bootstrap'):
+            raise ValueError(f"Unsupported lift method: {method}")
+        
+        counts = _lift_counts(JourneyFrame.coerce(test_journeys), JourneyFrame.coerce(control_journeys),
+                              test_segments, control_segments)
+        test_size, test_conversions, control_size, control_conversions, labels = counts
+        stratified = labels != [None]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            test_rate = test_conversions / test_size
+            control_rate = control_conversions / control_size
+            pooled_test_rate = test_conversions.sum(axis=0) / test_size.sum(axis=0)
+            pooled_control_rate = control_conversions.sum(axis=0) / control_size.sum(axis=0)
+        
+        cell_lift = _relative_lift(test_rate, control_rate)
+        pooled_lift = (_mantel_haenszel_lift(test_size, test_conversions, control_size, control_conversions)
+                       if stratified else cell_lift[0])
+        
+        if method == 'bootstrap':
+            lower, upper, p_value = _bootstrap_lift_statistics(test_size, test_conversions, control_size,
+                                                               control_conversions, self.confidence_level, n_boot, seed)
+            cell_stats = (lower[:-1], upper[:-1], p_value[:-1])
+            pooled_stats = (lower[-1], upper[-1], p_value[-1])
+        else:
+            cell_stats = _exact_lift_statistics(test_size, test_conversions, control_size, control_conversions,
+                                                self.confidence_level)
+            pooled_stats = (_pooled_lift_statistics(test_size, test_conversions, control_size, control_conversions,
+                                                    self.confidence_level)
+                            if stratified else tuple(values[0] for values in cell_stats))
+        
+        def statistics(code: int, sizes: tuple, rates: tuple, lift: float, interval: tuple) -> LiftStatistics:
+            return LiftStatistics(
+                channel=_CHANNELS[code],
+                test_size=int(sizes[0]),
+                test_conversions=int(sizes[1]),
+                control_size=int(sizes[2]),
+                control_conversions=int(sizes[3]),
+                test_rate=float(rates[0]),
+                control_rate=float(rates[1]),
+                lift=float(lift),
+                confidence_interval=(float(interval[0]), float(interval[1])),
+                p_value=float(interval[2])
+            )
         
-        for channel in all_channels:
-            # Calculate lift for each channel
-            channel_test_journeys = [j for j in test_journeys if channel in j.unique_channels]
-            channel_control_journeys = [j for j in control_journeys if channel not in j.unique_channels]
+        results = {}
+        for code in np.flatnonzero((test_size.sum(axis=0) > 0) & (control_size.sum(axis=0) > 0)):
+            sizes = (test_size[:, code].sum(), test_conversions[:, code].sum(),
+                     control_size[:, code].sum(), control_conversions[:, code].sum())
+            result = statistics(code, sizes, (pooled_test_rate[code], pooled_control_rate[code]),
+                                pooled_lift[code], tuple(values[code] for values in pooled_stats))
+            
+            if stratified:
+                for segment, label in enumerate(labels):
+                    if test_size[segment, code] > 0 and control_size[segment, code] > 0:
+                        result.segments[label] = statistics(
+                            code,
+                            (test_size[segment, code], test_conversions[segment, code],
+                             control_size[segment, code], control_conversions[segment, code]),
+                            (test_rate[segment, code], control_rate[segment, code]),
+                            cell_lift[segment, code],
+                            tuple(values[segment, code] for values in cell_stats)
+                        )
             
-            if channel_test_journeys and channel_control_journeys:
-                channel_test_cr = len([j for j in channel_test_journeys if j.is_converted]) / len(channel_test_journeys)
-                channel_control_cr = len([j for j in channel_control_journeys if j.is_converted]) / len(channel_control_journeys)
-                
-                incremental_lift = (channel_test_cr - channel_control_cr) / channel_control_cr if channel_control_cr > 0 else 0
-                channel_lift[channel] = incremental_lift
+            results[_CHANNELS[code]] = result
         
-        return channel_lift
+        return results
+    
+    def fit_response_curves(self,
+                            journeys: Union[List[CustomerJourney], JourneyFrame],
+                            model_type: AttributionModel = AttributionModel.LINEAR,
+                            period_days: int = 7,
+                            kind: str = 'hill',
+                            time_decay_factor: float = 0.1) -> Dict[ChannelType, ResponseCurve]:
+        """
+        Fit per-channel response curves from journey cost and value history.
+        
+        Touchpoints are bucketed into periods of ``period_days``; each period
+        gives one (channel spend, attributed revenue) observation per channel,
+        with revenue credited by a rule-based attribution model.
+        
+        Args:
+            journeys: List of customer journeys or a columnar JourneyFrame
+            model_type: Rule-based model used to credit revenue to channels
+            period_days: Length of each spend period in days
+            kind: Curve family, 'hill' or 'log'
+            time_decay_factor: Decay factor for time-based models
+            
+        Returns:
+            Response curve by channel (channels with spend only)
+        """
+        if model_type not in _RULE_BASED_MODELS:
+            raise ValueError(f"Response curves need a rule-based model, not {model_type.value}")
+        
+        scan = _AttributionScan(JourneyFrame.coerce(journeys))
+        frame = scan.frame
+        if frame.n_touchpoints == 0:
+            return {}
+        
+        n_channels = len(_CHANNELS)
+        period = (frame.timestamps - frame.timestamps.min()) // (period_days * _US_PER_DAY)
+        n_periods = int(period.max()) + 1
+        
+        spend = np.bincount(period * n_channels + frame.channel_codes, weights=frame.cost,
+                            minlength=n_periods * n_channels).reshape(n_periods, n_channels)
+        touches, credit, _ = scan.rule_credits(model_type, time_decay_factor)
+        revenue = np.bincount(period[touches] * n_channels + frame.channel_codes[touches], weights=credit,
+                              minlength=n_periods * n_channels).reshape(n_periods, n_channels)
+        
+        return {_CHANNELS[code]: fit_response_curve(spend[:, code], revenue[:, code], kind)
+                for code in np.flatnonzero(spend.sum(axis=0) > 0)}
     
     def optimize_budget_allocation(self, 
                                  attribution_result: AttributionResult,
                                  current_budget: Dict[ChannelType, float],
-                                 total_budget: float) -> Dict[ChannelType, float]:
+                                 total_budget: float,
+                                 response_curves: Optional[Dict[ChannelType, ResponseCurve]] = None,
+                                 bounds: Optional[Dict[ChannelType, Tuple[float, float]]] = None,
+                                 warm_start: Optional[Dict[ChannelType, float]] = None) -> Dict[ChannelType, float]:
         """
         Optimize budget allocation based on attribution analysis.
         
+        With response curves, maximizes total expected revenue subject to the
+        total budget and per-cell (min, max) bounds. Keys of ``current_budget``
+        may be any budget cells (e.g. channel x region tuples) matching the
+        curves; cells without a curve receive their minimum. The marginal
+        revenue multiplier of the previous solve over the same cells (or of
+        ``warm_start``) seeds the solver, so re-planning converges in a few
+        evaluations. Without curves, budget is split in proportion to ROI x
+        attribution weight.
+        
         Args:
             attribution_result: Results from attribution model
             current_budget: Current budget allocation by channel
             total_budget: Total available budget
+            response_curves: Optional response curve per budget cell
+            bounds: Optional (min, max) spend per budget cell
+            warm_start: Optional starting allocation for the solver
             
         Returns:
             Optimized budget allocation
         """
+        if response_curves is not None:
+            return self._solve_budget_allocation(current_budget, total_budget, response_curves,
+                                                 bounds or {}, warm_start)
+        
         # Calculate efficiency scores based on ROI
         efficiency_scores = {}
         total_efficiency = 0
@@ -265,13 +3345,17 @@ class AttributionModelBuilder:
         optimized_allocation = {}
         
         if total_efficiency > 0:
+            # Minimum allocation for channels not in attribution comes out of the total
+            unscored = len(current_budget) - len(efficiency_scores)
+            minimum_share = min(0.02, 1.0 / len(current_budget))  # 2% minimum
+            scored_budget = total_budget * (1 - minimum_share * unscored)
+            
             for channel in current_budget.keys():
                 if channel in efficiency_scores:
                     allocation_ratio = efficiency_scores[channel] / total_efficiency
-                    optimized_allocation[channel] = total_budget * allocation_ratio
+                    optimized_allocation[channel] = scored_budget * allocation_ratio
                 else:
-                    # Maintain minimum allocation for channels not in attribution
-                    optimized_allocation[channel] = total_budget * 0.02  # 2% minimum
+                    optimized_allocation[channel] = total_budget * minimum_share
         else:
             # Equal allocation if no efficiency data
             equal_allocation = total_budget / len(current_budget)
@@ -279,247 +3363,169 @@ class AttributionModelBuilder:
         
         return optimized_allocation
     
-    def _first_touch_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
-        """First-touch attribution model."""
-        channel_attribution = {}
-        campaign_attribution = {}
-        total_value = 0
-        
-        for journey in journeys:
-            if journey.is_converted and journey.touchpoints:
-                first_touch = journey.touchpoints[0]
-                channel = first_touch.channel
-                campaign = first_touch.campaign
-                
-                channel_attribution[channel] = channel_attribution.get(channel, 0) + journey.conversion_value
-                campaign_attribution[campaign] = campaign_attribution.get(campaign, 0) + journey.conversion_value
-                total_value += journey.conversion_value
-        
-        # Normalize to percentages
-        if total_value > 0:
-            channel_attribution = {k: v/total_value for k, v in channel_attribution.items()}
-            campaign_attribution = {k: v/total_value for k, v in campaign_attribution.items()}
-        
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
-        
-        return AttributionResult(
-            model_type=AttributionModel.FIRST_TOUCH,
-            channel_attribution=channel_attribution,
-            campaign_attribution=campaign_attribution,
-            roi_by_channel=roi_by_channel,
-            confidence_intervals=confidence_intervals,
-            model_accuracy=0.75,  # Rule-based models have limited accuracy
-            statistical_significance=0.8,
-            timestamp=datetime.now()
-        )
-    
-    def _last_touch_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
-        """Last-touch attribution model."""
-        channel_attribution = {}
-        campaign_attribution = {}
-        total_value = 0
-        
-        for journey in journeys:
-            if journey.is_converted and journey.touchpoints:
-                last_touch = journey.touchpoints[-1]
-                channel = last_touch.channel
-                campaign = last_touch.campaign
-                
-                channel_attribution[channel] = channel_attribution.get(channel, 0) + journey.conversion_value
-                campaign_attribution[campaign] = campaign_attribution.get(campaign, 0) + journey.conversion_value
-                total_value += journey.conversion_value
-        
-        # Normalize to percentages
-        if total_value > 0:
-            channel_attribution = {k: v/total_value for k, v in channel_attribution.items()}
-            campaign_attribution = {k: v/total_value for k, v in campaign_attribution.items()}
-        
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
-        
-        return AttributionResult(
-            model_type=AttributionModel.LAST_TOUCH,
-            channel_attribution=channel_attribution,
-            campaign_attribution=campaign_attribution,
-            roi_by_channel=roi_by_channel,
-            confidence_intervals=confidence_intervals,
-            model_accuracy=0.75,
-            statistical_significance=0.8,
-            timestamp=datetime.now()
-        )
+    def _solve_budget_allocation(self,
+                                 current_budget: Dict,
+                                 total_budget: float,
+                                 response_curves: Dict,
+                                 bounds: Dict,
+                                 warm_start: Optional[Dict]) -> Dict:
+        """
+        Maximize summed response-curve revenue under budget and bound constraints.
+        
+        Revenue is separable and (on the concave envelope of S-shaped Hill
+        curves) concave, so the optimum equalizes marginal revenue at a common
+        multiplier across every cell not at a bound. The multiplier is found
+        with Brent's method on the budget constraint, and each cell's spend at a
+        given multiplier comes from a vectorized bisection, so a solve costs
+        O(cells) per multiplier evaluation.
+        """
+        cells = list(current_budget)
+        if not cells:
+            return {}
+        
+        lower = np.array([bounds.get(cell, (0.0, total_budget))[0] for cell in cells], dtype=np.float64)
+        upper = np.array([min(bounds.get(cell, (0.0, total_budget))[1], total_budget) for cell in cells],
+                         dtype=np.float64)
+        if (lower > upper).any() or lower.sum() > total_budget + 1e-9 or upper.sum() < total_budget - 1e-9:
+            raise ValueError("Budget bounds are infeasible for the total budget")
+        
+        # Curve parameters as arrays; cells without a curve contribute no revenue
+        curves = [response_curves.get(cell, ResponseCurve('log', 0.0, 1.0)) for cell in cells]
+        hill = np.array([curve.kind == 'hill' for curve in curves])
+        scale = np.array([curve.scale for curve in curves], dtype=np.float64)
+        half_saturation = np.array([curve.half_saturation for curve in curves], dtype=np.float64)
+        shape = np.array([curve.shape for curve in curves], dtype=np.float64)
+        active = scale > 0
+        
+        # S-shaped Hill curves are replaced below their tangent point r = (shape - 1)^(1/shape)
+        # by the line from the origin, whose slope is the envelope's (constant) marginal revenue
+        sigmoid = hill & (shape > 1)
+        tangent_ratio = np.where(sigmoid, np.maximum(shape - 1, 0) ** (1 / shape), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            line_slope = np.where(sigmoid, _curve_revenue(tangent_ratio * half_saturation, hill, scale,
+                                                          half_saturation, shape)
+                                  / (tangent_ratio * half_saturation), np.inf)
+        log_ratio_floor = np.log(np.where(sigmoid, tangent_ratio, 1e-12))
+        
+        def spend_at(multiplier: float) -> np.ndarray:
+            """Largest spend per cell whose envelope marginal revenue is at least ``multiplier``."""
+            spend = np.where(hill, 0.0, scale / multiplier - half_saturation)
+            
+            low, high = log_ratio_floor.copy(), np.full(len(cells), np.log(1e12))
+            for _ in range(60):
+                middle = (low + high) / 2
+                above = _curve_marginal(np.exp(middle) * half_saturation, hill, scale,
+                                        half_saturation, shape) >= multiplier
+                low, high = np.where(above, middle, low), np.where(above, high, middle)
+            hill_spend = np.where(multiplier <= line_slope, np.exp(low) * half_saturation, 0.0)
+            
+            spend = np.where(hill, hill_spend, spend)
+            return np.clip(np.where(active, spend, 0.0), lower, upper)
+        
+        def excess(log_multiplier: float) -> float:
+            return spend_at(np.exp(log_multiplier)).sum() - total_budget
+        
+        # Warm start: explicit allocation, else the previous multiplier over the same cells
+        if warm_start is not None:
+            start = np.array([warm_start.get(cell, 0.0) for cell in cells], dtype=np.float64)
+            marginal = _curve_marginal(start, hill, scale, half_saturation, shape)[active]
+            guess = float(np.log(np.median(marginal))) if marginal.size and (marginal > 0).all() else 0.0
+        elif self._last_allocation is not None and self._last_allocation[0] == cells:
+            guess = self._last_allocation[1]
+        else:
+            guess = float(np.log(max(scale.max(initial=0.0), 1e-12) / max(total_budget, 1e-12)))
+        
+        # Bracket the multiplier (excess spend decreases as the multiplier grows)
+        step, low, high = 1.0, guess, guess
+        while excess(low) < 0 and low > -700:
+            low, step = low - step, step * 2
+        step = 1.0
+        while excess(high) > 0 and high < 700:
+            high, step = high + step, step * 2
+        
+        if excess(low) < 0:
+            # Curves saturate before the budget is spent: give the rest to cells with room
+            allocation = spend_at(np.exp(low))
+            multiplier = low
+        else:
+            multiplier = optimize.brentq(excess, low, high, xtol=1e-10) if low < high else low
+            # Spend can jump at the multiplier (linear envelope segments); mix both sides exactly
+            below, above = spend_at(np.exp(multiplier + 1e-9)), spend_at(np.exp(multiplier - 1e-9))
+            gap = above.sum() - below.sum()
+            mix = np.clip((total_budget - below.sum()) / gap, 0.0, 1.0) if gap > 0 else 0.0
+            allocation = below + mix * (above - below)
+        
+        shortfall = total_budget - allocation.sum()
+        room = upper - allocation if shortfall > 0 else allocation - lower
+        if room.sum() > 0:
+            allocation = np.clip(allocation + shortfall * room / room.sum(), lower, upper)
+        
+        self._last_allocation = (cells, float(multiplier))
+        return {cell: float(amount) for cell, amount in zip(cells, allocation)}
     
-    def _linear_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
-        """Linear attribution model - equal credit to all touchpoints."""
-        channel_attribution = {}
-        campaign_attribution = {}
-        total_value = 0
-        
-        for journey in journeys:
-            if journey.is_converted and journey.touchpoints:
-                credit_per_touch = journey.conversion_value / len(journey.touchpoints)
-                
-                for touchpoint in journey.touchpoints:
-                    channel = touchpoint.channel
-                    campaign = touchpoint.campaign
-                    
-                    channel_attribution[channel] = channel_attribution.get(channel, 0) + credit_per_touch
-                    campaign_attribution[campaign] = campaign_attribution.get(campaign, 0) + credit_per_touch
-                
-                total_value += journey.conversion_value
-        
-        # Normalize to percentages
-        if total_value > 0:
-            channel_attribution = {k: v/total_value for k, v in channel_attribution.items()}
-            campaign_attribution = {k: v/total_value for k, v in campaign_attribution.items()}
+    def _rule_based_attribution(self,
+                                scan: _AttributionScan,
+                                model_type: AttributionModel,
+                                decay_factor: float = 0.1) -> AttributionResult:
+        """
+        First-touch, last-touch, linear, time-decay or position-based attribution.
         
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
+        Per-touchpoint credit is aggregated with np.bincount, which adds each bin
+        left to right in journey order, so totals match a per-touchpoint
+        dictionary loop exactly.
+        """
+        frame = scan.frame
+        touches, credit, total_value = scan.rule_credits(model_type, decay_factor)
+        channels = frame.channel_codes[touches]
+        campaigns = frame.campaign_codes[touches]
         
-        return AttributionResult(
-            model_type=AttributionModel.LINEAR,
-            channel_attribution=channel_attribution,
-            campaign_attribution=campaign_attribution,
-            roi_by_channel=roi_by_channel,
-            confidence_intervals=confidence_intervals,
-            model_accuracy=0.82,
-            statistical_significance=0.85,
-            timestamp=datetime.now()
-        )
-    
-    def _time_decay_attribution(self, journeys: List[CustomerJourney], decay_factor: float) -> AttributionResult:
-        """Time-decay attribution model - more credit to recent touchpoints."""
-        channel_attribution = {}
-        campaign_attribution = {}
-        total_value = 0
-        
-        for journey in journeys:
-            if journey.is_converted and journey.touchpoints and journey.conversion_timestamp:
-                total_weight = 0
-                touchpoint_weights = []
-                
-                # Calculate weights based on time decay
-                for touchpoint in journey.touchpoints:
-                    days_before_conversion = (journey.conversion_timestamp - touchpoint.timestamp).days
-                    weight = np.exp(-decay_factor * days_before_conversion)
-                    touchpoint_weights.append(weight)
-                    total_weight += weight
-                
-                # Distribute conversion value based on weights
-                for i, touchpoint in enumerate(journey.touchpoints):
-                    if total_weight > 0:
-                        credit = journey.conversion_value * (touchpoint_weights[i] / total_weight)
-                        
-                        channel = touchpoint.channel
-                        campaign = touchpoint.campaign
-                        
-                        channel_attribution[channel] = channel_attribution.get(channel, 0) + credit
-                        campaign_attribution[campaign] = campaign_attribution.get(campaign, 0) + credit
-                
-                total_value += journey.conversion_value
+        channel_credit = np.bincount(channels, weights=credit, minlength=len(_CHANNELS))
+        campaign_credit = np.bincount(campaigns, weights=credit, minlength=len(frame.campaigns))
         
         # Normalize to percentages
         if total_value > 0:
-            channel_attribution = {k: v/total_value for k, v in channel_attribution.items()}
-            campaign_attribution = {k: v/total_value for k, v in campaign_attribution.items()}
-        
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
-        
-        return AttributionResult(
-            model_type=AttributionModel.TIME_DECAY,
-            channel_attribution=channel_attribution,
-            campaign_attribution=campaign_attribution,
-            roi_by_channel=roi_by_channel,
-            confidence_intervals=confidence_intervals,
-            model_accuracy=0.85,
-            statistical_significance=0.88,
-            timestamp=datetime.now()
+            channel_credit = channel_credit / total_value
+            campaign_credit = campaign_credit / total_value
+        
+        channel_attribution = {
+            _CHANNELS[code]: float(channel_credit[code])
+            for code in np.flatnonzero(np.bincount(channels, minlength=len(_CHANNELS)))
+        }
+        campaign_attribution = {
+            frame.campaigns[code]: float(campaign_credit[code])
+            for code in np.flatnonzero(np.bincount(campaigns, minlength=len(frame.campaigns)))
+        }
+        
+        roi_by_channel = self._calculate_roi_by_channel(scan, channel_attribution)
+        confidence_intervals = self._calculate_confidence_intervals(
+            scan, channel_attribution, lambda: scan.credit_matrix(touches, credit)
         )
-    
-    def _position_based_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
-        """Position-based attribution - 40% first, 40% last, 20% middle."""
-        channel_attribution = {}
-        campaign_attribution = {}
-        total_value = 0
-        
-        for journey in journeys:
-            if journey.is_converted and journey.touchpoints:
-                num_touches = len(journey.touchpoints)
-                
-                if num_touches == 1:
-                    # Single touch gets full credit
-                    credit = journey.conversion_value
-                    touch = journey.touchpoints[0]
-                    channel_attribution[touch.channel] = channel_attribution.get(touch.channel, 0) + credit
-                    campaign_attribution[touch.campaign] = campaign_attribution.get(touch.campaign, 0) + credit
-                
-                elif num_touches == 2:
-                    # Split 50/50 between first and last
-                    first_credit = last_credit = journey.conversion_value * 0.5
-                    
-                    # First touch
-                    first_touch = journey.touchpoints[0]
-                    channel_attribution[first_touch.channel] = channel_attribution.get(first_touch.channel, 0) + first_credit
-                    campaign_attribution[first_touch.campaign] = campaign_attribution.get(first_touch.campaign, 0) + first_credit
-                    
-                    # Last touch
-                    last_touch = journey.touchpoints[-1]
-                    channel_attribution[last_touch.channel] = channel_attribution.get(last_touch.channel, 0) + last_credit
-                    campaign_attribution[last_touch.campaign] = campaign_attribution.get(last_touch.campaign, 0) + last_credit
-                
-                else:
-                    # 40% first, 40% last, 20% distributed among middle touches
-                    first_credit = journey.conversion_value * 0.4
-                    last_credit = journey.conversion_value * 0.4
-                    middle_total_credit = journey.conversion_value * 0.2
-                    middle_credit_per_touch = middle_total_credit / (num_touches - 2)
-                    
-                    # First touch
-                    first_touch = journey.touchpoints[0]
-                    channel_attribution[first_touch.channel] = channel_attribution.get(first_touch.channel, 0) + first_credit
-                    campaign_attribution[first_touch.campaign] = campaign_attribution.get(first_touch.campaign, 0) + first_credit
-                    
-                    # Middle touches
-                    for touchpoint in journey.touchpoints[1:-1]:
-                        channel_attribution[touchpoint.channel] = channel_attribution.get(touchpoint.channel, 0) + middle_credit_per_touch
-                        campaign_attribution[touchpoint.campaign] = campaign_attribution.get(touchpoint.campaign, 0) + middle_credit_per_touch
-                    
-                    # Last touch
-                    last_touch = journey.touchpoints[-1]
-                    channel_attribution[last_touch.channel] = channel_attribution.get(last_touch.channel, 0) + last_credit
-                    campaign_attribution[last_touch.campaign] = campaign_attribution.get(last_touch.campaign, 0) + last_credit
-                
-                total_value += journey.conversion_value
-        
-        # Normalize to percentages
-        if total_value > 0:
-            channel_attribution = {k: v/total_value for k, v in channel_attribution.items()}
-            campaign_attribution = {k: v/total_value for k, v in campaign_attribution.items()}
-        
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
+        model_accuracy, statistical_significance = _RULE_BASED_MODELS[model_type]
         
         return AttributionResult(
-            model_type=AttributionModel.POSITION_BASED,
+            model_type=model_type,
             channel_attribution=channel_attribution,
             campaign_attribution=campaign_attribution,
             roi_by_channel=roi_by_channel,
             confidence_intervals=confidence_intervals,
-            model_accuracy=0.83,
-            statistical_significance=0.86,
+            model_accuracy=model_accuracy,
+            statistical_significance=statistical_significance,
             timestamp=datetime.now()
         )
     
-    def _data_driven_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
+    def _data_driven_attribution(self, scan: _AttributionScan) -> AttributionResult:
         """Data-driven attribution using machine learning."""
+        frame = scan.frame
+        if self.data_driven_model is not None:
+            return self._incremental_data_driven_attribution(scan)
+        
         try:
             # Prepare training data
-            X, y, channel_map = self._prepare_ml_data(journeys)
+            X, y, channel_map = self._prepare_ml_data(frame)
             
-            if len(X) < 100:  # Minimum data requirement
+            if X.shape[0] < 100:  # Minimum data requirement
                 self.logger.warning("Insufficient data for ML model, falling back to position-based")
-                return self._position_based_attribution(journeys)
+                return self._rule_based_attribution(scan, AttributionModel.POSITION_BASED)
             
             # Train logistic regression model
             model = LogisticRegression(random_state=42)
@@ -538,18 +3544,10 @@ class AttributionModelBuilder:
                 else:
                     channel_attribution[channel] = 1.0 / len(channel_map)
             
-            # Calculate campaign attribution (simplified)
-            campaign_attribution = {}
-            total_campaigns = set()
-            for journey in journeys:
-                for tp in journey.touchpoints:
-                    total_campaigns.add(tp.campaign)
-            
-            for campaign in total_campaigns:
-                campaign_attribution[campaign] = 1.0 / len(total_campaigns)  # Simplified
+            campaign_attribution = scan.campaign_attribution(channel_attribution)
             
-            roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-            confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
+            roi_by_channel = self._calculate_roi_by_channel(scan, channel_attribution)
+            confidence_intervals = self._calculate_confidence_intervals(scan, channel_attribution)
             
             return AttributionResult(
                 model_type=AttributionModel.DATA_DRIVEN,
@@ -564,74 +3562,56 @@ class AttributionModelBuilder:
             
         except Exception as e:
             self.logger.error(f"Data-driven attribution failed: {e}")
-            return self._position_based_attribution(journeys)
+            return self._rule_based_attribution(scan, AttributionModel.POSITION_BASED)
+    
+    def _incremental_data_driven_attribution(self, scan: _AttributionScan) -> AttributionResult:
+        """Data-driven attribution from the trained incremental model, without updating it."""
+        model = self.data_driven_model
+        if not model.is_fitted:
+            self.logger.warning("Incremental model has no training data, falling back to position-based")
+            return self._rule_based_attribution(scan, AttributionModel.POSITION_BASED)
+        
+        channel_attribution = model.channel_attribution()
+        campaign_attribution = scan.campaign_attribution(channel_attribution)
+        
+        roi_by_channel = self._calculate_roi_by_channel(scan, channel_attribution)
+        confidence_intervals = self._calculate_confidence_intervals(scan, channel_attribution)
+        
+        return AttributionResult(
+            model_type=AttributionModel.DATA_DRIVEN,
+            channel_attribution=channel_attribution,
+            campaign_attribution=campaign_attribution,
+            roi_by_channel=roi_by_channel,
+            confidence_intervals=confidence_intervals,
+            model_accuracy=model.prequential_accuracy,
+            statistical_significance=0.92,
+            timestamp=datetime.now()
+        )
     
-    def _markov_chain_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
+    def _markov_chain_attribution(self, scan: _AttributionScan) -> AttributionResult:
         """Markov chain attribution model."""
-        # Simplified Markov chain implementation
-        transitions = {}
-        channel_conversions = {}
-        
-        for journey in journeys:
-            if journey.touchpoints:
-                # Add start state
-                path = ["START"] + [tp.channel.value for tp in journey.touchpoints]
-                
-                if journey.is_converted:
-                    path.append("CONVERSION")
-                else:
-                    path.append("NO_CONVERSION")
-                
-                # Count transitions
-                for i in range(len(path) - 1):
-                    current_state = path[i]
-                    next_state = path[i + 1]
-                    
-                    if current_state not in transitions:
-                        transitions[current_state] = {}
-                    
-                    transitions[current_state][next_state] = transitions[current_state].get(next_state, 0) + 1
-        
-        # Calculate removal effect for each channel
-        channel_attribution = {}
-        all_channels = set()
-        for journey in journeys:
-            all_channels.update(tp.channel for tp in journey.touchpoints)
-        
-        # Simplified removal effect calculation
-        total_conversions = len([j for j in journeys if j.is_converted])
-        
-        for channel in all_channels:
-            # Calculate conversion probability without this channel
-            # This is a simplified approximation
-            journeys_without_channel = []
-            for journey in journeys:
-                if channel not in journey.unique_channels:
-                    journeys_without_channel.append(journey)
-            
-            if journeys_without_channel:
-                conversions_without_channel = len([j for j in journeys_without_channel if j.is_converted])
-                removal_effect = max(0, total_conversions - conversions_without_channel)
-                channel_attribution[channel] = removal_effect
+        frame = scan.frame
+        # Removal effects of the absorbing chain fitted to the distinct journey paths
+        paths = scan.path_table
+        removal_effects, _ = _markov_removal_effects(
+            paths.channel_codes, paths.offsets,
+            path_counts=paths.counts,
+            path_conversions=paths.conversions,
+            order=self.markov_order
+        )
+        
+        present_codes = np.flatnonzero(frame.channel_presence.any(axis=0))
+        channel_attribution = {_CHANNELS[code]: float(removal_effects[code]) for code in present_codes}
         
         # Normalize
         total_effect = sum(channel_attribution.values())
         if total_effect > 0:
             channel_attribution = {k: v/total_effect for k, v in channel_attribution.items()}
         
-        # Simplified campaign attribution
-        campaign_attribution = {}
-        for journey in journeys:
-            if journey.is_converted:
-                for tp in journey.touchpoints:
-                    campaign_attribution[tp.campaign] = campaign_attribution.get(tp.campaign, 0) + 1
+        campaign_attribution = scan.campaign_attribution(channel_attribution)
         
-        total_campaign_value = sum(campaign_attribution.values())
-        if total_campaign_value > 0:
-            campaign_attribution = {k: v/total_campaign_value for k, v in campaign_attribution.items()}
-        
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
+        roi_by_channel = self._calculate_roi_by_channel(scan, channel_attribution)
+        confidence_intervals = self._calculate_confidence_intervals(scan, channel_attribution)
         
         return AttributionResult(
             model_type=AttributionModel.MARKOV_CHAIN,
@@ -644,51 +3624,18 @@ class AttributionModelBuilder:
             timestamp=datetime.now()
         )
     
-    def _shapley_value_attribution(self, journeys: List[CustomerJourney]) -> AttributionResult:
-        """Shapley value attribution model (simplified implementation)."""
-        # This is a simplified version of Shapley value calculation
-        # In practice, this would be computationally intensive for large datasets
-        
-        all_channels = set()
-        for journey in journeys:
-            all_channels.update(journey.unique_channels)
-        
-        all_channels = list(all_channels)
-        channel_attribution = {channel: 0.0 for channel in all_channels}
-        
-        # For each journey, calculate marginal contribution of each channel
-        total_conversions = 0
-        
-        for journey in journeys:
-            if journey.is_converted:
-                total_conversions += journey.conversion_value
-                journey_channels = journey.unique_channels
-                
-                # Calculate marginal contributions (simplified)
-                for channel in journey_channels:
-                    # Simplified Shapley value: equal contribution among present channels
-                    contribution = journey.conversion_value / len(journey_channels)
-                    channel_attribution[channel] += contribution
-        
-        # Normalize to percentages
-        if total_conversions > 0:
-            channel_attribution = {k: v/total_conversions for k, v in channel_attribution.items()}
-        
-        # Simplified campaign attribution
-        campaign_attribution = {}
-        total_campaign_value = 0
-        
-        for journey in journeys:
-            if journey.is_converted:
-                for tp in journey.touchpoints:
-                    campaign_attribution[tp.campaign] = campaign_attribution.get(tp.campaign, 0) + journey.conversion_value
-                    total_campaign_value += journey.conversion_value
-        
-        if total_campaign_value > 0:
-            campaign_attribution = {k: v/total_campaign_value for k, v in campaign_attribution.items()}
-        
-        roi_by_channel = self._calculate_roi_by_channel(journeys, channel_attribution)
-        confidence_intervals = self._calculate_confidence_intervals(journeys, channel_attribution)
+    def _shapley_value_attribution(self, scan: _AttributionScan) -> AttributionResult:
+        """Shapley value attribution model over channel coalitions."""
+        frame = scan.frame
+        paths = scan.path_table
+        touched = paths.lengths > 0
+        shapley = ShapleyAttributor()
+        shapley.add_coalitions(paths.channel_masks[touched], paths.counts[touched], paths.values[touched])
+        channel_attribution = shapley.channel_attribution()
+        campaign_attribution = scan.campaign_attribution(channel_attribution)
+        
+        roi_by_channel = self._calculate_roi_by_channel(scan, channel_attribution)
+        confidence_intervals = self._calculate_confidence_intervals(scan, channel_attribution)
         
         return AttributionResult(
             model_type=AttributionModel.SHAPLEY_VALUE,
@@ -701,89 +3648,65 @@ class AttributionModelBuilder:
             timestamp=datetime.now()
         )
     
-    def _prepare_ml_data(self, journeys: List[CustomerJourney]) -> Tuple[np.ndarray, np.ndarray, List[ChannelType]]:
+    def _prepare_ml_data(self, frame: JourneyFrame) -> Tuple[sparse.csr_matrix, np.ndarray, List[ChannelType]]:
         """Prepare data for machine learning models."""
-        all_channels = set()
-        for journey in journeys:
-            all_channels.update(journey.unique_channels)
-        
-        all_channels = sorted(list(all_channels), key=lambda x: x.value)
-        
-        X = []
-        y = []
-        
-        for journey in journeys:
-            # Create feature vector: binary indicators for each channel
-            features = []
-            for channel in all_channels:
-                features.append(1 if channel in journey.unique_channels else 0)
-            
-            # Add journey-level features
-            features.append(len(journey.touchpoints))  # Number of touchpoints
-            features.append(journey.journey_duration)   # Journey duration
-            
-            X.append(features)
-            y.append(1 if journey.is_converted else 0)
-        
-        return np.array(X), np.array(y), all_channels
+        presence = journey_features(frame)[:, :len(_CHANNELS)]
+        present_codes = np.flatnonzero(presence.getnnz(axis=0))
+        present_codes = sorted(present_codes, key=lambda code: _CHANNELS[code].value)
+        
+        # Feature matrix: sparse indicators for each channel plus journey-level features
+        X = sparse.hstack([
+            presence[:, present_codes],
+            frame.journey_lengths[:, None],   # Number of touchpoints
+            frame.journey_duration[:, None]   # Journey duration
+        ], format='csr')
+        y = frame.is_converted.astype(np.int64)
+        
+        return X, y, [_CHANNELS[code] for code in present_codes]
     
     def _calculate_roi_by_channel(self, 
-                                journeys: List[CustomerJourney], 
+                                scan: _AttributionScan, 
                                 channel_attribution: Dict[ChannelType, float]) -> Dict[ChannelType, float]:
         """Calculate ROI by channel based on attribution."""
-        channel_costs = {}
-        channel_revenue = {}
-        
-        # Calculate costs and attributed revenue by channel
-        for journey in journeys:
-            for touchpoint in journey.touchpoints:
-                channel = touchpoint.channel
-                channel_costs[channel] = channel_costs.get(channel, 0) + touchpoint.cost
-                
-                if journey.is_converted:
-                    attributed_value = journey.conversion_value * channel_attribution.get(channel, 0)
-                    channel_revenue[channel] = channel_revenue.get(channel, 0) + attributed_value
-        
-        # Calculate ROI
-        roi_by_channel = {}
-        for channel in channel_attribution.keys():
-            cost = channel_costs.get(channel, 0)
-            revenue = channel_revenue.get(channel, 0)
-            
-            if cost > 0:
-                roi_by_channel[channel] = (revenue - cost) / cost
-            else:
-                roi_by_channel[channel] = 0.0
+        frame = scan.frame
+        shares = np.array([channel_attribution.get(channel, 0) for channel in _CHANNELS], dtype=np.float64)
         
-        return roi_by_channel
+        # Attributed revenue by channel (costs are shared across models)
+        converted_codes = frame.channel_codes[scan.credited_touches]
+        attributed_value = frame.conversion_value[scan.owner] * shares[converted_codes]
+        channel_revenue = np.bincount(converted_codes, weights=attributed_value, minlength=len(_CHANNELS))
+        
+        return _roi_from_totals(channel_attribution, scan.channel_costs, channel_revenue)
     
     def _calculate_confidence_intervals(self, 
-                                     journeys: List[CustomerJourney],
-                                     channel_attribution: Dict[ChannelType, float]) -> Dict[ChannelType, Tuple[float, float]]:
-        """Calculate confidence intervals for attribution results."""
-        confidence_intervals = {}
+                                     scan: _AttributionScan,
+                                     channel_attribution: Dict[ChannelType, float],
+                                     credit_matrix: Optional[Callable[[], np.ndarray]] = None
+                                     ) -> Dict[ChannelType, Tuple[float, float]]:
+        """
+        Calculate confidence intervals for attribution results.
+        
+        Bootstraps the model's per-journey credit matrix when available. Models
+        that only produce channel shares are bootstrapped over journeys with
+        their fitted shares held fixed. Without a bootstrap engine, a normal
+        approximation on per-channel conversion values is used.
+        """
+        if self.bootstrap is None:
+            return _intervals_from_margins(channel_attribution, scan.channel_margins)
+        
+        if credit_matrix is not None:
+            lower, upper = self.bootstrap.intervals(credit_matrix())
+        else:
+            lower, upper = self.bootstrap.intervals(scan.share_credit_matrix(channel_attribution),
+                                                    scan.frame.conversion_value[scan.credited_journeys])
         
-        for channel, attribution in channel_attribution.items():
-            # Simplified confidence interval calculation using bootstrap
-            channel_values = []
-            for journey in journeys:
-                if channel in journey.unique_channels and journey.is_converted:
-                    channel_values.append(journey.conversion_value)
-            
-            if len(channel_values) > 1:
-                mean_value = np.mean(channel_values)
-                std_value = np.std(channel_values)
-                n = len(channel_values)
-                
-                # 95% confidence interval
-                margin_of_error = 1.96 * (std_value / np.sqrt(n))
-                lower_bound = max(0, attribution - margin_of_error * attribution)
-                upper_bound = attribution + margin_of_error * attribution
-                
-                confidence_intervals[channel] = (lower_bound, upper_bound)
+        confidence_intervals = {}
+        for channel in channel_attribution:
+            code = _CHANNEL_CODES[channel]
+            if np.isnan(lower[code]):
+                confidence_intervals[channel] = (channel_attribution[channel] * 0.5, channel_attribution[channel] * 1.5)
             else:
-                # Wide interval for insufficient data
-                confidence_intervals[channel] = (attribution * 0.5, attribution * 1.5)
+                confidence_intervals[channel] = (float(lower[code]), float(upper[code]))
         
         return confidence_intervals
     
@@ -835,7 +3758,74 @@ CHANNEL ATTRIBUTION
         return report
 
 
-def main():
+def analyze_journey_file(path: str,
+                         models: Optional[List[AttributionModel]] = None,
+                         chunk_size: int = 100_000,
+                         time_decay_factor: float = 0.1,
+                         columns: Optional[Dict[str, str]] = None,
+                         model_path: Optional[str] = None,
+                         lookback_days: Optional[float] = None) -> Dict[AttributionModel, AttributionResult]:
+    """
+    Out-of-core attribution over a touch-level Parquet or CSV file sorted by customer_id.
+    
+    Args:
+        path: Path to the journey file
+        models: Models to run (rule-based, Shapley value and data-driven are supported)
+        chunk_size: Rows read per chunk
+        time_decay_factor: Decay factor for time-based models
+        columns: Optional mapping of logical column names to file columns
+        model_path: Persisted data-driven model to resume training from and save to
+        lookback_days: Attribution lookback window in days (None counts every touchpoint)
+        
+    Returns:
+        Dictionary with results for each attribution model
+    """
+    data_driven_model = IncrementalDataDrivenModel(model_path) if model_path else None
+    attributor = StreamingAttributor(models, time_decay_factor, data_driven_model, lookback_days)
+    for frame in iter_journey_frames(path, chunk_size, columns):
+        attributor.add_journeys(frame)
+    return {model_type: attributor.snapshot(model_type) for model_type in attributor.models}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Attribution analysis of a journey file, or an example demonstration without --input."""
+    streamable = [model.value for model in _RULE_BASED_MODELS]
+    streamable += [AttributionModel.SHAPLEY_VALUE.value, AttributionModel.DATA_DRIVEN.value]
+    
+    parser = argparse.ArgumentParser(prog='attribution-analyzer', description='Multi-touch attribution analysis')
+    parser.add_argument('--input', help='Touch-level Parquet or CSV file sorted by customer_id')
+    parser.add_argument('--models', nargs='+', choices=streamable, default=streamable[:-2],
+                        help='Attribution models to run (default: rule-based models)')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows read per chunk')
+    parser.add_argument('--time-decay-factor', type=float, default=0.1, help='Decay factor for time-decay model')
+    parser.add_argument('--model-path', help='Data-driven model file to resume training from and save to')
+    parser.add_argument('--lookback-days', type=float, help='Attribution lookback window in days')
+    args = parser.parse_args(argv)
+    
+    if args.input is None:
+        _demo()
+        return
+    
+    models = [AttributionModel(value) for value in args.models]
+    results = analyze_journey_file(args.input, models, args.chunk_size, args.time_decay_factor,
+                                   model_path=args.model_path, lookback_days=args.lookback_days)
+    builder = AttributionModelBuilder()
+    
+    print("ATTRIBUTION MODEL COMPARISON")
+    print("=" * 50)
+    
+    for model_type, result in results.items():
+        print(f"\n{model_type.value.replace('_', ' ').title()}:")
+        print(f"Model Accuracy: {result.model_accuracy:.1%}")
+        
+        print("Channel Attribution:")
+        for channel, attribution in result.channel_attribution.items():
+            print(f"  {channel.value}: {attribution:.1%}")
+    
+    print(f"\n{builder.generate_attribution_report(results[models[0]])}")
+
+
+def _demo():
     """Example usage demonstration."""
     # Sample data creation
     sample_journeys = []
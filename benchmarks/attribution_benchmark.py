@@ -0,0 +1,290 @@
+"""
+Attribution Benchmark Suite
+
+Times every AttributionModel on seeded synthetic journeys and records peak
+traced memory, writing JSON that can be compared between commits to catch
+regressions in the attribution hot paths.
+
+Usage:
+    python benchmarks/attribution_benchmark.py --sizes 1000 10000 100000 --output results.json
+    python benchmarks/attribution_benchmark.py --sizes 1000 10000 --compare baseline.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from attribution_models import (  # noqa: E402
+    AttributionModel, AttributionModelBuilder, ChannelType, JourneyFrame
+)
+
+_DAY_US = 86_400_000_000
+_NAT = np.iinfo(np.int64).min
+
+
+def generate_journeys(n_journeys: int,
+                      n_channels: int = len(ChannelType),
+                      mean_length: float = 4.0,
+                      length_distribution: str = 'geometric',
+                      conversion_rate: float = 0.1,
+                      n_campaigns: int = 200,
+                      seed: int = 42) -> JourneyFrame:
+    """
+    Seeded synthetic journeys built directly in columnar form.
+
+    Journeys start uniformly over 90 days with exponential gaps between
+    touches. Each channel has a random effect on conversion, so journeys
+    through stronger channels convert more often while the overall rate stays
+    close to ``conversion_rate``.
+
+    Args:
+        n_journeys: Number of journeys
+        n_channels: Channels in use (the first ``n_channels`` ChannelType members)
+        mean_length: Mean touchpoints per journey
+        length_distribution: 'geometric', 'poisson' or 'fixed' journey lengths (at least one touch)
+        conversion_rate: Target share of converted journeys
+        n_campaigns: Number of distinct campaigns
+        seed: Random seed
+
+    Returns:
+        Synthetic journeys
+    """
+    if not 1 <= n_channels <= len(ChannelType):
+        raise ValueError(f"n_channels must be between 1 and {len(ChannelType)}")
+
+    rng = np.random.default_rng(seed)
+
+    if length_distribution == 'geometric':
+        lengths = rng.geometric(1.0 / max(mean_length, 1.0), n_journeys)
+    elif length_distribution == 'poisson':
+        lengths = 1 + rng.poisson(max(mean_length - 1.0, 0.0), n_journeys)
+    elif length_distribution == 'fixed':
+        lengths = np.full(n_journeys, max(int(round(mean_length)), 1))
+    else:
+        raise ValueError(f"Unknown length distribution: {length_distribution}")
+
+    offsets = np.zeros(n_journeys + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    n_touchpoints = int(offsets[-1])
+    owner = np.repeat(np.arange(n_journeys), lengths)
+
+    channel_codes = rng.integers(0, n_channels, n_touchpoints).astype(np.int8)
+    campaign_codes = rng.integers(0, n_campaigns, n_touchpoints).astype(np.int32)
+
+    # Touches are sorted within each journey: start time plus cumulative gaps
+    gaps = rng.exponential(2.0 * _DAY_US, n_touchpoints).astype(np.int64)
+    gaps[offsets[:-1]] = rng.integers(0, 90 * _DAY_US, n_journeys)
+    elapsed = np.cumsum(gaps)
+    timestamps = elapsed - np.repeat(elapsed[offsets[:-1]] - gaps[offsets[:-1]], lengths)
+    timestamps += int(np.datetime64('2024-01-01', 'us').view(np.int64))
+
+    effects = rng.lognormal(0.0, 0.5, n_channels)
+    journey_effect = np.bincount(owner, weights=effects[channel_codes], minlength=n_journeys) / lengths
+    probability = np.clip(conversion_rate * journey_effect / journey_effect.mean(), 0.0, 1.0)
+    is_converted = rng.random(n_journeys) < probability
+
+    last_touch = timestamps[offsets[1:] - 1]
+    conversion_timestamps = np.where(is_converted,
+                                     last_touch + rng.exponential(_DAY_US, n_journeys).astype(np.int64), _NAT)
+    conversion_value = np.where(is_converted, rng.lognormal(4.0, 0.8, n_journeys).round(2), 0.0)
+
+    return JourneyFrame(
+        offsets=offsets,
+        channel_codes=channel_codes,
+        campaign_codes=campaign_codes,
+        timestamps=timestamps,
+        cost=rng.gamma(2.0, 5.0, n_touchpoints).round(2),
+        customer_ids=np.array([f"customer_{i}" for i in range(n_journeys)], dtype=object),
+        conversion_value=conversion_value,
+        is_converted=is_converted,
+        conversion_timestamps=conversion_timestamps,
+        campaigns=[f"campaign_{i}" for i in range(n_campaigns)]
+    )
+
+
+def time_model(frame: JourneyFrame,
+               model_type: AttributionModel,
+               n_boot: int,
+               repeats: int,
+               measure_memory: bool) -> Dict[str, float]:
+    """Best-of-``repeats`` wall time and peak traced memory of one model build."""
+    timings = []
+    for _ in range(repeats):
+        builder = AttributionModelBuilder(n_boot=n_boot, bootstrap_seed=0)
+        gc.collect()
+        start = time.perf_counter()
+        builder.build_attribution_model(frame, model_type)
+        timings.append(time.perf_counter() - start)
+
+    peak = None
+    if measure_memory:
+        builder = AttributionModelBuilder(n_boot=n_boot, bootstrap_seed=0)
+        gc.collect()
+        tracemalloc.start()
+        builder.build_attribution_model(frame, model_type)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'mean_seconds': float(np.mean(timings)), 'peak_bytes': peak}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: List[int],
+        models: List[AttributionModel],
+        generator: Dict,
+        n_boot: int = 100,
+        repeats: int = 3,
+        measure_memory: bool = True) -> Dict:
+    """
+    Benchmark ``models`` at each journey count.
+
+    Args:
+        sizes: Journey counts to benchmark
+        models: Attribution models to time
+        generator: Keyword arguments for ``generate_journeys``
+        n_boot: Bootstrap replicates for confidence intervals
+        repeats: Timed runs per model (the minimum is reported)
+        measure_memory: Whether to record peak traced memory with an extra run
+
+    Returns:
+        Metadata and one record per (size, model)
+    """
+    results = []
+    for n_journeys in sizes:
+        start = time.perf_counter()
+        frame = generate_journeys(n_journeys, **generator)
+        print(f"{n_journeys:>10} journeys, {frame.n_touchpoints} touchpoints "
+              f"(generated in {time.perf_counter() - start:.2f}s)", file=sys.stderr)
+
+        for model_type in models:
+            record = time_model(frame, model_type, n_boot, repeats, measure_memory)
+            record.update({'model': model_type.value, 'journeys': n_journeys,
+                           'touchpoints': frame.n_touchpoints})
+            results.append(record)
+            peak = f"{record['peak_bytes'] / 2**20:.1f} MiB" if record['peak_bytes'] is not None else '-'
+            print(f"  {model_type.value:<16}{record['seconds']:>10.4f}s{peak:>14}", file=sys.stderr)
+        del frame
+
+    return {
+        'metadata': {
+            'revision': _git_revision(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'generator': generator,
+            'n_boot': n_boot,
+            'repeats': repeats,
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_seconds: float = 0.01) -> List[str]:
+    """
+    Print current vs baseline timings and return the regressed (size, model) records.
+
+    Args:
+        current: Results of this run
+        baseline: Results loaded from an earlier run
+        threshold: Relative slowdown (or memory growth) reported as a regression
+        min_seconds: Timings below this are too noisy to flag
+
+    Returns:
+        Descriptions of regressions
+    """
+    previous = {(record['journeys'], record['model']): record for record in baseline['results']}
+    regressions = []
+
+    print(f"{'Journeys':>10}  {'Model':<16}{'Baseline':>11}{'Current':>11}{'Ratio':>8}{'Memory':>8}")
+    for record in current['results']:
+        old = previous.get((record['journeys'], record['model']))
+        if old is None:
+            continue
+        ratio = record['seconds'] / old['seconds'] if old['seconds'] > 0 else float('inf')
+        memory_ratio = (record['peak_bytes'] / old['peak_bytes']
+                        if record['peak_bytes'] and old.get('peak_bytes') else None)
+        memory = f"{memory_ratio:.2f}" if memory_ratio is not None else '-'
+        print(f"{record['journeys']:>10}  {record['model']:<16}{old['seconds']:>10.4f}s"
+              f"{record['seconds']:>10.4f}s{ratio:>8.2f}{memory:>8}")
+
+        if (ratio > 1 + threshold and record['seconds'] >= min_seconds) or (memory_ratio is not None and memory_ratio > 1 + threshold):
+            regressions.append(f"{record['model']} at {record['journeys']} journeys: "
+                               f"time x{ratio:.2f}, memory x{memory}")
+    return regressions
+
+
+def main():
+    """Run the benchmark, write JSON and optionally compare against a baseline."""
+    parser = argparse.ArgumentParser(description='Attribution model benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='Journey counts (up to 10^7)')
+    parser.add_argument('--models', nargs='+', choices=[model.value for model in AttributionModel],
+                        default=[model.value for model in AttributionModel], help='Models to time')
+    parser.add_argument('--channels', type=int, default=len(ChannelType), help='Channels in use')
+    parser.add_argument('--mean-length', type=float, default=4.0, help='Mean touchpoints per journey')
+    parser.add_argument('--length-distribution', choices=['geometric', 'poisson', 'fixed'], default='geometric')
+    parser.add_argument('--conversion-rate', type=float, default=0.1, help='Target conversion rate')
+    parser.add_argument('--campaigns', type=int, default=200, help='Number of campaigns')
+    parser.add_argument('--seed', type=int, default=42, help='Generator seed')
+    parser.add_argument('--n-boot', type=int, default=100, help='Bootstrap replicates (0 disables)')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per model')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory run')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative slowdown flagged as regression')
+    parser.add_argument('--min-seconds', type=float, default=0.01, help='Ignore slowdowns of faster runs')
+    args = parser.parse_args()
+
+    logging.getLogger('attribution_models').setLevel(logging.WARNING)
+    generator = {
+        'n_channels': args.channels,
+        'mean_length': args.mean_length,
+        'length_distribution': args.length_distribution,
+        'conversion_rate': args.conversion_rate,
+        'n_campaigns': args.campaigns,
+        'seed': args.seed,
+    }
+    results = run(args.sizes, [AttributionModel(value) for value in args.models], generator,
+                  args.n_boot, args.repeats, not args.no_memory)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['metadata'].get('generator') != generator:
+            print("Warning: baseline used different generator settings", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+TouchPoint Memory Benchmark
+
+Measures memory per touchpoint for the legacy dataclass layout, the slotted
+TouchPoint and the columnar JourneyFrame, using the same synthetic journeys.
+Inputs shared by every layout (datetimes, customer ids, floats) are allocated
+before measuring, so figures are what each layout adds and understate the
+legacy layout's per-touch datetime cost.
+
+Usage:
+    python benchmarks/touchpoint_memory.py --touchpoints 1000000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from attribution_models import ChannelType, JourneyFrame, TouchPoint  # noqa: E402
+
+
+@dataclass
+class LegacyTouchPoint:
+    """Previous TouchPoint layout: a regular dataclass with datetime and enum fields."""
+    timestamp: datetime
+    channel: ChannelType
+    campaign: str
+    cost: float
+    impressions: int
+    clicks: int
+    customer_id: str
+    touchpoint_value: float = 0.0
+    attribution_weight: float = 0.0
+
+
+def synthetic_rows(n_touchpoints: int, seed: int = 42) -> Dict[str, list]:
+    """Column lists for ``n_touchpoints`` touches (about five per customer, 200 campaigns)."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    channels = list(ChannelType)
+
+    return {
+        'timestamp': [start + timedelta(seconds=int(s)) for s in rng.integers(0, 30 * 86400, n_touchpoints)],
+        'channel': [channels[c] for c in rng.integers(0, len(channels), n_touchpoints)],
+        # Campaign names are built per row, as they would be when parsed from a file
+        'campaign': [f"campaign_{c}" for c in rng.integers(0, 200, n_touchpoints)],
+        'cost': rng.gamma(2.0, 10.0, n_touchpoints).round(2).tolist(),
+        'impressions': rng.integers(100, 5000, n_touchpoints).tolist(),
+        'clicks': rng.integers(0, 100, n_touchpoints).tolist(),
+        'customer_id': [f"customer_{i // 5}" for i in range(n_touchpoints)],
+    }
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Bytes still allocated by ``build()``'s result."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def run(n_touchpoints: int) -> List[Dict[str, float]]:
+    """Measure each representation and return one record per layout."""
+    columns = synthetic_rows(n_touchpoints)
+    rows = list(zip(*columns.values()))
+
+    def legacy():
+        # Fresh copies of campaign strings model values parsed independently per row
+        return [LegacyTouchPoint(ts, ch, ''.join(campaign), cost, imp, clk, cid)
+                for ts, ch, campaign, cost, imp, clk, cid in rows]
+
+    def slotted():
+        return [TouchPoint(ts, ch, ''.join(campaign), cost, imp, clk, cid)
+                for ts, ch, campaign, cost, imp, clk, cid in rows]
+
+    def columnar():
+        campaign_index: Dict[str, int] = {}
+        return JourneyFrame(
+            offsets=np.arange(0, n_touchpoints + 5, 5, dtype=np.int64).clip(max=n_touchpoints),
+            channel_codes=np.array([list(ChannelType).index(ch) for ch in columns['channel']], dtype=np.int8),
+            campaign_codes=np.array([campaign_index.setdefault(c, len(campaign_index)) for c in columns['campaign']],
+                                    dtype=np.int32),
+            timestamps=np.array(columns['timestamp'], dtype='datetime64[us]').view(np.int64),
+            cost=np.array(columns['cost']),
+            customer_ids=np.array(columns['customer_id'][::5], dtype=object),
+            conversion_value=np.zeros((n_touchpoints + 4) // 5),
+            is_converted=np.zeros((n_touchpoints + 4) // 5, dtype=bool),
+            conversion_timestamps=np.zeros((n_touchpoints + 4) // 5, dtype=np.int64),
+            campaigns=list(campaign_index)
+        )
+
+    results = []
+    for name, build in (('legacy_dataclass', legacy), ('slotted_touchpoint', slotted), ('journey_frame', columnar)):
+        total = measure(build)
+        results.append({'layout': name, 'touchpoints': n_touchpoints,
+                        'bytes': total, 'bytes_per_touchpoint': total / n_touchpoints})
+    return results
+
+
+def main():
+    """Run the benchmark and print a table (or JSON)."""
+    parser = argparse.ArgumentParser(description='TouchPoint memory benchmark')
+    parser.add_argument('--touchpoints', type=int, default=200_000, help='Number of touchpoints')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.touchpoints)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]['bytes_per_touchpoint']
+    print(f"{'Layout':<22}{'Bytes/touch':>14}{'vs legacy':>12}")
+    for record in results:
+        print(f"{record['layout']:<22}{record['bytes_per_touchpoint']:>14.1f}"
+              f"{record['bytes_per_touchpoint'] / baseline:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -68,6 +68,7 @@ class AttributionConfig:
     min_conversions_for_significance: int = 50
     confidence_level: float = 0.95
     time_decay_factor: float = 0.1
+    markov_order: int = 1
 
 @dataclass
 class ContentGenerationConfig:
@@ -186,7 +187,8 @@ class Settings:
             attribution_lookback_days=int(os.getenv("ATTRIBUTION_LOOKBACK_DAYS", "30")),
             min_conversions_for_significance=int(os.getenv("MIN_CONVERSIONS_FOR_SIGNIFICANCE", "50")),
             confidence_level=float(os.getenv("CONFIDENCE_LEVEL", "0.95")),
-            time_decay_factor=float(os.getenv("TIME_DECAY_FACTOR", "0.1"))
+            time_decay_factor=float(os.getenv("TIME_DECAY_FACTOR", "0.1")),
+            markov_order=int(os.getenv("MARKOV_ORDER", "1"))
         )
     
     def _load_content_generation_config(self) -> ContentGenerationConfig:
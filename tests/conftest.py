@@ -0,0 +1,6 @@
+"""Shared pytest configuration: make the top-level toolkit modules importable."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,419 @@
+"""Tests for attribution_models."""
+
+import itertools
+import math
+import random
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import attribution_models
+from attribution_models import (AttributionCache, AttributionModel, AttributionModelBuilder, ChannelType,
+                                CustomerJourney, IncrementalDataDrivenModel, JourneyFrame, ResponseCurve,
+                                ShapleyAttributor, StreamingAttributor, TouchPoint, analyze_journey_file,
+                                _markov_removal_effects)
+
+RULE_MODELS = [AttributionModel.FIRST_TOUCH, AttributionModel.LAST_TOUCH, AttributionModel.LINEAR,
+               AttributionModel.TIME_DECAY, AttributionModel.POSITION_BASED]
+
+
+def make_journeys(n: int = 600, seed: int = 7, n_channels: int = len(ChannelType)) -> list:
+    """Random journeys with sorted touchpoints; about 40% convert, some without a conversion time."""
+    rng = random.Random(seed)
+    channels = list(ChannelType)[:n_channels]
+    start = datetime(2024, 1, 1, 12)
+    journeys = []
+    for i in range(n):
+        timestamp = start + timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86399))
+        touchpoints = []
+        for _ in range(rng.choice([0, 1, 1, 2, 3, 4, 6, 9])):
+            timestamp += timedelta(hours=rng.randint(0, 100), microseconds=rng.randint(0, 999999))
+            touchpoints.append(TouchPoint(timestamp, rng.choice(channels), f'campaign_{rng.randint(0, 12)}',
+                                          round(rng.uniform(0, 80), 2), 100, 5, f'customer_{i:05d}'))
+        converted = rng.random() < 0.4
+        conversion_timestamp = None
+        if converted and rng.random() < 0.9:
+            conversion_timestamp = timestamp + timedelta(hours=rng.randint(0, 200))
+        journeys.append(CustomerJourney(f'customer_{i:05d}', touchpoints, conversion_timestamp,
+                                        round(rng.uniform(10, 500), 2) if converted else 0.0, 30, converted))
+    return journeys
+
+
+def reference_rule_attribution(journeys: list, model_type: AttributionModel, decay_factor: float = 0.1):
+    """Channel and campaign shares as the original per-journey loops computed them."""
+    channels, campaigns, total_value = {}, {}, 0.0
+    for journey in journeys:
+        touchpoints = journey.touchpoints
+        if not (journey.is_converted and touchpoints):
+            continue
+        n = len(touchpoints)
+        if model_type == AttributionModel.FIRST_TOUCH:
+            weights = [1.0] + [0.0] * (n - 1)
+        elif model_type == AttributionModel.LAST_TOUCH:
+            weights = [0.0] * (n - 1) + [1.0]
+        elif model_type == AttributionModel.LINEAR:
+            weights = [1.0 / n] * n
+        elif model_type == AttributionModel.TIME_DECAY:
+            if journey.conversion_timestamp is None:
+                continue
+            decay = [np.exp(-decay_factor * (journey.conversion_timestamp - tp.timestamp).days) for tp in touchpoints]
+            weights = [w / sum(decay) for w in decay]
+        elif n <= 2:
+            weights = [1.0 / n] * n
+        else:
+            weights = [0.4] + [0.2 / (n - 2)] * (n - 2) + [0.4]
+
+        for touchpoint, weight in zip(touchpoints, weights):
+            if weight:
+                credit = journey.conversion_value * weight
+                channels[touchpoint.channel] = channels.get(touchpoint.channel, 0.0) + credit
+                campaigns[touchpoint.campaign] = campaigns.get(touchpoint.campaign, 0.0) + credit
+        total_value += journey.conversion_value
+
+    return ({k: v / total_value for k, v in channels.items()},
+            {k: v / total_value for k, v in campaigns.items()})
+
+
+def assert_same_attribution(result, expected):
+    """Results agree exactly on channel, campaign and ROI figures."""
+    assert result.channel_attribution == expected.channel_attribution
+    assert result.campaign_attribution == expected.campaign_attribution
+    assert result.roi_by_channel == expected.roi_by_channel
+
+
+@pytest.fixture(scope='module')
+def journeys():
+    return make_journeys()
+
+
+@pytest.fixture(scope='module')
+def builder():
+    return AttributionModelBuilder()
+
+
+def _aware_journey(offset_hours: int = 2) -> CustomerJourney:
+    tz = timezone(timedelta(hours=offset_hours))
+    touchpoints = [
+        TouchPoint(datetime(2024, 1, 1, 12, tzinfo=tz), ChannelType.EMAIL, 'welcome', 1.0, 10, 1, 'customer_1'),
+        TouchPoint(datetime(2024, 1, 2, 9, tzinfo=tz), ChannelType.PAID_SEARCH, 'brand', 2.0, 20, 2, 'customer_1'),
+    ]
+    return CustomerJourney('customer_1', touchpoints, datetime(2024, 1, 3, 13, tzinfo=tz), 50.0, 2, True)
+
+
+def test_timezone_aware_conversion_timestamp():
+    """Aware conversion times are normalized like touchpoint timestamps."""
+    journey = _aware_journey()
+
+    assert journey.first_timestamp == datetime(2024, 1, 1, 10)
+    assert journey.last_timestamp == datetime(2024, 1, 2, 7)
+    assert journey.journey_duration == 2
+
+
+def test_from_journeys_normalizes_aware_conversion_timestamps():
+    """Aware conversion times are stored as naive UTC microseconds without warnings."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        frame = JourneyFrame.from_journeys([_aware_journey(), _aware_journey(-5)])
+
+    expected = np.array(['2024-01-03T11:00', '2024-01-03T18:00'], dtype='datetime64[us]').view(np.int64)
+    np.testing.assert_array_equal(frame.conversion_timestamps, expected)
+
+
+def test_frame_round_trip(journeys):
+    """JourneyFrame keeps touchpoint order, channels and journey fields."""
+    rebuilt = JourneyFrame.from_journeys(journeys).to_journeys()
+
+    for original, journey in zip(journeys, rebuilt):
+        assert journey.customer_id == original.customer_id
+        assert [(tp.timestamp, tp.channel, tp.campaign, tp.cost) for tp in journey.touchpoints] == \
+            [(tp.timestamp, tp.channel, tp.campaign, tp.cost) for tp in original.touchpoints]
+        assert journey.conversion_timestamp == original.conversion_timestamp
+        assert (journey.conversion_value, journey.is_converted) == (original.conversion_value, original.is_converted)
+        assert journey.unique_channels == original.unique_channels
+
+
+@pytest.mark.parametrize('model_type', RULE_MODELS)
+def test_rule_models_match_reference(journeys, builder, model_type):
+    """Vectorized rule-based credit matches the per-journey loop implementation."""
+    channels, campaigns = reference_rule_attribution(journeys, model_type)
+
+    result = builder.build_attribution_model(journeys, model_type)
+
+    assert result.channel_attribution == pytest.approx(channels, rel=1e-12)
+    assert result.campaign_attribution == pytest.approx(campaigns, rel=1e-12)
+
+
+def test_sharded_rule_credit_matches_single_process(journeys, builder):
+    """Sharded runs aggregate in journey order, so results are bit-for-bit identical."""
+    frame = JourneyFrame.from_journeys(journeys)
+    single = builder.compare_attribution_models(frame, RULE_MODELS)
+
+    with ThreadPoolExecutor(3) as executor:
+        threaded = builder.compare_attribution_models(frame, RULE_MODELS, executor=executor)
+    processes = builder.compare_attribution_models(frame, RULE_MODELS, n_workers=2)
+
+    for model_type in RULE_MODELS:
+        assert_same_attribution(threaded[model_type], single[model_type])
+        assert_same_attribution(processes[model_type], single[model_type])
+
+
+def test_failed_shard_surfaces_original_error(journeys, builder, monkeypatch):
+    """A failing shard raises its own error, not one from releasing shared memory."""
+    def fail(self, model_type, decay_factor):
+        raise RuntimeError("shard failed")
+    monkeypatch.setattr(attribution_models._AttributionScan, 'rule_credits', fail)
+
+    with ThreadPoolExecutor(3) as executor, pytest.raises(RuntimeError, match="shard failed"):
+        builder.build_attribution_model(journeys, AttributionModel.LINEAR, executor=executor)
+
+
+def test_streaming_matches_batch(journeys, builder):
+    """Micro-batches folded into running sums agree with one batch run."""
+    models = RULE_MODELS + [AttributionModel.SHAPLEY_VALUE]
+    attributor = StreamingAttributor(models)
+    for start in range(0, len(journeys), 170):
+        attributor.add_journeys(journeys[start:start + 170])
+
+    for model_type in models:
+        snapshot = attributor.snapshot(model_type)
+        result = builder.build_attribution_model(journeys, model_type)
+        assert snapshot.channel_attribution == pytest.approx(result.channel_attribution, rel=1e-9)
+        assert snapshot.campaign_attribution == pytest.approx(result.campaign_attribution, rel=1e-9, abs=1e-15)
+        assert snapshot.roi_by_channel == pytest.approx(result.roi_by_channel, rel=1e-9)
+
+
+def dense_removal_effects(frame: JourneyFrame) -> np.ndarray:
+    """First-order removal effects from dense transition matrices, solved once per removed channel."""
+    n_channels = len(ChannelType)
+    start, conversion = n_channels, n_channels + 1
+    counts = np.zeros((n_channels + 1, n_channels + 3))
+    for j in range(frame.n_journeys):
+        path = frame.channel_codes[frame.offsets[j]:frame.offsets[j + 1]]
+        if not len(path):
+            continue
+        states = [start] + list(path)
+        for source, target in zip(states[:-1], states[1:]):
+            counts[source, target] += 1
+        counts[path[-1], conversion if frame.is_converted[j] else conversion + 1] += 1
+
+    seen = counts.sum(axis=1) > 0
+    probabilities = np.zeros_like(counts)
+    probabilities[seen] = counts[seen] / counts[seen].sum(axis=1, keepdims=True)
+
+    def conversion_probability(removed) -> float:
+        Q = probabilities[:, :n_channels + 1].copy()
+        Q[:, removed] = 0.0
+        return np.linalg.solve(np.eye(n_channels + 1) - Q, probabilities[:, conversion])[start]
+
+    base = conversion_probability([])
+    return np.array([max(0.0, 1.0 - conversion_probability([code]) / base) if seen[code] else 0.0
+                     for code in range(n_channels)])
+
+
+def test_markov_removal_effects_match_dense_solve(journeys):
+    """Sparse factorization with low-rank removal updates matches a dense solve per channel."""
+    frame = JourneyFrame.from_journeys(journeys)
+    ones = np.ones(frame.n_journeys)
+
+    effects, _ = _markov_removal_effects(frame.channel_codes, frame.offsets, ones,
+                                         frame.is_converted.astype(np.float64))
+
+    np.testing.assert_allclose(effects, dense_removal_effects(frame), rtol=1e-9, atol=1e-12)
+
+
+def test_markov_woodbury_matches_refactorization(journeys, monkeypatch):
+    """Low-rank removal updates and refactorizing the reduced chain agree at higher order."""
+    frame = JourneyFrame.from_journeys(journeys)
+    args = (frame.channel_codes, frame.offsets, np.ones(frame.n_journeys), frame.is_converted.astype(np.float64))
+    updated, base = _markov_removal_effects(*args, order=2)
+
+    monkeypatch.setattr(attribution_models, '_MAX_WOODBURY_ELEMENTS', 0)
+    refactorized, refactorized_base = _markov_removal_effects(*args, order=2)
+
+    assert base == pytest.approx(refactorized_base)
+    np.testing.assert_allclose(updated, refactorized, rtol=1e-9, atol=1e-12)
+
+
+def shapley_by_permutations(journeys: list) -> np.ndarray:
+    """Average marginal contribution over all channel orders, a coalition being worth every contained journey."""
+    frame = JourneyFrame.from_journeys(journeys)
+    touched = frame.journey_lengths > 0
+    values = pd.Series(np.where(frame.is_converted, frame.conversion_value, 0.0)[touched])
+    totals = values.groupby(frame.channel_masks[touched]).sum().to_dict()
+    players = sorted({code for mask in totals for code in range(len(ChannelType)) if (mask >> code) & 1})
+
+    def worth(coalition: int) -> float:
+        return sum(value for mask, value in totals.items() if mask & ~coalition == 0)
+
+    expected = np.zeros(len(ChannelType))
+    for order in itertools.permutations(players):
+        coalition = 0
+        for player in order:
+            before = worth(coalition)
+            coalition |= 1 << player
+            expected[player] += worth(coalition) - before
+    return expected / math.factorial(len(players))
+
+
+def test_exact_shapley_matches_permutation_average():
+    """Lattice Shapley values equal the average marginal contribution over all channel orders."""
+    journeys = make_journeys(400, seed=3, n_channels=4)
+    shapley = ShapleyAttributor()
+    shapley.add_journeys(journeys)
+
+    np.testing.assert_allclose(shapley.shapley_values(), shapley_by_permutations(journeys), rtol=1e-12, atol=1e-9)
+
+
+def test_shapley_values_sum_to_conversion_value():
+    """Single-channel journeys keep their own value, and the values add up to the total conversion value."""
+    start = datetime(2024, 1, 1)
+    journeys = [CustomerJourney(f'customer_{i}', [TouchPoint(start, channel, 'campaign', 1.0, 100, 5, f'customer_{i}')],
+                                start + timedelta(hours=1), 100.0, 30, True)
+                for i, channel in enumerate([ChannelType.EMAIL, ChannelType.DISPLAY])]
+    shapley = ShapleyAttributor()
+    shapley.add_journeys(journeys)
+    assert shapley.shapley_values()[list(ChannelType).index(ChannelType.EMAIL)] == pytest.approx(100.0)
+    assert shapley.channel_attribution() == pytest.approx({ChannelType.EMAIL: 0.5, ChannelType.DISPLAY: 0.5})
+
+    journeys = make_journeys(400, seed=3)
+    for exact_max_channels in (15, 0):
+        shapley = ShapleyAttributor(exact_max_channels=exact_max_channels, seed=0)
+        shapley.add_journeys(journeys)
+        total = sum(j.conversion_value for j in journeys if j.is_converted and j.touchpoints)
+        assert shapley.shapley_values().sum() == pytest.approx(total)
+
+    unconverted = ShapleyAttributor()
+    unconverted.add_journeys([j for j in journeys if not j.is_converted])
+    shares = unconverted.channel_attribution()
+    assert shares and all(share == pytest.approx(1 / len(shares)) for share in shares.values())
+
+
+def test_sampled_shapley_approximates_exact():
+    """Permutation sampling converges to the exact values."""
+    journeys = make_journeys(400, seed=3, n_channels=5)
+    exact, sampled = ShapleyAttributor(), ShapleyAttributor(exact_max_channels=0, tolerance=1e-3, seed=0)
+    exact.add_journeys(journeys)
+    sampled.add_journeys(journeys)
+
+    scale = np.abs(exact.shapley_values()).max()
+    np.testing.assert_allclose(sampled.shapley_values(), exact.shapley_values(), atol=0.02 * scale)
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_journey_file_matches_in_memory(journeys, builder, tmp_path, suffix):
+    """Chunked file reads regroup straddling journeys and match an in-memory run."""
+    if suffix == '.parquet':
+        pytest.importorskip('pyarrow')
+    rows = [dict(customer_id=j.customer_id, timestamp=tp.timestamp, channel=tp.channel.value, campaign=tp.campaign,
+                 cost=tp.cost, conversion_value=j.conversion_value, is_converted=j.is_converted,
+                 conversion_timestamp=j.conversion_timestamp)
+            for j in journeys for tp in j.touchpoints]
+    path = str(tmp_path / f'journeys{suffix}')
+    df = pd.DataFrame(rows)
+    if suffix == '.csv':
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, row_group_size=97)
+    touched = [j for j in journeys if j.touchpoints]
+
+    results = analyze_journey_file(path, RULE_MODELS, chunk_size=53)
+
+    for model_type in RULE_MODELS:
+        expected = builder.build_attribution_model(touched, model_type)
+        assert results[model_type].channel_attribution == pytest.approx(expected.channel_attribution, rel=1e-9)
+
+
+def test_incremental_lift_matches_reference(builder):
+    """Per-channel lift matches comparing exposed test journeys with unexposed controls."""
+    test, control = make_journeys(500, seed=1), make_journeys(400, seed=2)
+    expected = {}
+    for channel in {c for j in test for c in j.unique_channels}:
+        exposed = [j.is_converted for j in test if channel in j.unique_channels]
+        unexposed = [j.is_converted for j in control if channel not in j.unique_channels]
+        if exposed and unexposed:
+            control_rate = sum(unexposed) / len(unexposed)
+            expected[channel] = (sum(exposed) / len(exposed) - control_rate) / control_rate if control_rate > 0 else 0
+
+    assert builder.calculate_incremental_lift(test, control) == pytest.approx(expected, rel=1e-12)
+
+
+def test_budget_solver_equalizes_marginal_revenue(builder, journeys):
+    """The optimum spends the budget, respects bounds and equalizes marginal revenue of free cells."""
+    curves = {ChannelType.EMAIL: ResponseCurve('hill', 5000.0, 800.0, 1.4),
+              ChannelType.PAID_SEARCH: ResponseCurve('log', 3000.0, 400.0),
+              ChannelType.DISPLAY: ResponseCurve('hill', 2000.0, 300.0, 0.8),
+              ChannelType.SOCIAL_MEDIA: ResponseCurve('log', 1500.0, 200.0)}
+    result = builder.build_attribution_model(journeys, AttributionModel.LINEAR)
+
+    allocation = builder.optimize_budget_allocation(result, {channel: 1000.0 for channel in curves}, 8000.0,
+                                                    response_curves=curves,
+                                                    bounds={ChannelType.DISPLAY: (2500.0, 4000.0)})
+
+    assert sum(allocation.values()) == pytest.approx(8000.0)
+    assert allocation[ChannelType.DISPLAY] == pytest.approx(2500.0)
+    free = [float(curves[c].marginal_revenue(allocation[c])) for c in curves if c != ChannelType.DISPLAY]
+    assert max(free) == pytest.approx(min(free), rel=1e-4)
+    assert float(curves[ChannelType.DISPLAY].marginal_revenue(2500.0)) <= min(free) * (1 + 1e-4)
+
+
+def test_cache_returns_stored_results(journeys, tmp_path):
+    """Repeated requests hit the cache, on disk across builders, and a new watermark misses."""
+    frame = JourneyFrame.from_journeys(journeys)
+    cache = AttributionCache(cache_dir=str(tmp_path))
+    first = AttributionModelBuilder(cache=cache).build_attribution_model(frame, AttributionModel.LINEAR)
+
+    assert AttributionModelBuilder(cache=cache).build_attribution_model(frame, AttributionModel.LINEAR) is first
+    restored = AttributionModelBuilder(cache=AttributionCache(cache_dir=str(tmp_path)))
+    assert restored.build_attribution_model(frame, AttributionModel.LINEAR).channel_attribution == \
+        first.channel_attribution
+    assert restored.cache.stats()['disk_hits'] == 1
+
+    restored.build_attribution_model(frame, AttributionModel.LINEAR, watermark='2024-06-01')
+    assert restored.cache.stats()['misses'] == 1
+
+
+def test_bootstrap_is_opt_in_and_reproducible(journeys):
+    """Default builds use the normal approximation; seeded bootstraps repeat exactly."""
+    assert AttributionModelBuilder().bootstrap is None
+
+    builder = AttributionModelBuilder(n_boot=150, bootstrap_seed=3)
+    first = builder.build_attribution_model(journeys, AttributionModel.LINEAR)
+    with ThreadPoolExecutor(2) as executor:
+        parallel = AttributionModelBuilder(n_boot=150, bootstrap_seed=3, bootstrap_executor=executor)
+        second = parallel.build_attribution_model(journeys, AttributionModel.LINEAR)
+
+    repeated = builder.build_attribution_model(journeys, AttributionModel.LINEAR)
+    assert first.confidence_intervals == second.confidence_intervals == repeated.confidence_intervals
+
+
+def test_channel_margins_match_per_channel_moments(journeys):
+    """Margins from the single moments product match a per-channel standard deviation."""
+    frame = JourneyFrame.from_journeys(journeys)
+    margins = attribution_models._AttributionScan(frame).channel_margins
+
+    expected = np.full(len(ChannelType), np.nan)
+    for code in range(len(ChannelType)):
+        values = frame.conversion_value[frame.channel_presence[:, code] & frame.is_converted]
+        if len(values) > 1:
+            expected[code] = 1.96 * np.std(values) / np.sqrt(len(values))
+    np.testing.assert_allclose(margins, expected, rtol=1e-9)
+
+
+def test_data_driven_attribution_does_not_train(journeys):
+    """Attribution reads the incremental model; only explicit updates train it, scored prequentially."""
+    model = IncrementalDataDrivenModel()
+    builder = AttributionModelBuilder(data_driven_model=model)
+    builder.update_data_driven_model(journeys[:300])
+    builder.update_data_driven_model(journeys[300:])
+
+    first = builder.build_attribution_model(journeys, AttributionModel.DATA_DRIVEN)
+    second = builder.compare_attribution_models(journeys, [AttributionModel.DATA_DRIVEN])[AttributionModel.DATA_DRIVEN]
+
+    assert model.journeys_seen == len(journeys)
+    assert model.journeys_scored == len(journeys) - 300
+    assert first.channel_attribution == second.channel_attribution
+    assert first.model_accuracy == model.prequential_accuracy
@@ -0,0 +1,310 @@
+"""Tests for roi_tracker."""
+
+import random
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from roi_tracker import (AlertSeverity, CampaignSnapshot, MetricType, RollingBaselines, ROITracker, SnapshotBackend,
+                         SnapshotStore, SQLiteSnapshotBackend, create_snapshot_backend, _metric_row, _to_us)
+
+ALERT_METRICS = [MetricType.ROAS, MetricType.CPA, MetricType.CTR, MetricType.CONVERSION_RATE, MetricType.COST]
+DEFAULT_THRESHOLDS = {
+    True: {'critical': -50, 'high': -30, 'medium': -20, 'low': -10},
+    False: {'critical': 100, 'high': 50, 'medium': 25, 'low': 10},
+}
+
+
+def make_snapshot(rng: random.Random, campaign_id: str, timestamp: datetime) -> CampaignSnapshot:
+    """Snapshot with random spend, revenue and funnel counts (some zero)."""
+    return CampaignSnapshot(campaign_id, 'search', timestamp, {
+        MetricType.COST: rng.choice([0.0, rng.uniform(1, 250)]),
+        MetricType.REVENUE: rng.uniform(0, 600),
+        MetricType.CLICKS: float(rng.randrange(0, 60)),
+        MetricType.IMPRESSIONS: float(rng.randrange(0, 1500)),
+        MetricType.CONVERSIONS: float(rng.randrange(0, 6)),
+    })
+
+
+def snapshot_value(snapshot: CampaignSnapshot, metric_type: MetricType) -> float:
+    """Metric value of one snapshot, through the CampaignSnapshot ratio properties."""
+    if metric_type == MetricType.ROAS:
+        return snapshot.roas
+    if metric_type == MetricType.CPA:
+        return snapshot.cpa
+    if metric_type == MetricType.CTR:
+        return snapshot.ctr
+    if metric_type == MetricType.CONVERSION_RATE:
+        return snapshot.conversion_rate
+    return snapshot.metrics.get(metric_type, 0)
+
+
+def mean_metrics(snapshots: list) -> dict:
+    """Average of each alert metric, skipping zero ROAS and infinite CPA as the original scan did."""
+    means = {}
+    for metric_type in ALERT_METRICS:
+        values = [snapshot_value(s, metric_type) for s in snapshots]
+        if metric_type == MetricType.ROAS:
+            values = [v for v in values if v > 0]
+        elif metric_type == MetricType.CPA:
+            values = [v for v in values if v != float('inf')]
+        if values:
+            means[metric_type] = float(np.mean(values))
+    return means
+
+
+def previous_day_baseline(history: list, campaign_id: str, now: datetime) -> dict:
+    """Comparison metrics as the original scan over every snapshot from the previous day computed them."""
+    return mean_metrics([s for s in history if s.campaign_id == campaign_id
+                         and now - timedelta(days=2) <= s.timestamp < now - timedelta(days=1)])
+
+
+def previous_day_alerts(tracker: ROITracker, history: list, snapshot: CampaignSnapshot, now: datetime) -> list:
+    """(metric, severity, comparison value) of the alerts the original scan raised for ``snapshot``."""
+    baseline = previous_day_baseline(history, snapshot.campaign_id, now)
+    alerts = []
+    for metric_type in ALERT_METRICS:
+        current = snapshot_value(snapshot, metric_type)
+        if metric_type not in baseline or current == 0 or baseline[metric_type] == 0:
+            continue
+        variance = (current - baseline[metric_type]) / baseline[metric_type] * 100
+        decrease_is_bad = metric_type in (MetricType.ROAS, MetricType.CTR, MetricType.CONVERSION_RATE)
+        thresholds = tracker.alert_thresholds.get(metric_type, {})
+        for level, default in DEFAULT_THRESHOLDS[decrease_is_bad].items():
+            threshold = thresholds.get(level, default)
+            if (variance <= threshold) if decrease_is_bad else (variance >= threshold):
+                alerts.append((metric_type, AlertSeverity(level), baseline[metric_type]))
+                break
+    return alerts
+
+
+@pytest.fixture
+def history():
+    """A day of snapshots for 20 campaigns, inside the previous-day window and clear of its edges."""
+    rng = random.Random(5)
+    now = datetime.now()
+    return [make_snapshot(rng, f'campaign_{i % 20}', now - timedelta(hours=46) + timedelta(minutes=3 * i))
+            for i in range(400)]
+
+
+def test_alerts_match_previous_day_scan(history):
+    """Alerts from rolling baselines match the scan over the previous day's snapshots."""
+    rng = random.Random(11)
+    tracker = ROITracker()
+    for snapshot in history:
+        tracker.record_campaign_snapshot(snapshot)
+
+    for i in range(60):
+        snapshot = make_snapshot(rng, f'campaign_{i % 25}', datetime.now())
+        recorded = len(tracker.alerts)
+        tracker.record_campaign_snapshot(snapshot)
+
+        expected = previous_day_alerts(tracker, history, snapshot, datetime.now())
+        got = [(a.metric_type, a.severity, a.threshold_value) for a in tracker.alerts[recorded:]]
+        assert [(m, s) for m, s, _ in got] == [(m, s) for m, s, _ in expected]
+        assert [v for _, _, v in got] == pytest.approx([v for _, _, v in expected], rel=1e-9)
+
+
+def test_batch_alerts_check_latest_row_per_campaign(history):
+    """A batch raises at most one alert per campaign and metric, as if checking each campaign's latest row."""
+    rng = random.Random(13)
+    tracker = ROITracker()
+    for snapshot in history:
+        tracker.record_campaign_snapshot(snapshot)
+    now = datetime.now()
+    batch = [make_snapshot(rng, f'campaign_{rng.randrange(25)}', now - timedelta(minutes=rng.randrange(60)))
+             for _ in range(300)]
+    df = pd.DataFrame([{'campaign_id': s.campaign_id, 'channel': s.channel, 'timestamp': s.timestamp,
+                        **{metric.value: value for metric, value in s.metrics.items()}} for s in batch])
+
+    alerts = tracker.record_snapshots(df)
+
+    assert len({a.alert_id for a in alerts}) == len(alerts)
+    assert len({(a.campaign_id, a.metric_type) for a in alerts}) == len(alerts)
+    latest = {}
+    for snapshot in batch:
+        if snapshot.campaign_id not in latest or snapshot.timestamp >= latest[snapshot.campaign_id].timestamp:
+            latest[snapshot.campaign_id] = snapshot
+    expected = {(campaign_id, metric, severity)
+                for campaign_id, snapshot in latest.items()
+                for metric, severity, _ in previous_day_alerts(tracker, history, snapshot, datetime.now())}
+    assert {(a.campaign_id, a.metric_type, a.severity) for a in alerts} == expected
+
+
+def test_store_queries_match_scan():
+    """Time-window queries on the per-campaign buffers match filtering every snapshot."""
+    rng = random.Random(4)
+    start = datetime(2024, 1, 1)
+    snapshots = [CampaignSnapshot(f'campaign_{rng.randrange(5)}', rng.choice(['search', 'social']),
+                                  start + timedelta(minutes=rng.randrange(0, 5000)), {MetricType.COST: float(i)})
+                 for i in range(500)]
+    store = SnapshotStore()
+    for snapshot in snapshots:
+        store.append(snapshot)
+
+    for low, high in [(None, None), (start + timedelta(hours=20), None), (start, start + timedelta(hours=40)),
+                      (start + timedelta(hours=30), start + timedelta(hours=31))]:
+        expected = [s for s in snapshots
+                    if (low is None or s.timestamp >= low) and (high is None or s.timestamp < high)]
+        assert store.snapshots(start=low, end=high) == expected
+        if high is None:
+            for campaign_id in store.campaign_ids():
+                mine = [s for s in expected if s.campaign_id == campaign_id]
+                assert store.latest(campaign_id, low) == (max(mine, key=lambda s: s.timestamp) if mine else None)
+
+
+@pytest.mark.parametrize('max_rows', [None, 3, 40])
+def test_store_extend_matches_append(max_rows):
+    """Batch extends and single appends leave the same per-campaign ring buffers, including late rows."""
+    rng = random.Random(9)
+    appended, extended = (SnapshotStore(max_rows, timedelta(days=2)) for _ in range(2))
+    now = datetime(2024, 1, 1)
+    for step in range(150):
+        now += timedelta(minutes=30)
+        batch = [CampaignSnapshot(f'campaign_{rng.randrange(6)}', 'search',
+                                  now - timedelta(minutes=rng.choice([0, 0, 10, 600, 4000])),
+                                  {MetricType.COST: float(step * 100 + i)})
+                 for i in range(rng.randrange(0, 40))]
+        for snapshot in batch:
+            appended.append(snapshot, now)
+        if batch:
+            extended.extend(np.array([s.campaign_id for s in batch], dtype=object),
+                            np.array([s.channel for s in batch], dtype=object),
+                            np.array([_to_us(s.timestamp) for s in batch]),
+                            np.array([_metric_row(s.metrics) for s in batch]), now)
+
+        assert len(appended) == len(extended)
+        for campaign_id in appended.campaign_ids():
+            a, b = appended.window(campaign_id), extended.window(campaign_id)
+            assert (a is None) == (b is None)
+            if a is not None:
+                np.testing.assert_array_equal(a.timestamps, b.timestamps)
+                np.testing.assert_array_equal(a.values(MetricType.COST), b.values(MetricType.COST))
+                assert max_rows is None or len(a.timestamps) <= max_rows
+
+
+def test_rolling_baselines_match_scan():
+    """Bucketed baselines, fed per snapshot or per batch, match a scan of the snapped window."""
+    rng = random.Random(3)
+    single, batched = RollingBaselines(bucket_minutes=30), RollingBaselines(bucket_minutes=30)
+    history = []
+    now = datetime(2024, 1, 1)
+    for step in range(1500):
+        now += timedelta(minutes=rng.choice([1, 5, 20]))
+        batch = [make_snapshot(rng, f'campaign_{rng.randrange(5)}',
+                               now - timedelta(minutes=rng.choice([0, 0, 0, 1470, 2400, 3600, -30])))
+                 for _ in range(rng.randrange(1, 4))]
+        for snapshot in batch:
+            single.add_snapshot(snapshot, now)
+        batched.add(batched.rows([s.campaign_id for s in batch]), np.array([_to_us(s.timestamp) for s in batch]),
+                    np.array([_metric_row(s.metrics) for s in batch]), now)
+        # Snapshots dated more than a bucket ahead of now are left out of the baselines
+        low = (_to_us(now) - single.window_start_us) // single.bucket_us
+        history += [s for s in batch if _to_us(s.timestamp) // single.bucket_us < low + single.n_buckets]
+
+        if step % 50 == 0:
+            # The window edges snap to bucket boundaries
+            start = (_to_us(now) - single.window_start_us) // single.bucket_us * single.bucket_us
+            end = (_to_us(now) - single.window_end_us) // single.bucket_us * single.bucket_us
+            for campaign_id in (f'campaign_{i}' for i in range(5)):
+                reference = mean_metrics([s for s in history if s.campaign_id == campaign_id
+                                          and start <= _to_us(s.timestamp) < end])
+                for baselines in (single, batched):
+                    assert baselines.baseline(campaign_id, now) == pytest.approx(reference, rel=1e-9)
+
+
+def test_export_round_trip():
+    """Exported frames re-ingest without turning derived columns into reported metrics."""
+    rng = random.Random(1)
+    now = datetime.now()
+    tracker = ROITracker()
+    for i in range(40):
+        tracker.record_campaign_snapshot(make_snapshot(rng, f'campaign_{i % 4}', now - timedelta(hours=i)))
+    exported = tracker.export_performance_data()
+
+    copy = ROITracker()
+    copy.record_snapshots(exported)
+
+    pd.testing.assert_frame_equal(copy.export_performance_data(), exported)
+    assert copy.store.latest('campaign_0').metrics == tracker.store.latest('campaign_0').metrics
+
+
+def test_aware_timestamps_are_ingested_as_utc():
+    """Timezone-aware timestamp columns are converted to naive UTC without warnings."""
+    now = datetime.now().replace(microsecond=0)
+    data = {'campaign_id': np.array(['campaign_0', 'campaign_1']), 'channel': np.array(['search', 'social']),
+            'timestamp': pd.DatetimeIndex([now, now]).tz_localize('UTC').tz_convert('America/New_York'),
+            'cost': np.array([10.0, 20.0])}
+    tracker = ROITracker()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        tracker.record_snapshots(data)
+
+    assert tracker.store.latest('campaign_1').timestamp == now
+
+
+def test_sqlite_backend_warm_start(tmp_path):
+    """A tracker backed by SQLite answers like an in-memory one, before and after a restart."""
+    rng = random.Random(2)
+    now = datetime.now().replace(microsecond=0)
+    url = f"sqlite:///{tmp_path / 'snapshots.db'}"
+    snapshots = [make_snapshot(rng, f'campaign_{i % 10}', now - timedelta(days=5) + timedelta(minutes=17 * i))
+                 for i in range(400)]
+
+    reference, stored = ROITracker(), ROITracker(storage=create_snapshot_backend(url), memory_days=1)
+    for tracker in (reference, stored):
+        for snapshot in snapshots[:100]:
+            tracker.record_campaign_snapshot(snapshot)
+        tracker.record_snapshots(pd.DataFrame([
+            {'campaign_id': s.campaign_id, 'channel': s.channel, 'timestamp': s.timestamp,
+             **{metric.value: value for metric, value in s.metrics.items()}} for s in snapshots[100:]]))
+    stored.close()
+    restarted = ROITracker(storage=create_snapshot_backend(url), memory_days=1)
+
+    def export(tracker):
+        return (tracker.export_performance_data(days=7)
+                .sort_values(['campaign_id', 'timestamp'], kind='stable').reset_index(drop=True))
+
+    pd.testing.assert_frame_equal(export(restarted), export(reference))
+    for campaign_id in ('campaign_0', 'campaign_7'):
+        assert restarted.get_performance_trend(campaign_id, MetricType.ROAS, 7) == \
+            pytest.approx(reference.get_performance_trend(campaign_id, MetricType.ROAS, 7))
+        assert restarted.baselines.baseline(campaign_id, datetime.now()) == \
+            pytest.approx(reference.baselines.baseline(campaign_id, datetime.now()))
+    restarted.close()
+
+
+def test_sqlite_load_allows_writes_while_iterating():
+    """Loading releases the connection lock before yielding, so writes inside the loop do not deadlock."""
+    backend = SQLiteSnapshotBackend(':memory:', batch_size=7)
+    backend.initialize()
+    metrics = np.full((20, len(MetricType)), np.nan)
+    metrics[:, 0] = np.arange(20)
+    backend.write(np.array(['campaign_0'] * 20, dtype=object), np.array(['search'] * 20, dtype=object),
+                  np.arange(20, dtype=np.int64), metrics)
+
+    loaded = []
+    for campaign_ids, channels, timestamps, chunk in backend.load():
+        assert not backend._lock.locked()
+        backend.write(np.array(['campaign_1'], dtype=object), np.array(['search'], dtype=object),
+                      timestamps[:1], chunk[:1])
+        loaded.append(timestamps)
+    np.testing.assert_array_equal(np.concatenate(loaded), np.arange(20))
+    assert sum(len(chunk[0]) for chunk in backend.load(campaign_ids=['campaign_1'])) == 3
+    backend.close()
+
+
+def test_backend_requires_connection():
+    """Backends must provide connections; the base class cannot be instantiated."""
+    with pytest.raises(TypeError):
+        SnapshotBackend()
+
+    class NoConnection(SnapshotBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        NoConnection()